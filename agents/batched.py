@@ -0,0 +1,98 @@
+#------複数ゲーム分の行動をまとめて選ぶためのインターフェース------
+import numpy as np
+from game.card import card_from_id
+from game.seeding import spawn_seed
+from game.action_space import ACTION_CARD_IDS, PASS_ACTION, action_index_of
+
+# -----------------------------
+# バッチ版のエージェントは select_actions(obs_batch, mask_batch) -> (N,) 行動番号 を持つ。
+# obs_batch: VecDaifugoEnv の観測（どの値も先頭の軸がゲーム）、mask_batch: (N, NUM_ACTIONS) bool の合法手マスク
+# RandomAgent / RuleBasedAgent / StraightAgent は NumPy で一括に選ぶ。
+# select_action しか持たないエージェントは BatchedAgentAdapter で1ゲームずつ呼び出す
+# -----------------------------
+
+# 行動番号 → 出すカードリスト（パスはNone）
+ACTION_CARDS = [[card_from_id(i) for i in ids] or None for ids in ACTION_CARD_IDS]
+
+
+def numpy_rng(agent):
+    """
+    エージェントの rng（random.Random / random モジュール）から引いたシードで NumPy の生成器を作り、
+    agent._np_rng に覚えておく（同じ seed のエージェントは同じ系列になる）
+    """
+    rng = getattr(agent, '_np_rng', None)
+    if rng is None:
+        rng = agent._np_rng = np.random.default_rng(spawn_seed(agent.rng))
+    return rng
+
+
+def choose_uniform(candidates, rng):
+    """
+    各行の True の中から一様に1つ選んだ列番号 (N,)。True のない行はパス
+    """
+    cumulative = np.cumsum(candidates, axis=1, dtype=np.int32)
+    totals = cumulative[:, -1]
+    pick = (rng.random(len(candidates)) * totals).astype(np.int32)
+    chosen = (cumulative <= pick[:, None]).argmin(axis=1)
+    return np.where(totals > 0, chosen, PASS_ACTION)
+
+
+def choose_min_score(scores, mask):
+    """
+    合法手のうち scores が最小の行動番号 (N,)（同点なら番号の小さい方）
+    """
+    return np.where(mask, scores[None, :], np.inf).argmin(axis=1)
+
+
+class BatchedAgentAdapter:
+    """
+    select_action(observation, legal_actions) だけを持つエージェントを select_actions で呼べるようにする。
+    各ゲームの観測（手札・場のカードリスト、行動番号）と合法手のカードリストを作って1ゲームずつ呼び出す
+    """
+
+    def __init__(self, agent):
+        self.agent = agent
+
+    def select_actions(self, obs_batch, mask_batch):
+        hands = obs_batch['hand']
+        fields = obs_batch['field']
+        actions = np.full(len(mask_batch), PASS_ACTION, dtype=np.int64)
+        for row, mask in enumerate(mask_batch):
+            action_ids = np.flatnonzero(mask).tolist()
+            legal_actions = [ACTION_CARDS[a] for a in action_ids]
+            # 場は行動空間の並び（自然札 → ジョーカー）にそろえる
+            field = [card_from_id(i) for i in np.flatnonzero(fields[row])]
+            field_action = action_index_of(field)
+            if field_action is not None:
+                field = ACTION_CARDS[field_action] or []
+            observation = {
+                'hand': [card_from_id(i) for i in np.flatnonzero(hands[row])],
+                'field': field,
+                'action_ids': action_ids,
+            }
+            chosen = self.agent.select_action(observation, legal_actions)
+            action = action_index_of(chosen)
+            actions[row] = action if action is not None and mask[action] else PASS_ACTION
+        return actions
+
+
+def as_batched(agent):
+    """
+    select_actions を持つエージェントはそのまま、持たなければ BatchedAgentAdapter で包んで返す
+    """
+    return agent if hasattr(agent, 'select_actions') else BatchedAgentAdapter(agent)
+
+
+def select_seat_actions(agents, obs_batch, mask_batch, turn):
+    """
+    席ごとのエージェント agents で、各ゲームの手番プレイヤーの行動をまとめて選ぶ（VecDaifugoEnv 用）。
+    turn: (N,) 各ゲームの手番プレイヤー。同じ席のゲームをまとめて1回ずつ select_actions を呼ぶ
+    """
+    actions = np.full(len(mask_batch), PASS_ACTION, dtype=np.int64)
+    for seat, agent in enumerate(agents):
+        rows = np.flatnonzero(turn == seat)
+        if len(rows) == 0:
+            continue
+        sub_obs = {key: value[rows] for key, value in obs_batch.items()}
+        actions[rows] = as_batched(agent).select_actions(sub_obs, mask_batch[rows])
+    return actions
@@ -0,0 +1,352 @@
+#------情報集合モンテカルロ木探索（ISMCTS）で行動を選ぶエージェント------
+import math
+import random
+import time
+import numpy as np
+from game.card import ALL_CARDS, card_from_id
+from game.bitmask import iter_ids, mask_of
+from game.action_space import (
+    ACTION_CARD_IDS, MASK_TO_ACTION, NUM_ACTIONS, PASS_ACTION, legal_action_mask,
+)
+from game.logger import headless_logger
+from game.hand_sampler import HandSampler
+
+# 行動番号 → 出すカードリスト（パスはNone）
+ACTION_CARDS = [[card_from_id(i) for i in ids] or None for ids in ACTION_CARD_IDS]
+
+# デッキ全体のマスク
+DECK_MASK = mask_of(ALL_CARDS)
+
+# ロールアウトの最大手数（パスの繰り返しで終わらない場合の打ち切り）
+MAX_ROLLOUT_PLIES = 400
+
+
+class Node:
+    """
+    探索木のノード。action を player が選んでこのノードに来た。
+    value は player から見た報酬の合計、avail はこのノードの行動が選択可能だった回数（ISMCTSのUCB用）
+    key は到達時点の公開情報（木の再利用で局面を照合する）
+    """
+    __slots__ = ('parent', 'action', 'player', 'key', 'children', 'visits', 'value', 'avail')
+
+    def __init__(self):
+        self.children = {}
+
+    def reset(self, parent, action, player, key):
+        self.parent = parent
+        self.action = action
+        self.player = player
+        self.key = key
+        self.children.clear()
+        self.visits = 0
+        self.value = 0.0
+        self.avail = 0
+
+
+class NodePool:
+    """
+    ノードを使い回すプール（探索のたびにノードを作り直さない）
+    """
+
+    def __init__(self):
+        self.free = []
+        self.created = 0
+
+    def acquire(self, parent=None, action=None, player=None, key=None):
+        if self.free:
+            node = self.free.pop()
+        else:
+            node = Node()
+            self.created += 1
+        node.reset(parent, action, player, key)
+        return node
+
+    def release(self, node, keep=None):
+        """
+        node 以下の部分木をプールに返す（keep の部分木は残す）
+        """
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            if current is keep:
+                continue
+            stack.extend(current.children.values())
+            current.children.clear()
+            current.parent = None
+            self.free.append(current)
+
+
+def public_key(game):
+    """
+    全員に見えている情報だけで局面を表すキー（手札の中身は含まない）
+    """
+    return (
+        game.turn, game.field_mask, game.played_mask, game.last_player, game.rule_checker.revolution,
+        tuple(game.passed), tuple(game.rankings), tuple(len(player.hand) for player in game.players),
+    )
+
+
+class MCTSAgent:
+    """
+    Single-Observer ISMCTS。
+    探索ごとに相手の手札を公開情報（残り枚数・出たカード）と矛盾しないようにランダムに配り直し（確定化）、
+    1本の木の上で選択・展開・ロールアウト・逆伝播を num_simulations 回行う。
+    - ノードはプールで使い回し、次の手番では前回の木から現局面（公開情報が一致するノード）以下を再利用する
+    - 探索結果は last_search_info に入り、DaifugoSimpleEnv が手番レコードの mcts_* / policy_target に書き込む
+    - observation に 'public_info'（DaifugoSimpleEnv(track_public_info=True)）があれば、
+      確定化に HandSampler を使い、交換で渡したカードやパスから分かる情報とも矛盾しない配り方にする
+    - endgame_solver（game.endgame.EndgameSolver）を渡すと、残り2人の終盤は探索せずに読み切った手を選び、
+      シミュレーション中に終盤に入ったらロールアウトの代わりに endgame_rollout_nodes ノードまで読み切って勝敗を使う
+    observation に 'game'（Game）と 'action_ids'（legal_actions の行動番号）が必要。
+    """
+
+    def __init__(self, player_id=None, num_simulations=200, exploration=0.7, reuse_tree=True, seed=None, rng=None,
+                 endgame_solver=None, endgame_rollout_nodes=2000):
+        self.player_id = player_id
+        self.num_simulations = num_simulations
+        self.exploration = exploration
+        self.reuse_tree = reuse_tree
+        self.rng = rng if rng is not None else random.Random(seed)
+        self.pool = NodePool()
+        self.root = None
+        self._sim = None  # シミュレーション用の Game（マスク手札・ログなし）
+        self._sampler = None  # 公開情報を使う確定化（HandSampler）
+        self.endgame_solver = endgame_solver
+        self.endgame_rollout_nodes = endgame_rollout_nodes
+        self.last_search_info = None
+
+    def select_action(self, observation, legal_actions=None):
+        if not legal_actions:
+            return None
+        game = observation.get('game')
+        action_ids = observation.get('action_ids')
+        self.last_search_info = None
+        if len(legal_actions) == 1 or game is None or action_ids is None:
+            return legal_actions[0] if len(legal_actions) == 1 else self.rng.choice(legal_actions)
+        if self.player_id is None:
+            self.player_id = game.turn
+        start = time.perf_counter()
+        if self.endgame_solver is not None and self.endgame_solver.is_endgame(game):
+            action = self._solve_endgame(game, action_ids, start)
+            if action is not None:
+                return legal_actions[action_ids.index(action)]
+        root, reused_visits = self._prepare_root(game)
+        if self._sim is None or self._sim.num_players != game.num_players:
+            self._sim = game.clone(use_bitmask=True, logger=headless_logger())
+        base = game.snapshot()
+        deals = self._sample_deals(observation.get('public_info'), game)
+        for i in range(self.num_simulations):
+            self._simulate(root, base, action_ids, deals[i] if deals is not None else None)
+        # 訪問回数が最大の行動を選ぶ
+        visits = [root.children[a].visits if a in root.children else 0 for a in action_ids]
+        best = max(range(len(action_ids)), key=lambda i: visits[i])
+        self._record_search(root, action_ids, visits, reused_visits, time.perf_counter() - start)
+        self.root = root
+        return legal_actions[best]
+
+    # --- 木の準備と再利用 ---
+    def _prepare_root(self, game):
+        """
+        前回の木から公開情報が現局面と一致するノードを探して根にする（なければ新しい根）
+        戻り値: (根ノード, 再利用した訪問回数)
+        """
+        key = public_key(game)
+        old_root = self.root
+        self.root = None
+        if old_root is not None:
+            found = self._find_node(old_root, key) if self.reuse_tree else None
+            self.pool.release(old_root, keep=found)
+            if found is not None:
+                found.parent = None
+                found.action = None
+                return found, found.visits
+        return self.pool.acquire(key=key), 0
+
+    def _find_node(self, root, key):
+        """
+        根から浅い順に（1周分 + 1手まで）公開情報が key と一致するノードを探す
+        """
+        max_depth = self._sim.num_players + 1 if self._sim is not None else 5
+        frontier = [root]
+        for _ in range(max_depth):
+            next_frontier = []
+            for node in frontier:
+                for child in node.children.values():
+                    if child.key == key:
+                        return child
+                    next_frontier.append(child)
+            frontier = next_frontier
+        return None
+
+    # --- 1回のシミュレーション ---
+    def _sample_deals(self, public_info, game):
+        """
+        公開情報があれば num_simulations 回分の配り方をまとめてサンプリングする（なければNone）
+        """
+        if public_info is None:
+            return None
+        sampler = self._sampler
+        if sampler is None or sampler.tracker is not public_info or sampler.observer != self.player_id:
+            sampler = self._sampler = HandSampler(public_info, self.player_id, seed=self.rng.getrandbits(32))
+        return [tuple(int(mask) for mask in row) for row in sampler.sample_batch(game, self.num_simulations)]
+
+    def _determinize(self, base):
+        """
+        自分以外の手札を、見えていないカードから枚数を合わせてランダムに配り直したスナップショットを返す
+        """
+        hands = [hand if isinstance(hand, int) else mask_of(hand) for hand in base.hands]
+        my_hand = hands[self.player_id]
+        unknown = list(iter_ids(DECK_MASK & ~my_hand & ~base.played_mask))
+        self.rng.shuffle(unknown)
+        pos = 0
+        for pid, hand in enumerate(hands):
+            if pid == self.player_id:
+                continue
+            count = hand.bit_count()
+            mask = 0
+            for i in unknown[pos:pos + count]:
+                mask |= 1 << i
+            hands[pid] = mask
+            pos += count
+        return base._replace(hands=tuple(hands))
+
+    def _legal_ids(self, sim):
+        """
+        シミュレーション中の合法手（行動番号）。場が空のときはパスを除く（出せる手は必ずある）
+        """
+        hand_mask = sim.players[sim.turn].hand.mask
+        field_action = MASK_TO_ACTION[sim.field_mask] if sim.current_field else -1
+        mask = legal_action_mask(hand_mask, field_action, sim.rule_checker.revolution)
+        if field_action < 0:
+            mask[PASS_ACTION] = False
+        return np.flatnonzero(mask).tolist() or [PASS_ACTION]
+
+    def _play(self, sim, action):
+        sim.step(sim.turn, ACTION_CARDS[action])
+
+    def _simulate(self, root, base, root_actions, deal=None):
+        sim = self._sim
+        rng = self.rng
+        sim.restore(self._determinize(base) if deal is None else base._replace(hands=deal))
+        node = root
+        path = [root]
+        # 選択・展開
+        while not sim.done:
+            legal = root_actions if node is root else self._legal_ids(sim)
+            children = node.children
+            untried = []
+            for action in legal:
+                child = children.get(action)
+                if child is None:
+                    untried.append(action)
+                else:
+                    child.avail += 1
+            if untried:
+                action = rng.choice(untried)
+                player = sim.turn
+                self._play(sim, action)
+                child = self.pool.acquire(node, action, player, public_key(sim))
+                child.avail = 1
+                children[action] = child
+                path.append(child)
+                break
+            exploration = self.exploration
+            best = None
+            best_score = -1.0
+            for action in legal:
+                child = children[action]
+                score = child.value / child.visits + exploration * math.sqrt(math.log(child.avail) / child.visits)
+                if score > best_score:
+                    best, best_score = child, score
+            self._play(sim, best.action)
+            node = best
+            path.append(node)
+        # ロールアウト（ランダム。終盤に入ったら読み切れればその勝敗を使う）
+        solver = self.endgame_solver
+        finish = ()
+        plies = 0
+        while not sim.done and plies < MAX_ROLLOUT_PLIES:
+            if solver is not None and solver.is_endgame(sim):
+                result = solver.solve(sim, node_limit=self.endgame_rollout_nodes)
+                if result.solved:
+                    finish = self._finish_order(sim, result.winner)
+                    break
+                solver = None  # 読み切れない終盤ではこのロールアウト中は呼ばない
+            self._play(sim, rng.choice(self._legal_ids(sim)))
+            plies += 1
+        rewards = self._rewards(sim, finish)
+        # 逆伝播
+        root.visits += 1
+        for node in path[1:]:
+            node.visits += 1
+            node.value += rewards[node.player]
+
+    def _finish_order(self, sim, winner):
+        """
+        終盤の勝者 winner が先に上がったときの残り2人の順位
+        """
+        return tuple(sorted((pid for pid in range(sim.num_players) if pid not in sim.rankings), key=lambda pid: pid != winner))
+
+    def _rewards(self, sim, finish=()):
+        """
+        順位に応じた報酬（1位 = 1.0、最下位 = 0.0）。打ち切り時は未確定の順位の平均を与える
+        finish: 終盤ソルバーで決まった残りの順位（sim.rankings の後に続ける）
+        """
+        n = sim.num_players
+        scores = [1.0 - rank / (n - 1) for rank in range(n)]
+        rewards = [0.0] * n
+        rankings = list(sim.rankings) + list(finish)
+        for rank, pid in enumerate(rankings):
+            rewards[pid] = scores[rank]
+        remaining = [pid for pid in range(n) if pid not in rankings]
+        if remaining:
+            rest = scores[len(rankings):]
+            average = sum(rest) / len(rest)
+            for pid in remaining:
+                rewards[pid] = average
+        return rewards
+
+    # --- 終盤 ---
+    def _solve_endgame(self, game, action_ids, start):
+        """
+        終盤を読み切って選ぶ手（行動番号）を返す。読み切れない・合法手にない場合は None（通常の探索に戻る）
+        """
+        result = self.endgame_solver.solve(game)
+        if not result.solved or result.action not in action_ids:
+            return None
+        rewards = self._rewards(game, self._finish_order(game, result.winner))
+        policy = np.zeros(NUM_ACTIONS, dtype=np.float32)
+        policy[result.action] = 1.0
+        self.last_search_info = {
+            'root_value': rewards[game.turn],
+            'visits': {result.action: 1},
+            'policy_target': policy,
+            'exploration_meta': {
+                'endgame_solved': True,
+                'endgame_value': result.value,
+                'endgame_nodes': result.nodes,
+                'elapsed_sec': time.perf_counter() - start,
+            },
+        }
+        return result.action
+
+    # --- 探索結果 ---
+    def _record_search(self, root, action_ids, visits, reused_visits, elapsed):
+        total = sum(visits)
+        policy = np.zeros(NUM_ACTIONS, dtype=np.float32)
+        if total > 0:
+            for action, count in zip(action_ids, visits):
+                policy[action] = count / total
+        value_sum = sum(root.children[a].value for a in action_ids if a in root.children)
+        self.last_search_info = {
+            'root_value': value_sum / total if total > 0 else None,
+            'visits': dict(zip(action_ids, visits)),
+            'policy_target': policy,
+            'exploration_meta': {
+                'num_simulations': self.num_simulations,
+                'exploration': self.exploration,
+                'reused_visits': reused_visits,
+                'elapsed_sec': elapsed,
+                'pool_nodes': self.pool.created,
+            },
+        }
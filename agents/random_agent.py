@@ -1,12 +1,20 @@
 #------ランダムな動作をするエージェント（デバッグ・学習比較用）------
-import random
+from game.seeding import make_rng
+from agents.batched import choose_uniform, numpy_rng
 #from game.environment import DaifugoEnvSimple
 
 class RandomAgent:
-    def __init__(self, player_id=None):
+    def __init__(self, player_id=None, seed=None, rng=None):
         self.player_id = player_id
+        self.rng = make_rng(seed, rng)  # seed / rng を渡さなければグローバルな random
 
     def select_action(self, observation, legal_actions=None):
         if legal_actions:
-            return random.choice(legal_actions)
+            return self.rng.choice(legal_actions)
         return None
+
+    def select_actions(self, obs_batch, mask_batch):
+        """
+        バッチ版: 各ゲームの合法手から一様に選んだ行動番号 (N,)
+        """
+        return choose_uniform(mask_batch, numpy_rng(self))
@@ -1,3 +1,29 @@
+import numpy as np
+from game.action_space import ACTION_CARD_IDS, ACTION_MASKS, NUM_ACTIONS, PASS_ACTION
+from game.bitmask import JOKER_ID, mask_of
+from game.card import card_from_id
+from game.hand_analysis import hand_key, min_plays
+from agents.batched import choose_min_score
+
+
+def _build_action_scores():
+    """
+    行動番号ごとの card_set_score（select_action と同じ: パスは最大、ジョーカー入りは100、それ以外は先頭のランク）
+    """
+    scores = np.zeros(NUM_ACTIONS, dtype=np.float64)
+    for action, ids in enumerate(ACTION_CARD_IDS):
+        if action == PASS_ACTION:
+            scores[action] = np.inf
+        elif JOKER_ID in ids:
+            scores[action] = 100
+        else:
+            scores[action] = card_from_id(ids[0]).rank
+    return scores
+
+
+ACTION_SCORES = _build_action_scores()
+
+
 class RuleBasedAgent:
     def __init__(self, player_id=None):
         self.player_id = player_id
@@ -19,4 +45,27 @@ class RuleBasedAgent:
             # self.rule_checkerがない場合は階段判定をスキップ
             return card_set[0].rank  # 同ランクなので先頭だけでOK
 
-        return min(legal_actions, key=card_set_score)
+        best_score = min(card_set_score(card_set) for card_set in legal_actions)
+        candidates = [card_set for card_set in legal_actions if card_set_score(card_set) == best_score]
+        hand = observation.get('hand') if observation else None
+        if len(candidates) == 1 or hand is None:
+            return candidates[0]
+        # 同点なら、出した後の手札を出し切る手数（game.hand_analysis）が少ない方（さらに同点なら先の方）
+        hand_mask = hand_key(hand)
+        return min(candidates, key=lambda card_set: min_plays(hand_mask & ~mask_of(card_set)))
+
+    def select_actions(self, obs_batch, mask_batch):
+        """
+        バッチ版: card_set_score が最小の合法手の行動番号 (N,)。
+        同点なら出した後の手札を出し切る手数が少ない方、さらに同点なら行動番号の小さい方
+        """
+        actions = choose_min_score(ACTION_SCORES, mask_batch)
+        best = ACTION_SCORES[actions]
+        tied = mask_batch & (ACTION_SCORES[None, :] == best[:, None])
+        for row in np.flatnonzero(tied.sum(axis=1) > 1):
+            hand_mask = 0
+            for i in np.flatnonzero(obs_batch['hand'][row]):
+                hand_mask |= 1 << int(i)
+            candidates = np.flatnonzero(tied[row])
+            actions[row] = min(candidates, key=lambda action: min_plays(hand_mask & ~int(ACTION_MASKS[action])))
+        return actions
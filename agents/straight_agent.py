@@ -1,31 +1,43 @@
-import random
+import numpy as np
+from game.seeding import make_rng
+from game.card import card_from_id
+from game.action_space import (
+    ACTION_CARD_IDS, ACTION_KIND, KIND_PASS, KIND_SINGLE, KIND_JOKER_SINGLE, KIND_SET, KIND_STRAIGHT,
+)
+from game.hand_analysis import hand_straights
+from agents.batched import choose_uniform, numpy_rng
+
+# 行動の種類ごとの優先度（select_action と同じ: 階段 → ペア・スリーカード → 単体 → ジョーカー単体 → パス）
+KIND_PRIORITY = {KIND_STRAIGHT: 0, KIND_SET: 1, KIND_SINGLE: 2, KIND_JOKER_SINGLE: 3, KIND_PASS: 4}
+ACTION_PRIORITY = np.array([KIND_PRIORITY[kind] for kind in ACTION_KIND], dtype=np.int8)
 
 class StraightAgent:
-    def __init__(self, player_id=None):
+    def __init__(self, player_id=None, seed=None, rng=None):
         self.player_id = player_id
+        self.rng = make_rng(seed, rng)  # seed / rng を渡さなければグローバルな random
 
     def select_action(self, observation, legal_actions=None):
         if legal_actions:
             # legal_actionsの中から階段優先で選択
             straights = [a for a in legal_actions if a and len(a) >= 3 and self._is_straight(a)]
             if straights:
-                return random.choice(straights)
+                return self.rng.choice(straights)
             # ペア・スリーカード
             pairs = [a for a in legal_actions if a and len(a) >= 2 and self._is_pair(a)]
             if pairs:
-                return random.choice(pairs)
+                return self.rng.choice(pairs)
             # 単体
             singles = [a for a in legal_actions if a and len(a) == 1 and not a[0].is_joker]
             if singles:
-                return random.choice(singles)
+                return self.rng.choice(singles)
             # ジョーカー単体
             jokers = [a for a in legal_actions if a and len(a) == 1 and a[0].is_joker]
             if jokers:
-                return random.choice(jokers)
+                return self.rng.choice(jokers)
             # パス
             if None in legal_actions:
                 return None
-            return random.choice(legal_actions)
+            return self.rng.choice(legal_actions)
         # legal_actionsがなければ従来通り
         hand = observation['hand']
         field = observation['field'] if 'field' in observation else []
@@ -52,6 +64,14 @@ class StraightAgent:
                 return [card]
         return None
 
+    def select_actions(self, obs_batch, mask_batch):
+        """
+        バッチ版: 各ゲームで優先度が一番高い種類の合法手から一様に選んだ行動番号 (N,)
+        """
+        priority = np.where(mask_batch, ACTION_PRIORITY[None, :], np.int8(127))
+        best = priority.min(axis=1)
+        return choose_uniform(priority == best[:, None], numpy_rng(self))
+
     def _is_pair(self, cards):
         if not cards or len(cards) < 2:
             return False
@@ -66,40 +86,11 @@ class StraightAgent:
         return all(c.is_joker or c.rank == rank for c in cards)
 
     def _find_straights(self, hand):
-        from collections import defaultdict
-        suit_map = defaultdict(list)
-        jokers = []
-        for card in hand:
-            if card.is_joker:
-                jokers.append(card)
-            else:
-                suit_map[card.suit].append(card)
-        straights = []
-        for suit, cards_in_suit in suit_map.items():
-            ranks = sorted([c.rank for c in cards_in_suit])
-            n = len(cards_in_suit) + len(jokers)
-            for length in range(5, 2, -1):
-                for start in range(1, 15 - length):
-                    expected = [(start + i - 1) % 13 + 1 for i in range(length)]
-                    temp = []
-                    used_jokers = 0
-                    available_cards = cards_in_suit[:]
-                    available_jokers = jokers[:]
-                    for val in expected:
-                        found = False
-                        for i, c in enumerate(available_cards):
-                            if c.rank == val:
-                                temp.append(available_cards.pop(i))
-                                found = True
-                                break
-                        if not found:
-                            if used_jokers < len(available_jokers):
-                                temp.append(available_jokers.pop(0))
-                                used_jokers += 1
-                            else:
-                                break
-                    if len(temp) == length:
-                        straights.append(temp)
+        """
+        手札で組める階段（長い順）。列挙は game.hand_analysis のキャッシュを引くだけ
+        """
+        straights = [[card_from_id(i) for i in ACTION_CARD_IDS[action]] for action in hand_straights(hand)]
+        straights.sort(key=len, reverse=True)
         return straights
 
     def _is_valid_play(self, cards, field):
@@ -0,0 +1,284 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+from game.environment import DaifugoSimpleEnv
+from game.rules import RuleChecker, clear_caches
+from game.player import Player
+from game.card import CardDeck
+from game.logger import headless_logger
+from agents.random_agent import RandomAgent
+from agents.rule_based_agent import RuleBasedAgent
+from agents.straight_agent import StraightAgent
+
+# -----------------------------
+# シミュレータのベンチマーク
+# - DaifugoSimpleEnv のエージェント構成ごとの games/s, steps/s
+# - RuleChecker / 合法手生成 / カード交換のマイクロベンチマーク（固定シードの局面）
+# - 1000ゲームあたりのピークメモリ
+# 結果はJSONで書き出し、保存済みのベースラインと比較して遅くなった項目を報告する
+# 使い方（リポジトリ直下で）: python -m benchmarks.run_benchmarks [--quick] [--output result.json] [--threshold 0.2]
+# -----------------------------
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# 計測するエージェント構成
+AGENT_MIXES = {
+    'straight': [StraightAgent] * 4,
+    'random': [RandomAgent] * 4,
+    'rule_based': [RuleBasedAgent] * 4,
+    'main_mix': [RandomAgent, RandomAgent, RuleBasedAgent, RuleBasedAgent],  # main.py と同じ構成
+}
+
+SEED = 0
+# ルール判定を測る局面数（cold の時間は局面の集合で変わるので、--quick でも同じ局面で測る）
+RULE_POSITIONS = 1000
+# メモリ計測のゲーム数（ルール判定のキャッシュが埋まるにつれてピークが伸びるので、--quick でも同じ数で測る）
+MEMORY_GAMES = 1000
+
+
+def _seed(seed):
+    random.seed(seed)
+    np.random.seed(seed)
+
+
+def _play_games(env, num_games):
+    steps = 0
+    for _ in range(num_games):
+        env.reset()
+        done = False
+        while not done:
+            _, _, done = env.step()
+            steps += 1
+    return steps
+
+
+def bench_env_throughput(num_games):
+    """
+    エージェント構成ごとの games/s, steps/s
+    """
+    results = {}
+    for name, agent_classes in AGENT_MIXES.items():
+        _seed(SEED)
+        env = DaifugoSimpleEnv(num_players=4, agent_classes=agent_classes, headless=True)
+        start = time.perf_counter()
+        steps = _play_games(env, num_games)
+        elapsed = time.perf_counter() - start
+        results[f'env.{name}.games_per_sec'] = _metric(num_games / elapsed, 'games/s', higher_is_better=True)
+        results[f'env.{name}.steps_per_sec'] = _metric(steps / elapsed, 'steps/s', higher_is_better=True)
+    return results
+
+
+def collect_positions(num_positions):
+    """
+    固定シードの対戦から (手番の手札, 場, 革命フラグ) の局面を集める
+    """
+    _seed(SEED)
+    env = DaifugoSimpleEnv(num_players=4, agent_classes=AGENT_MIXES['main_mix'], headless=True)
+    positions = []
+    while len(positions) < num_positions:
+        env.reset()
+        done = False
+        while not done and len(positions) < num_positions:
+            game = env.game
+            hand = list(game.players[game.turn].hand)
+            positions.append((hand, game.current_field[:], game.rule_checker.revolution))
+            _, _, done = env.step()
+    return positions
+
+
+def _time_calls(func, args_list, repeat, setup=None):
+    """
+    args_list の各引数で func を1周呼び出すのを repeat 回行い、最速の周の1回あたりのナノ秒を返す。
+    setup を渡すと各周の前に（計測の外で）呼ぶ
+    """
+    best = None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        for args in args_list:
+            func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(args_list) * 1e9
+
+
+def bench_rules(num_positions, repeat):
+    """
+    RuleChecker.is_valid_move / is_straight と DaifugoSimpleEnv._generate_legal_actions の1回あたりの時間。
+    is_valid_move は結果をキャッシュするので、周ごとにキャッシュを捨てた時間（cold）と
+    全て当たる時間（warm）を分けて測る
+    """
+    positions = collect_positions(num_positions)
+    env = DaifugoSimpleEnv(num_players=4, headless=True)
+    rule_checker = env.game.rule_checker
+    # is_valid_move: 各局面の合法手候補（索引なしで生成）を場に対して判定する
+    move_args = []
+    straight_args = []
+    legal_args = []
+    for hand, field, revolution in positions:
+        rule_checker.revolution = revolution
+        for action in env._generate_legal_actions(hand, field):
+            if action is not None:
+                move_args.append((action, field))
+                straight_args.append((action,))
+        legal_args.append((hand, field))
+    rule_checker.revolution = False
+    cold = _time_calls(rule_checker.is_valid_move, move_args, repeat, setup=clear_caches)
+    _time_calls(rule_checker.is_valid_move, move_args, 1)  # キャッシュを満たしておく
+    warm = _time_calls(rule_checker.is_valid_move, move_args, repeat)
+    return {
+        'rules.is_valid_move_cold_ns': _metric(cold, 'ns/call'),
+        'rules.is_valid_move_warm_ns': _metric(warm, 'ns/call'),
+        'rules.is_straight_ns': _metric(_time_calls(rule_checker.is_straight, straight_args, repeat), 'ns/call'),
+        'env.generate_legal_actions_ns': _metric(
+            _time_calls(env._generate_legal_actions, legal_args, repeat), 'ns/call'
+        ),
+    }
+
+
+def bench_exchange(num_deals, repeat):
+    """
+    RuleChecker.exchange_cards_by_rankings の1回あたりの時間（固定シードの配札）
+    """
+    _seed(SEED)
+    rule_checker = RuleChecker(logger=headless_logger())  # 交換内容のログは出さない
+    deck = CardDeck()
+    deals = []
+    for _ in range(num_deals):
+        deck.shuffle()
+        hands = [deck.cards[i::4] for i in range(4)]
+        rankings = random.sample(range(4), 4)
+        deals.append((hands, rankings))
+    # 交換は手札を書き換えるので、周ごとに手札を複製してから計測する
+    best = None
+    for _ in range(repeat):
+        args_list = [
+            ([Player(player_id=i, hand=list(hand)) for i, hand in enumerate(hands)], rankings)
+            for hands, rankings in deals
+        ]
+        elapsed = _time_calls(rule_checker.exchange_cards_by_rankings, args_list, 1)
+        best = elapsed if best is None else min(best, elapsed)
+    return {
+        'rules.exchange_cards_by_rankings_ns': _metric(best, 'ns/call'),
+    }
+
+
+def bench_memory(num_games):
+    """
+    num_games ゲームを続けて行ったときのピークメモリ（tracemalloc で計測。前のベンチマークで埋まったキャッシュは捨ててから測る）
+    """
+    _seed(SEED)
+    clear_caches()
+    tracemalloc.start()
+    env = DaifugoSimpleEnv(num_players=4, agent_classes=AGENT_MIXES['main_mix'], headless=True)
+    _play_games(env, num_games)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        f'memory.peak_mb_per_{num_games}_games': _metric(peak / (1024 * 1024), 'MB'),
+    }
+
+
+def _metric(value, unit, higher_is_better=False):
+    return {'value': value, 'unit': unit, 'higher_is_better': higher_is_better}
+
+
+def run_all(quick=False):
+    """
+    すべてのベンチマークを実行して結果の辞書を返す（quick=True なら回数を減らす）
+    """
+    num_games = 50 if quick else 300
+    results = {}
+    results.update(bench_env_throughput(num_games))
+    results.update(bench_rules(num_positions=RULE_POSITIONS, repeat=5))
+    results.update(bench_exchange(num_deals=200, repeat=5))
+    results.update(bench_memory(MEMORY_GAMES))
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'quick': quick,
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+
+
+def compare_with_baseline(report, baseline, threshold):
+    """
+    ベースラインより threshold（割合）を超えて悪化した項目を返す。
+    戻り値: [(名前, ベースライン値, 今回の値, 悪化率)]
+    """
+    regressions = []
+    for name, base in baseline['results'].items():
+        current = report['results'].get(name)
+        if current is None or base['value'] <= 0:
+            continue
+        if base['higher_is_better']:
+            change = (base['value'] - current['value']) / base['value']
+        else:
+            change = (current['value'] - base['value']) / base['value']
+        if change > threshold:
+            regressions.append((name, base['value'], current['value'], change))
+    return regressions
+
+
+def _write_json(path, report):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+        f.write('\n')
+
+
+def print_report(report, baseline=None):
+    print(f"{'benchmark':45s} {'value':>14s}  unit       {'baseline':>14s}")
+    for name, metric in report['results'].items():
+        base = baseline['results'].get(name) if baseline else None
+        base_str = f"{base['value']:14.1f}" if base else ' ' * 14
+        print(f"{name:45s} {metric['value']:14.1f}  {metric['unit']:10s} {base_str}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='大富豪シミュレータのベンチマーク')
+    parser.add_argument('--quick', action='store_true', help='回数を減らして短時間で実行する')
+    parser.add_argument('--output', default=None, help='結果JSONの出力先')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='比較するベースラインJSON')
+    parser.add_argument('--threshold', type=float, default=0.2, help='悪化とみなす割合（0.2 = 20%%）')
+    parser.add_argument('--update-baseline', action='store_true', help='今回の結果をベースラインとして保存する')
+    args = parser.parse_args(argv)
+
+    report = run_all(quick=args.quick)
+    baseline = None
+    if os.path.exists(args.baseline) and not args.update_baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.output:
+        _write_json(args.output, report)
+    if args.update_baseline:
+        _write_json(args.baseline, report)
+        print(f"ベースラインを更新しました: {args.baseline}")
+        return 0
+    if baseline is None:
+        return 0
+    regressions = compare_with_baseline(report, baseline, args.threshold)
+    if regressions:
+        print(f"\n⚠ ベースラインより {args.threshold:.0%} 以上悪化した項目:")
+        for name, base, current, change in regressions:
+            print(f"  {name}: {base:.1f} → {current:.1f} ({change:+.0%})")
+        return 1
+    print("\nベースラインからの悪化はありません")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
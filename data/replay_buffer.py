@@ -0,0 +1,388 @@
+import json
+import os
+import numpy as np
+from game.bitmask import mask_from_strs
+from game.observation import BatchObservationEncoder, observation_size
+from game.action_space import NUM_ACTIONS
+from data.trajectory_writer import iter_trajectory_shards
+
+# -----------------------------
+# 学習データのリプレイバッファ（ローカルディスク上のメモリマップ配列）
+# 1行 = 1手番: 観測テンソル / 合法手マスク / 選んだ行動番号 / value_target / value_weight / 優先度
+# 列ごとに固定 dtype の np.memmap ファイルを持ち、RAM に載らない件数でもページキャッシュ経由で読み書きする。
+# 容量を超えたら古い行から上書きするリングバッファ。サンプリングは一様と優先度付き（PER）の2通り。
+# 書き込むのは1プロセスだけ、読み込み（サンプリング）は何プロセスからでもよい:
+#   書き込み側は ヘッダの reserved を進める → 行を書く → committed を進める の順で更新し、
+#   読み込み側はコピーの前後でヘッダを読んで、コピー中に上書きされた行を含むバッチを引き直す。
+# 行番号（indices）はリングの位置ではなく追加順の通し番号（上書きされた行を区別できる）。
+# -----------------------------
+
+META_FILE = 'meta.json'
+HEADER_FILE = 'header.bin'
+FORMAT_VERSION = 1
+
+# ヘッダ（int64）の並び
+HEADER_COMMITTED = 0  # 書き込みが終わった行数（通し番号）
+HEADER_RESERVED = 1  # 書き込み中を含む行数（committed 以上）
+HEADER_PRIORITY_VERSION = 2  # 優先度を更新するたびに増やす（読み込み側のキャッシュの無効化用）
+HEADER_SIZE = 4
+
+# 観測は手札枚数以外 0/1 なので uint8 で持ち、サンプル時に float32 に戻す（ディスク・ページキャッシュが 1/4 で済む）
+OBS_DTYPE = np.uint8
+
+# 優先度の下限（0 の行も引かれうるようにする）
+PRIORITY_EPS = 1e-6
+
+# コピー中に上書きされた場合に引き直す回数の上限
+MAX_SAMPLE_RETRIES = 8
+
+# 一括読み込み・区間の書き込みで1回にエンコードする行数
+ENCODE_CHUNK_SIZE = 4096
+
+
+def _column_specs(num_players):
+    """
+    列名 → (dtype, 1行あたりの形)
+    """
+    return {
+        'obs': (OBS_DTYPE, (observation_size(num_players),)),
+        'mask': (np.bool_, (NUM_ACTIONS,)),
+        'action': (np.int16, ()),
+        'value_target': (np.float32, ()),
+        'value_weight': (np.float32, ()),
+        'priority': (np.float32, ()),
+    }
+
+
+def encode_steps(encoder, hand, action_taken, field, played, hand_counts, revolution, passed, seats):
+    """
+    手番ごとの整数エンコード（シャードの列と同じ形）から、手を選んだ時点の観測テンソル (n, size) を作る。
+    hand, action_taken, field, played: (n,) uint64、hand_counts: (n, num_players)、
+    revolution: (n,) プレイ前の革命、passed: (n,) プレイ前のパス状況（プレイヤーIDのビット）、seats: (n,) 手番
+    レコードの手札・手札枚数はプレイ後なので、手札は出したカードを戻して使う
+    （観測に入るのは他プレイヤーの枚数だけで、これはプレイの前後で変わらない）
+    """
+    hand = np.asarray(hand, dtype=np.uint64) | np.asarray(action_taken, dtype=np.uint64)
+    passed_flags = (np.asarray(passed, dtype=np.int64)[:, None] >> np.arange(encoder.num_players)[None, :]) & 1
+    return encoder.encode(hand, field, played, hand_counts, revolution, passed_flags.astype(bool), seats)
+
+
+def _check_actions(action):
+    """
+    行動番号の列を int64 にして返す。行動空間の外の番号（選んだ行動が分からない -1 など）があれば ValueError
+    （方策の損失で最後のロジットを学習してしまうので、黙って追加しない）
+    """
+    action = np.asarray(action, dtype=np.int64)
+    if len(action) and (action.min() < 0 or action.max() >= NUM_ACTIONS):
+        raise ValueError(f"行動番号が行動空間の外です: {int(action.min())}〜{int(action.max())}")
+    return action
+
+
+def _value_columns(value_target, value_weight):
+    """
+    評価外（value_target が NaN）の行は value_target 0、value_weight 0 にする（損失に入らない）
+    """
+    value_target = np.asarray(value_target, dtype=np.float32)
+    missing = np.isnan(value_target)
+    return np.where(missing, 0.0, value_target), np.where(missing, 0.0, np.asarray(value_weight, dtype=np.float32))
+
+
+class MemmapReplayBuffer:
+    """
+    メモリマップ配列のリプレイバッファ。
+    directory にバッファがなければ capacity 行分のファイルを作り、あれば開いて続きから追加する。
+    mode='r' で開くと読み込み専用（サンプリングだけ。学習データローダーのワーカーなど別プロセス用）。
+    write_stage を持つので DaifugoSimpleEnv(record_sink=buffer) にそのまま渡せる。
+    """
+
+    def __init__(self, directory, capacity=None, num_players=4, mode='r+', seed=None):
+        if mode not in ('r', 'r+'):
+            raise ValueError(f"mode は 'r' か 'r+' です: {mode}")
+        self.directory = directory
+        self.mode = mode
+        self.rng = np.random.default_rng(seed)
+        meta_path = os.path.join(directory, META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            if capacity is not None and capacity != meta['capacity']:
+                raise ValueError(f"既存のバッファの容量は {meta['capacity']} です: capacity={capacity}")
+            create = False
+        else:
+            if mode == 'r':
+                raise FileNotFoundError(f"リプレイバッファがありません: {directory}")
+            if capacity is None or capacity <= 0:
+                raise ValueError("新しくバッファを作るには capacity（正の行数）が必要です")
+            meta = {
+                'version': FORMAT_VERSION,
+                'capacity': int(capacity),
+                'num_players': num_players,
+                'obs_size': observation_size(num_players),
+                'num_actions': NUM_ACTIONS,
+            }
+            create = True
+        if meta['num_actions'] != NUM_ACTIONS:
+            raise ValueError(f"行動空間の大きさが違います: バッファ {meta['num_actions']}, 現在 {NUM_ACTIONS}")
+        self.capacity = meta['capacity']
+        self.num_players = meta['num_players']
+        self.columns = {}
+        file_mode = 'w+' if create else mode
+        if create:
+            os.makedirs(directory, exist_ok=True)
+        for name, (dtype, shape) in _column_specs(self.num_players).items():
+            self.columns[name] = np.memmap(
+                os.path.join(directory, f'{name}.bin'), dtype=dtype, mode=file_mode, shape=(self.capacity,) + shape,
+            )
+        self.header = np.memmap(os.path.join(directory, HEADER_FILE), dtype=np.int64, mode=file_mode, shape=(HEADER_SIZE,))
+        if create:
+            # 列とヘッダを作り終えてからメタ情報を置く（メタ情報があれば開ける状態になっている）
+            self.flush()
+            tmp_path = meta_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(meta, f, indent=2)
+            os.replace(tmp_path, meta_path)
+        size = len(self)
+        self.max_priority = float(self.columns['priority'][:size].max()) if size else 1.0
+        self._encoder = None
+        self._priority_cache = None  # (low, committed, 優先度の版, alpha) → 累積和
+
+    def __len__(self):
+        return min(int(self.header[HEADER_COMMITTED]), self.capacity)
+
+    @property
+    def total_added(self):
+        """
+        これまでに追加した行数（上書きされた分も含む）
+        """
+        return int(self.header[HEADER_COMMITTED])
+
+    # --- 書き込み ---
+    def _check_writable(self):
+        if self.mode == 'r':
+            raise PermissionError("読み込み専用で開いたバッファには書き込めません")
+
+    def add_batch(self, obs, mask, action, value_target, value_weight, priority=None):
+        """
+        n 行をまとめて追加する（容量を超えた分は古い行から上書き）。
+        obs: (n, size)、mask: (n, NUM_ACTIONS) bool、action: (n,) 選んだ行動番号（行動空間外の番号は ValueError）、
+        value_target / value_weight: (n,)（value_target が NaN の行は重み0）、priority: (n,)（省略時はこれまでの最大値）
+        戻り値: 追加した行の通し番号 (n,)
+        """
+        self._check_writable()
+        n = len(action)
+        action = _check_actions(action)
+        value_target, value_weight = _value_columns(value_target, value_weight)
+        if priority is None:
+            priority = np.full(n, self.max_priority, dtype=np.float32)
+        else:
+            priority = np.maximum(np.abs(np.asarray(priority, dtype=np.float32)), PRIORITY_EPS)
+            self.max_priority = max(self.max_priority, float(priority.max(initial=0.0)))
+        values = {
+            'obs': obs, 'mask': mask, 'action': action, 'value_target': value_target, 'value_weight': value_weight,
+            'priority': priority,
+        }
+        start = int(self.header[HEADER_COMMITTED])
+        # 容量より多ければ最後の capacity 行だけ書けば同じ
+        skip = max(0, n - self.capacity)
+        self.header[HEADER_RESERVED] = start + n
+        position = (start + skip) % self.capacity
+        done = skip
+        while done < n:
+            count = min(n - done, self.capacity - position)
+            for name, column in self.columns.items():
+                column[position:position + count] = values[name][done:done + count]
+            done += count
+            position = 0
+        self.header[HEADER_COMMITTED] = start + n
+        return np.arange(start, start + n, dtype=np.int64)
+
+    def add(self, obs, mask, action, value_target, value_weight, priority=None):
+        """
+        1行を追加する（戻り値: 通し番号）
+        """
+        return int(self.add_batch(
+            np.asarray(obs)[None], np.asarray(mask)[None], [action], [np.nan if value_target is None else value_target],
+            [value_weight], None if priority is None else [priority],
+        )[0])
+
+    def _encode(self, *steps):
+        if self._encoder is None:
+            self._encoder = BatchObservationEncoder(ENCODE_CHUNK_SIZE, self.num_players)
+        return encode_steps(self._encoder, *steps)
+
+    def _add_steps(self, steps, masks):
+        """
+        整数エンコードの列 steps（シャードと同じ列名）と合法手マスク (n, NUM_ACTIONS) を ENCODE_CHUNK_SIZE 行ずつ追加する
+        """
+        n = len(steps['player_id'])
+        # 途中まで書いてから失敗しないよう、先に全行の行動番号を確かめる
+        action = _check_actions(steps['action_index'])
+        # 選んだ行動が合法手マスクにない行は、マスクか行動番号のどちらかが示した手と食い違っている
+        outside = ~masks[np.arange(n), action]
+        if outside.any():
+            row = int(np.flatnonzero(outside)[0])
+            raise ValueError(f"選んだ行動が合法手マスクにありません: {outside.sum()} 行（最初は {row} 行目、行動番号 {action[row]}）")
+        for start in range(0, n, ENCODE_CHUNK_SIZE):
+            part = slice(start, min(n, start + ENCODE_CHUNK_SIZE))
+            obs = self._encode(
+                steps['hand'][part], steps['action_taken'][part], steps['field'][part], steps['played'][part], steps['others_hand_counts'][part],
+                steps['revolution_before'][part], steps['passed'][part], steps['player_id'][part],
+            )
+            self.add_batch(
+                obs, masks[part], steps['action_index'][part], steps['value_target'][part], steps['value_weight'][part],
+            )
+        return n
+
+    def write_stage(self, stage_history):
+        """
+        報酬付与済みの区間レコード（DaifugoSimpleEnv.stage_history）を追加する。
+        マスクはレコードの legal_actions_mask（エージェントに示した合法手。obs['action_mask'] と同じ）
+        """
+        self._check_writable()
+        if not stage_history:
+            return
+        steps = {
+            'player_id': np.array([r['player_id'] for r in stage_history], dtype=np.int64),
+            'hand': np.array([mask_from_strs(r['obs']['hand']) for r in stage_history], dtype=np.uint64),
+            'field': np.array([mask_from_strs(r['obs']['field']) for r in stage_history], dtype=np.uint64),
+            'action_taken': np.array([mask_from_strs(r['action_taken'] or ()) for r in stage_history], dtype=np.uint64),
+            'played': np.array([r['obs']['played_mask'] for r in stage_history], dtype=np.uint64),
+            'others_hand_counts': np.array([r['obs']['others_hand_counts'] for r in stage_history], dtype=np.int64),
+            'revolution_before': np.array([r['obs']['revolution_before'] for r in stage_history], dtype=bool),
+            'passed': np.array([
+                sum(1 << pid for pid, flag in enumerate(r['obs']['passed']) if flag) for r in stage_history
+            ], dtype=np.int64),
+            'action_index': np.array([
+                -1 if r['action_index'] is None else r['action_index'] for r in stage_history
+            ], dtype=np.int16),
+            'value_target': np.array([
+                np.nan if r['value_target'] is None else r['value_target'] for r in stage_history
+            ], dtype=np.float32),
+            'value_weight': np.array([r['value_weight'] for r in stage_history], dtype=np.float32),
+        }
+        masks = np.stack([r['legal_actions_mask'] for r in stage_history])
+        self._add_steps(steps, masks)
+
+    def load_shards(self, directory):
+        """
+        TrajectoryShardWriter のシャードを番号順に一括で読み込んで追加する（1シャードずつ列のまま処理する）。
+        戻り値: 追加した行数
+        """
+        self._check_writable()
+        total = 0
+        for shard in iter_trajectory_shards(directory):
+            if int(shard['num_players']) != self.num_players:
+                raise ValueError(f"人数が違います: シャード {int(shard['num_players'])}, バッファ {self.num_players}")
+            n = len(shard['player_id'])
+            rows = np.repeat(np.arange(n), np.diff(shard['legal_offsets']))
+            masks = np.zeros((n, NUM_ACTIONS), dtype=bool)
+            masks[rows, _check_actions(shard['legal_action_ids'])] = True
+            total += self._add_steps(shard, masks)
+        return total
+
+    def update_priorities(self, indices, priorities):
+        """
+        通し番号 indices の行の優先度を更新する（既に上書きされた行は無視する）
+        """
+        self._check_writable()
+        indices = np.asarray(indices, dtype=np.int64)
+        priorities = np.maximum(np.abs(np.asarray(priorities, dtype=np.float32)), PRIORITY_EPS)
+        live = indices >= int(self.header[HEADER_COMMITTED]) - self.capacity
+        self.columns['priority'][indices[live] % self.capacity] = priorities[live]
+        self.max_priority = max(self.max_priority, float(priorities.max(initial=0.0)))
+        self.header[HEADER_PRIORITY_VERSION] += 1
+
+    # --- 読み込み ---
+    def _window(self):
+        """
+        今読める通し番号の範囲 [low, committed)（書き込み中の行が上書きする古い行は除く）。
+        reserved を先に読む（後に読むと、間に書き込みが進んだ分だけ範囲が空になりうる）
+        """
+        reserved = int(self.header[HEADER_RESERVED])
+        committed = int(self.header[HEADER_COMMITTED])
+        return max(0, reserved - self.capacity), committed
+
+    def _priority_cumsum(self, low, committed, alpha):
+        """
+        [low, committed) の優先度^alpha の累積和（ヘッダが変わるまで使い回す）
+        """
+        key = (low, committed, int(self.header[HEADER_PRIORITY_VERSION]), alpha)
+        cache = self._priority_cache
+        if cache is not None and cache[0] == key:
+            return cache[1], cache[2]
+        slots = np.arange(low, committed, dtype=np.int64) % self.capacity
+        probs = self.columns['priority'][slots].astype(np.float64) ** alpha
+        cumsum = np.cumsum(probs)
+        min_prob = probs.min() / cumsum[-1]
+        self._priority_cache = (key, cumsum, min_prob)
+        return cumsum, min_prob
+
+    def sample(self, batch_size, prioritized=False, alpha=0.6, beta=0.4, rng=None):
+        """
+        batch_size 行をランダムに引く（重複あり）。
+        prioritized=True なら優先度^alpha に比例して引き、重要度重み (N * P)^-beta / 最大値 を weights に入れる
+        （一様なら weights は全て 1）。
+        戻り値: {'obs' (B, size) float32, 'mask', 'action' (B,) int64, 'value_target', 'value_weight', 'weights',
+                'indices'（通し番号。update_priorities に渡す）}
+        """
+        rng = self.rng if rng is None else rng
+        for _ in range(MAX_SAMPLE_RETRIES):
+            low, committed = self._window()
+            if committed == 0:
+                raise ValueError("サンプルできる行がありません")
+            if committed <= low:
+                continue
+            if prioritized:
+                cumsum, min_prob = self._priority_cumsum(low, committed, alpha)
+                picks = np.searchsorted(cumsum, rng.random(batch_size) * cumsum[-1], side='right')
+                picks = np.minimum(picks, len(cumsum) - 1)
+                probs = np.diff(cumsum, prepend=0.0)[picks] / cumsum[-1]
+                count = committed - low
+                weights = ((count * probs) ** -beta / (count * min_prob) ** -beta).astype(np.float32)
+                indices = low + picks
+            else:
+                indices = rng.integers(low, committed, size=batch_size)
+                weights = np.ones(batch_size, dtype=np.float32)
+            slots = indices % self.capacity
+            batch = {
+                'obs': self.columns['obs'][slots].astype(np.float32),
+                'mask': np.array(self.columns['mask'][slots]),
+                'action': self.columns['action'][slots].astype(np.int64),
+                'value_target': np.array(self.columns['value_target'][slots]),
+                'value_weight': np.array(self.columns['value_weight'][slots]),
+                'weights': weights,
+                'indices': indices,
+            }
+            # コピーしている間に書き込み側が上書きを始めた行があれば引き直す
+            if indices.min() >= self._window()[0]:
+                return batch
+        raise RuntimeError("書き込みが速すぎてサンプルできませんでした（容量を増やしてください）")
+
+    # --- 後始末・プロセス間の受け渡し ---
+    def flush(self):
+        """
+        書き込んだ内容をディスクに書き出す（他プロセスからはページキャッシュ経由で flush 前から見える）
+        """
+        if self.mode == 'r':
+            return
+        for column in self.columns.values():
+            column.flush()
+        self.header.flush()
+
+    def close(self):
+        self.flush()
+        self.columns = {}
+        self.header = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __getstate__(self):
+        # 別プロセスへは開き直すための情報だけを渡す（ワーカー側は読み込み専用で開く）
+        return {'directory': self.directory}
+
+    def __setstate__(self, state):
+        self.__init__(state['directory'], mode='r')
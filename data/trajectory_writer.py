@@ -0,0 +1,226 @@
+import os
+import glob
+import numpy as np
+from game.bitmask import mask_from_strs
+
+# -----------------------------
+# 区間履歴（DaifugoSimpleEnv.stage_history）のレコードを
+# 整数エンコードした列形式で .npz シャードに追記保存する
+# -----------------------------
+
+FIELD_TYPES = ['empty', 'single', 'pair', 'straight']
+REASON_TAGS = [None, 'winner_in_stage', 'not_winner', 'already_won']
+
+# シャードのファイル名
+SHARD_PATTERN = 'shard_{:06d}.npz'
+
+# 1手あたりの固定列のおおよそのバイト数（シャードサイズの見積もり用）
+_FIXED_ROW_BYTES = 80
+
+
+def _players_to_bits(players):
+    bits = 0
+    for pid in players:
+        bits |= 1 << pid
+    return bits
+
+
+def _bits_to_players(bits, num_players):
+    return [pid for pid in range(num_players) if bits >> pid & 1]
+
+
+class TrajectoryShardWriter:
+    """
+    区間が終わるたびにレコードを受け取り、列ごとのバッファに整数で貯める。
+    バッファの見積もりサイズが max_shard_bytes を超えたら圧縮シャードとして書き出す。
+    保持するのは書き出し前の1シャード分だけなので、メモリ使用量は上限付き。
+    """
+
+    def __init__(self, directory, max_shard_bytes=64 * 1024 * 1024, num_players=4):
+        self.directory = directory
+        self.max_shard_bytes = max_shard_bytes
+        self.num_players = num_players
+        os.makedirs(directory, exist_ok=True)
+        # 既存シャードの後ろに追記する
+        self.shard_index = len(glob.glob(os.path.join(directory, 'shard_*.npz')))
+        self.total_steps = 0
+        self._reset_buffer()
+
+    def _reset_buffer(self):
+        self._columns = {
+            'game_id': [],
+            'stage_id': [],
+            'turn_idx': [],
+            'step_idx_in_stage': [],
+            'player_id': [],
+            'remaining_players': [],
+            'already_won': [],
+            'hand': [],
+            'field': [],
+            'revolution': [],
+            'others_hand_counts': [],
+            'played': [],
+            'passed': [],
+            'revolution_before': [],
+            'field_type': [],
+            'legal_count': [],
+            'action_taken': [],
+            'action_index': [],
+            'value_target': [],
+            'value_weight': [],
+            'is_terminal_in_stage': [],
+            'stage_winner': [],
+            'reason_tag': [],
+        }
+        self._legal_actions = []  # 全ステップ分の合法手マスクを連結（パスは0）
+        self._legal_action_ids = []  # 同じ並びの行動番号（game.action_space）
+        self._buffer_bytes = 0
+
+    def write_stage(self, stage_history):
+        """
+        報酬付与済みの区間レコードをバッファに追加する
+        """
+        columns = self._columns
+        for record in stage_history:
+            obs = record['obs']
+            legal = [mask_from_strs(a) if a is not None else 0 for a in record['legal_actions']]
+            columns['game_id'].append(record['game_id'] if record['game_id'] is not None else -1)
+            columns['stage_id'].append(record['stage_id'])
+            columns['turn_idx'].append(record['turn_idx'])
+            columns['step_idx_in_stage'].append(record['step_idx_in_stage'])
+            columns['player_id'].append(record['player_id'])
+            columns['remaining_players'].append(_players_to_bits(record['remaining_players']))
+            columns['already_won'].append(_players_to_bits(record['already_won']))
+            columns['hand'].append(mask_from_strs(obs['hand']))
+            columns['field'].append(mask_from_strs(obs['field']))
+            columns['revolution'].append(obs['revolution'])
+            columns['others_hand_counts'].append(obs['others_hand_counts'])
+            columns['played'].append(obs['played_mask'])
+            columns['passed'].append(_players_to_bits(pid for pid, flag in enumerate(obs['passed']) if flag))
+            columns['revolution_before'].append(obs['revolution_before'])
+            columns['field_type'].append(FIELD_TYPES.index(obs['field_type']))
+            columns['legal_count'].append(len(legal))
+            columns['action_taken'].append(
+                mask_from_strs(record['action_taken']) if record['action_taken'] is not None else 0
+            )
+            action_index = record.get('action_index')
+            columns['action_index'].append(action_index if action_index is not None else -1)
+            value_target = record['value_target']
+            columns['value_target'].append(np.nan if value_target is None else value_target)
+            columns['value_weight'].append(record['value_weight'])
+            columns['is_terminal_in_stage'].append(record['is_terminal_in_stage'])
+            columns['stage_winner'].append(record['stage_winner'] if record['stage_winner'] is not None else -1)
+            columns['reason_tag'].append(REASON_TAGS.index(record['reason_tag']))
+            self._legal_actions.extend(legal)
+            self._legal_action_ids.extend(record.get('legal_action_ids') or [-1] * len(legal))
+            self._buffer_bytes += _FIXED_ROW_BYTES + 10 * len(legal)
+        if self._buffer_bytes >= self.max_shard_bytes:
+            self.flush()
+
+    def flush(self):
+        """
+        バッファの内容を1つのシャードとして書き出す（一時ファイルに書いてからリネーム）
+        """
+        columns = self._columns
+        num_steps = len(columns['player_id'])
+        if num_steps == 0:
+            return None
+        legal_count = np.array(columns['legal_count'], dtype=np.int32)
+        arrays = {
+            'game_id': np.array(columns['game_id'], dtype=np.int64),
+            'stage_id': np.array(columns['stage_id'], dtype=np.int32),
+            'turn_idx': np.array(columns['turn_idx'], dtype=np.int32),
+            'step_idx_in_stage': np.array(columns['step_idx_in_stage'], dtype=np.int32),
+            'player_id': np.array(columns['player_id'], dtype=np.int8),
+            'remaining_players': np.array(columns['remaining_players'], dtype=np.uint8),
+            'already_won': np.array(columns['already_won'], dtype=np.uint8),
+            'hand': np.array(columns['hand'], dtype=np.uint64),
+            'field': np.array(columns['field'], dtype=np.uint64),
+            'revolution': np.array(columns['revolution'], dtype=bool),
+            'others_hand_counts': np.array(columns['others_hand_counts'], dtype=np.int8).reshape(num_steps, -1),
+            'played': np.array(columns['played'], dtype=np.uint64),
+            'passed': np.array(columns['passed'], dtype=np.uint8),
+            'revolution_before': np.array(columns['revolution_before'], dtype=bool),
+            'field_type': np.array(columns['field_type'], dtype=np.int8),
+            'legal_offsets': np.concatenate([[0], np.cumsum(legal_count, dtype=np.int64)]),
+            'legal_actions': np.array(self._legal_actions, dtype=np.uint64),
+            'legal_action_ids': np.array(self._legal_action_ids, dtype=np.int16),
+            'action_taken': np.array(columns['action_taken'], dtype=np.uint64),
+            'action_index': np.array(columns['action_index'], dtype=np.int16),
+            'value_target': np.array(columns['value_target'], dtype=np.float32),
+            'value_weight': np.array(columns['value_weight'], dtype=np.float32),
+            'is_terminal_in_stage': np.array(columns['is_terminal_in_stage'], dtype=bool),
+            'stage_winner': np.array(columns['stage_winner'], dtype=np.int8),
+            'reason_tag': np.array(columns['reason_tag'], dtype=np.int8),
+            'num_players': np.array(self.num_players, dtype=np.int8),
+        }
+        path = os.path.join(self.directory, SHARD_PATTERN.format(self.shard_index))
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(tmp_path, path)
+        self.shard_index += 1
+        self.total_steps += num_steps
+        self._reset_buffer()
+        return path
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def iter_trajectory_shards(directory):
+    """
+    シャードを番号順に1つずつ読み込み、列の辞書として返す
+    """
+    for path in sorted(glob.glob(os.path.join(directory, 'shard_*.npz'))):
+        with np.load(path) as shard:
+            yield {key: shard[key] for key in shard.files}
+
+
+def iter_trajectory_records(directory):
+    """
+    シャードを1手ずつのレコード（整数エンコードのまま）に展開して返す
+    """
+    for shard in iter_trajectory_shards(directory):
+        num_players = int(shard['num_players'])
+        offsets = shard['legal_offsets']
+        legal_action_ids = shard['legal_action_ids']
+        action_index = shard['action_index']
+        for i in range(len(shard['player_id'])):
+            value_target = float(shard['value_target'][i])
+            reason_tag = REASON_TAGS[shard['reason_tag'][i]]
+            yield {
+                'game_id': int(shard['game_id'][i]),
+                'stage_id': int(shard['stage_id'][i]),
+                'turn_idx': int(shard['turn_idx'][i]),
+                'step_idx_in_stage': int(shard['step_idx_in_stage'][i]),
+                'player_id': int(shard['player_id'][i]),
+                'remaining_players': _bits_to_players(int(shard['remaining_players'][i]), num_players),
+                'already_won': set(_bits_to_players(int(shard['already_won'][i]), num_players)),
+                'obs': {
+                    'hand': int(shard['hand'][i]),
+                    'field': int(shard['field'][i]),
+                    'revolution': bool(shard['revolution'][i]),
+                    'others_hand_counts': shard['others_hand_counts'][i].tolist(),
+                    'field_type': FIELD_TYPES[shard['field_type'][i]],
+                    # 手を選んだ時点の局面
+                    'played_mask': int(shard['played'][i]),
+                    'passed': [bool(int(shard['passed'][i]) >> pid & 1) for pid in range(num_players)],
+                    'revolution_before': bool(shard['revolution_before'][i]),
+                },
+                'legal_actions': shard['legal_actions'][offsets[i]:offsets[i + 1]].tolist(),
+                'legal_action_ids': legal_action_ids[offsets[i]:offsets[i + 1]].tolist(),
+                'action_taken': int(shard['action_taken'][i]),
+                'action_index': int(action_index[i]),
+                'value_target': None if np.isnan(value_target) else value_target,
+                'value_weight': float(shard['value_weight'][i]),
+                'is_terminal_in_stage': bool(shard['is_terminal_in_stage'][i]),
+                'stage_winner': int(shard['stage_winner'][i]),
+                'reason_tag': reason_tag,
+            }
@@ -0,0 +1,138 @@
+from itertools import combinations
+from .card import JokerSubstitute, SUITS
+from .bitmask import JOKER_ID, mask_of
+
+# 索引で保持する階段の長さ（DaifugoSimpleEnvの空場での生成範囲と同じ）
+INDEX_STRAIGHT_LENGTHS = (3, 4, 5)
+
+
+class HandActionIndex:
+    """
+    1人分の手札から作れる出し方の候補（単体・ペア等・階段）を保持する索引。
+    手札との差分をビットマスクで検出し、変化したランク・スートの候補だけを作り直す。
+    毎手番は場に対して候補を絞り込むだけで合法手が得られる。
+    候補の中身は DaifugoSimpleEnv._make_pair_sets / _make_straight_sets と同じ。
+    """
+
+    def __init__(self):
+        self.mask = 0  # 索引が反映している手札のマスク
+        self.singles = {}  # ビット番号 → [card]
+        self.pair_sets = {}  # ランク → ペア・スリーカード・フォーカードの候補リスト
+        self.straights = {}  # スート → {枚数: 階段の候補リスト}
+
+    def sync(self, hand):
+        """
+        手札との差分を反映する（出したカード・交換で移動したカード）
+        """
+        new_mask = hand.mask if hasattr(hand, 'mask') else mask_of(hand)
+        diff = self.mask ^ new_mask
+        if not diff:
+            return
+        self.mask = new_mask
+        # 手札をランク別・スート別に分類
+        jokers = []
+        rank_map = {}
+        suit_map = {}
+        for card in hand:
+            if card.is_joker:
+                jokers.append(card)
+            else:
+                rank_map.setdefault(card.rank, []).append(card)
+                suit_map.setdefault(card.suit, []).append(card)
+        # 単体
+        self.singles = {card.card_id: [card] for card in hand}
+        if diff >> JOKER_ID & 1:
+            # ジョーカーの増減はすべての組み合わせに影響する
+            ranks = set(rank_map) | set(self.pair_sets)
+            suits = set(suit_map) | set(self.straights)
+        else:
+            ranks = set()
+            suits = set()
+            for i in range(JOKER_ID):
+                if diff >> i & 1:
+                    ranks.add(i % 13 + 1)
+                    suits.add(SUITS[i // 13])
+        for rank in ranks:
+            if rank in rank_map:
+                self.pair_sets[rank] = self._make_pair_sets(rank, rank_map[rank], jokers)
+            else:
+                self.pair_sets.pop(rank, None)
+        # スートはSUITS順に更新する（文字列の集合の順序はハッシュのシードで変わり、候補の並びが実行ごとにずれるため）
+        for suit in sorted(suits, key=SUITS.index):
+            if suit in suit_map:
+                self.straights[suit] = {
+                    length: self._make_straight_sets(suit, suit_map[suit], jokers, length)
+                    for length in INDEX_STRAIGHT_LENGTHS
+                }
+            else:
+                self.straights.pop(suit, None)
+
+    def _make_pair_sets(self, rank, cards, jokers):
+        """
+        同ランクのカードから2〜4枚の組を作る（足りない分はジョーカーで補う）
+        """
+        candidates = []
+        for k in range(2, min(len(cards) + len(jokers), 4) + 1):
+            for comb in combinations(cards, min(len(cards), k)):
+                needed_jokers = k - len(comb)
+                if needed_jokers <= len(jokers):
+                    pair = list(comb)
+                    for _ in range(needed_jokers):
+                        pair.append(JokerSubstitute(rank, pair[0].suit))
+                    candidates.append(pair)
+        return candidates
+
+    def _make_straight_sets(self, suit, cards_in_suit, jokers, length):
+        """
+        同スートのカードからlength枚の階段を作る（欠けたランク1つまでジョーカーで補う）
+        """
+        by_rank = {}
+        for card in cards_in_suit:
+            by_rank.setdefault(card.rank, card)
+        max_jokers = 1 if jokers else 0
+        candidates = []
+        for start in range(1, 15 - length):
+            expected = [(start + i - 1) % 13 + 1 for i in range(length)]
+            if 2 in expected and expected[-1] != 2:
+                continue
+            missing = [val for val in expected if val not in by_rank]
+            if len(missing) > max_jokers:
+                continue
+            straight = []
+            for val in expected:
+                if val in by_rank:
+                    straight.append(by_rank[val])
+                else:
+                    straight.append(JokerSubstitute(val, suit))
+            candidates.append(straight)
+        return candidates
+
+    def candidates(self, field, kind):
+        """
+        場の種類に応じた候補を返す（kind: 'empty' / 'straight' / 'pair' / 'single'）。
+        並びは手札だけで決まる（ランク順・SUITS順。dict の挿入順は作り直した順に依存するので使わない）。
+        DaifugoSimpleEnv._generate_legal_actions は最後に行動番号順に並べ直すので、索引なしの生成と同じ並びになる
+        """
+        field_count = len(field)
+        if kind == 'empty':
+            result = list(self.singles.values())
+            for rank in sorted(self.pair_sets):
+                result += self.pair_sets[rank]
+            for length in INDEX_STRAIGHT_LENGTHS:
+                for by_length in self._straights_in_order():
+                    result += by_length[length]
+            return result
+        if kind == 'straight':
+            result = []
+            for by_length in self._straights_in_order():
+                result += by_length.get(field_count, [])
+            return result
+        if kind == 'pair':
+            return [s for rank in sorted(self.pair_sets) for s in self.pair_sets[rank] if len(s) == field_count]
+        return list(self.singles.values())
+
+    def _straights_in_order(self):
+        """
+        スートごとの階段の候補を SUITS 順に返す
+        """
+        return [self.straights[suit] for suit in SUITS if suit in self.straights]
@@ -0,0 +1,362 @@
+from itertools import combinations
+import numpy as np
+from .card import SUITS, RANKS, card_from_id
+from .bitmask import JOKER_ID
+from .rules import RuleChecker
+
+# -----------------------------
+# 全ての出し方を固定の番号で表す行動空間
+# 0: パス
+# 単体（52枚 + ジョーカー）、同ランク2〜4枚（ジョーカー代用を含む）、
+# 同スートの階段（3〜13枚、ジョーカー代用を含む）の順に番号を振る
+# 各行動はカード集合（ビットマスク）で一意に決まる
+# -----------------------------
+
+PASS_ACTION = 0
+
+# 行動の種類
+KIND_PASS = 0
+KIND_SINGLE = 1
+KIND_JOKER_SINGLE = 2
+KIND_SET = 3
+KIND_STRAIGHT = 4
+
+MIN_STRAIGHT_LENGTH = 3
+MAX_STRAIGHT_LENGTH = 13
+
+# 強さ順（3〜K, A, 2）に並べたランク
+STRENGTH_ORDER_RANKS = [3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 1, 2]
+
+
+def _enumerate_actions():
+    """
+    行動番号 → カードのビット番号タプル の一覧を作る。
+    カードの並びは 自然札（スート順・階段順）→ ジョーカー の順に固定する
+    """
+    actions = [()]
+    seen = {0}
+
+    def add(ids):
+        mask = 0
+        for i in ids:
+            mask |= 1 << i
+        if mask not in seen:
+            seen.add(mask)
+            actions.append(tuple(ids))
+
+    # 単体
+    for i in range(52):
+        add([i])
+    add([JOKER_ID])
+    # 同ランク2〜4枚（足りない1枚をジョーカーで代用する組も含む）
+    for rank in RANKS:
+        ids = [s * 13 + rank - 1 for s in range(len(SUITS))]
+        for k in range(2, 5):
+            for comb in combinations(ids, k):
+                add(list(comb))
+            for comb in combinations(ids, k - 1):
+                add(list(comb) + [JOKER_ID])
+    # 階段（強さ順に連続するランク = K,A,2 まで。1枚欠けをジョーカーで代用する組も含む）
+    for s in range(len(SUITS)):
+        for length in range(MIN_STRAIGHT_LENGTH, MAX_STRAIGHT_LENGTH + 1):
+            for start in range(len(STRENGTH_ORDER_RANKS) - length + 1):
+                ranks = STRENGTH_ORDER_RANKS[start:start + length]
+                ids = [s * 13 + rank - 1 for rank in ranks]
+                add(ids)
+                for missing in range(length):
+                    add(ids[:missing] + ids[missing + 1:] + [JOKER_ID])
+    return actions
+
+
+ACTION_CARD_IDS = _enumerate_actions()
+NUM_ACTIONS = len(ACTION_CARD_IDS)
+
+# カード集合のマスク → 行動番号
+MASK_TO_ACTION = {}
+for _index, _ids in enumerate(ACTION_CARD_IDS):
+    _mask = 0
+    for _i in _ids:
+        _mask |= 1 << _i
+    MASK_TO_ACTION[_mask] = _index
+
+
+def _build_descriptors():
+    """
+    各行動の判定用の特徴量を RuleChecker で求めて配列にする
+    """
+    rule_checker = RuleChecker()
+    masks = np.zeros(NUM_ACTIONS, dtype=np.uint64)
+    size = np.zeros(NUM_ACTIONS, dtype=np.int8)
+    kind = np.zeros(NUM_ACTIONS, dtype=np.int8)
+    strength = np.zeros(NUM_ACTIONS, dtype=np.int8)  # 自然札の強さ（同ランク・単体）
+    straight_max = np.zeros(NUM_ACTIONS, dtype=np.int8)  # 階段の最大ランク（革命なしの比較用）
+    straight_min = np.zeros(NUM_ACTIONS, dtype=np.int8)  # 階段の最小ランク（革命時の比較用）
+    lead_suit = np.full(NUM_ACTIONS, -1, dtype=np.int8)  # 階段のスート（FieldDescriptor.lead_suit と同じ）
+    is_8cut = np.zeros(NUM_ACTIONS, dtype=bool)
+    is_revolution = np.zeros(NUM_ACTIONS, dtype=bool)
+    is_two_joker_pair = np.zeros(NUM_ACTIONS, dtype=bool)  # 2 + ジョーカー のペア
+    for index, ids in enumerate(ACTION_CARD_IDS):
+        if not ids:
+            continue
+        cards = [card_from_id(i) for i in ids]
+        masks[index] = sum(1 << i for i in ids)
+        size[index] = len(cards)
+        naturals = [c for c in cards if not c.is_joker]
+        if naturals:
+            strength[index] = naturals[0].strength()
+            lead_suit[index] = SUITS.index(naturals[0].suit)
+        if len(cards) == 1:
+            kind[index] = KIND_JOKER_SINGLE if cards[0].is_joker else KIND_SINGLE
+        elif rule_checker.is_straight(cards):
+            kind[index] = KIND_STRAIGHT
+            ranks = rule_checker.get_straight_ranks(cards)
+            straight_max[index] = max(ranks)
+            straight_min[index] = min(ranks)
+        else:
+            kind[index] = KIND_SET
+            is_two_joker_pair[index] = (
+                len(cards) == 2 and len(naturals) == 1 and naturals[0].rank == 2
+            )
+        is_8cut[index] = rule_checker.is_8cut(cards)
+        rule_checker.revolution = False
+        is_revolution[index] = rule_checker.check_revolution(cards)
+    rule_checker.revolution = False
+    return {
+        'masks': masks,
+        'size': size,
+        'kind': kind,
+        'strength': strength,
+        'straight_max': straight_max,
+        'straight_min': straight_min,
+        'lead_suit': lead_suit,
+        'is_8cut': is_8cut,
+        'is_revolution': is_revolution,
+        'is_two_joker_pair': is_two_joker_pair,
+    }
+
+
+_DESCRIPTORS = _build_descriptors()
+ACTION_MASKS = _DESCRIPTORS['masks']
+ACTION_SIZE = _DESCRIPTORS['size']
+ACTION_KIND = _DESCRIPTORS['kind']
+ACTION_STRENGTH = _DESCRIPTORS['strength']
+ACTION_STRAIGHT_MAX = _DESCRIPTORS['straight_max']
+ACTION_STRAIGHT_MIN = _DESCRIPTORS['straight_min']
+ACTION_LEAD_SUIT = _DESCRIPTORS['lead_suit']
+ACTION_IS_8CUT = _DESCRIPTORS['is_8cut']
+ACTION_IS_REVOLUTION = _DESCRIPTORS['is_revolution']
+ACTION_IS_TWO_JOKER_PAIR = _DESCRIPTORS['is_two_joker_pair']
+
+
+def action_index_of(cards):
+    """
+    カードリスト（Noneはパス）を行動番号に変換する。行動空間にない組はNone
+    """
+    if not cards:
+        return PASS_ACTION
+    mask = 0
+    for card in cards:
+        mask |= 1 << card.card_id
+    return MASK_TO_ACTION.get(mask)
+
+
+def _compatibility_rows(field_actions, revolution):
+    """
+    場の行動番号・革命フラグごとに、各行動を出せるか（手札は考慮しない）を求める。
+    判定内容は RuleChecker.is_valid_move と同じ（出すカードの並びに依らない。tests/test_action_space.py で確認）
+    """
+    revolution = revolution[:, None]
+    empty = field_actions < 0
+    f = np.where(empty, PASS_ACTION, field_actions)
+    f_kind = ACTION_KIND[f][:, None]
+    f_size = ACTION_SIZE[f][:, None]
+    f_strength = ACTION_STRENGTH[f][:, None]
+    f_single = f_kind == KIND_SINGLE
+    f_joker = f_kind == KIND_JOKER_SINGLE
+    f_straight = f_kind == KIND_STRAIGHT
+    f_set = f_single | (f_kind == KIND_SET)
+
+    play_kind = ACTION_KIND[None, :]
+    size_ok = ACTION_SIZE[None, :] == f_size
+    # ジョーカー単体: 革命中は3の単体にのみ、通常時は任意の単体に出せる
+    joker_ok = f_joker | (f_single & np.where(revolution, f_strength < 2, True))
+    # 階段同士: 先頭スートが一致し、最大（革命時は最小）ランクで比較
+    straight_ok = (
+        f_straight
+        & (ACTION_LEAD_SUIT[None, :] == ACTION_LEAD_SUIT[f][:, None])
+        & np.where(
+            revolution,
+            ACTION_STRAIGHT_MIN[None, :] < ACTION_STRAIGHT_MIN[f][:, None],
+            ACTION_STRAIGHT_MAX[None, :] > ACTION_STRAIGHT_MAX[f][:, None],
+        )
+    )
+    # 単体・同ランク: 自然札の強さで比較（場がジョーカー単体なら場の強さは-1）
+    field_strength = np.where(f_joker, -1, f_strength)
+    set_ok = (
+        (f_set | f_joker)
+        & ~(ACTION_IS_TWO_JOKER_PAIR[f][:, None] & (ACTION_SIZE[None, :] == 2))
+        & np.where(revolution, ACTION_STRENGTH[None, :] < field_strength, ACTION_STRENGTH[None, :] > field_strength)
+    )
+    valid = size_ok & (
+        ((play_kind == KIND_JOKER_SINGLE) & joker_ok)
+        | ((play_kind == KIND_STRAIGHT) & straight_ok)
+        | (((play_kind == KIND_SINGLE) | (play_kind == KIND_SET)) & set_ok)
+    )
+    valid |= empty[:, None]
+    valid[:, PASS_ACTION] = True
+    return valid
+
+
+def _build_compatibility_table():
+    """
+    (革命フラグ, 場の行動番号+1) → 出せる行動 の表（行0は場が空）
+    """
+    fields = np.arange(-1, NUM_ACTIONS)
+    table = np.zeros((2, NUM_ACTIONS + 1, NUM_ACTIONS), dtype=bool)
+    for rev in (0, 1):
+        table[rev] = _compatibility_rows(fields, np.full(len(fields), bool(rev)))
+    return table
+
+
+# 場に対して出せる行動の表（初回利用時に構築）
+_COMPATIBILITY = None
+
+
+def compatibility_table():
+    global _COMPATIBILITY
+    if _COMPATIBILITY is None:
+        _COMPATIBILITY = _build_compatibility_table()
+    return _COMPATIBILITY
+
+
+def legal_action_mask_batch(hand_masks, field_actions, revolution):
+    """
+    複数ゲーム分の合法手マスクをまとめて求める。
+    hand_masks: (N,) uint64 手番プレイヤーの手札マスク
+    field_actions: (N,) int 場の行動番号（-1 = 場が空）
+    revolution: (N,) bool 革命中か
+    戻り値: (N, NUM_ACTIONS) bool（パスは常に合法）
+    判定内容は RuleChecker.is_valid_move と同じ
+    """
+    hand_masks = np.asarray(hand_masks, dtype=np.uint64)
+    field_actions = np.asarray(field_actions, dtype=np.int64)
+    revolution = np.asarray(revolution, dtype=np.int64)
+    # 手札に含まれているか
+    contained = np.bitwise_and(hand_masks[:, None], ACTION_MASKS[None, :])
+    contained = np.equal(contained, ACTION_MASKS[None, :])
+    contained &= compatibility_table()[revolution, field_actions + 1]
+    return contained
+
+
+def legal_action_mask(hand_mask, field_action, revolution):
+    """
+    1局面分の合法手マスク（legal_action_mask_batch の1件版）。
+    hand_mask: 手番プレイヤーの手札マスク（int）
+    field_action: 場の行動番号（-1 = 場が空）
+    戻り値: (NUM_ACTIONS,) bool
+    """
+    contained = np.bitwise_and(np.uint64(hand_mask), ACTION_MASKS) == ACTION_MASKS
+    contained &= compatibility_table()[int(bool(revolution)), field_action + 1]
+    return contained
+
+
+def actions_to_mask(action_ids):
+    """
+    行動番号のリストを (NUM_ACTIONS,) bool マスクにする
+    """
+    mask = np.zeros(NUM_ACTIONS, dtype=bool)
+    mask[list(action_ids)] = True
+    return mask
+
+
+# -----------------------------
+# DaifugoSimpleEnv の合法手生成が実際に作る手
+# legal_action_mask はルール上出せる手をすべて含むが、DaifugoSimpleEnv（_make_pair_sets / _make_straight_sets と
+# HandActionIndex）が作る手はその一部だけ:
+# - 階段は 3〜K の範囲だけ（A・2 を含まない）。場が空のときは3〜5枚だけ（階段の場では場と同じ枚数）
+# - ジョーカー入りの組は、そのランクの自然札を手札にある分だけ全部使うもの（♠5 ♥5 を持っていれば ♠5+JOKER は作らない）
+# - ジョーカー入りの階段は、ジョーカーが代わるカードを手札に持っていないもの
+# ペア・階段の場では出せる手があるときはパスできない（場が空・単体の場ではいつでもパスできる）
+# -----------------------------
+
+# 場が空のときに作る階段の長さ
+OFFERED_STRAIGHT_LENGTHS = (3, 4, 5)
+
+# 階段に使うランクの範囲
+OFFERED_STRAIGHT_RANKS = range(3, 14)
+
+
+def _build_offered_tables():
+    """
+    手札によらない部分（行動ごとに作りうるか）と、手札で決まる部分の判定用のマスクを作る
+    """
+    offered = np.ones(NUM_ACTIONS, dtype=bool)
+    natural_masks = np.zeros(NUM_ACTIONS, dtype=np.uint64)  # ジョーカーを除いたカードのマスク
+    rank_masks = np.zeros(NUM_ACTIONS, dtype=np.uint64)  # ジョーカー入りの組: そのランクの自然札4枚のマスク
+    fills = np.zeros((NUM_ACTIONS, 2), dtype=np.uint64)  # ジョーカー入りの階段: ジョーカーが代わりうるカード
+    for index, ids in enumerate(ACTION_CARD_IDS):
+        naturals = [i for i in ids if i != JOKER_ID]
+        natural_masks[index] = sum(1 << i for i in naturals)
+        has_joker = len(naturals) < len(ids)
+        if ACTION_KIND[index] == KIND_SET and has_joker:
+            rank = naturals[0] % 13 + 1
+            rank_masks[index] = sum(1 << (s * 13 + rank - 1) for s in range(len(SUITS)))
+        elif ACTION_KIND[index] == KIND_STRAIGHT:
+            ranks = sorted(i % 13 + 1 for i in naturals)
+            if not all(rank in OFFERED_STRAIGHT_RANKS for rank in ranks):
+                offered[index] = False
+            elif has_joker:
+                suit_base = naturals[0] // 13 * 13
+                if ranks[-1] - ranks[0] == len(ranks):
+                    # 間が1つ空いている: ジョーカーはその間のランク
+                    candidates = [rank for rank in range(ranks[0], ranks[-1]) if rank not in ranks]
+                else:
+                    # 連続している: ジョーカーは下か上の端
+                    candidates = [ranks[0] - 1, ranks[-1] + 1]
+                candidates = [rank for rank in candidates if rank in OFFERED_STRAIGHT_RANKS]
+                for slot, rank in enumerate(candidates):
+                    fills[index, slot] = 1 << (suit_base + rank - 1)
+                offered[index] = bool(candidates)
+    lead = offered & ((ACTION_KIND != KIND_STRAIGHT) | np.isin(ACTION_SIZE, OFFERED_STRAIGHT_LENGTHS))
+    return offered, lead, natural_masks, rank_masks, fills
+
+
+# 手札によらず作りうる行動（場があるとき / 場が空のとき）
+OFFERED_ACTIONS, OFFERED_LEAD_ACTIONS, _NATURAL_MASKS, _RANK_MASKS, _JOKER_FILLS = _build_offered_tables()
+_JOKER_SET = _RANK_MASKS != 0
+_JOKER_STRAIGHT = (_JOKER_FILLS != 0).any(axis=1)
+_ALL_ACTIONS = np.arange(NUM_ACTIONS)
+
+
+def offered_actions(hand_masks, action_ids, lead=False):
+    """
+    手札 hand_masks (N,) のそれぞれで、DaifugoSimpleEnv の合法手生成が action_ids (K,) の行動を作るか (N, K) bool。
+    場との相性・手札に含まれるかは見ないので legal_action_mask と組み合わせて使う。
+    lead=True は場が空のとき（階段は3〜5枚だけ）
+    """
+    hands = np.asarray(hand_masks, dtype=np.uint64)[:, None]
+    ids = np.asarray(action_ids, dtype=np.int64)
+    base = (OFFERED_LEAD_ACTIONS if lead else OFFERED_ACTIONS)[ids]
+    offered = np.repeat(base[None, :], len(hands), axis=0)
+    sets = _JOKER_SET[ids]
+    if sets.any():
+        set_ids = ids[sets]
+        offered[:, sets] &= (hands & _RANK_MASKS[set_ids]) == _NATURAL_MASKS[set_ids]
+    straights = _JOKER_STRAIGHT[ids]
+    if straights.any():
+        straight_fills = _JOKER_FILLS[ids[straights]][None, :, :]
+        missing = (straight_fills != 0) & ((hands[:, :, None] & straight_fills) == 0)
+        offered[:, straights] &= missing.any(axis=2)
+    return offered
+
+
+def offered_legal_action_mask(hand_mask, field_action, revolution):
+    """
+    DaifugoSimpleEnv が手番プレイヤーに示す合法手（obs['action_mask'] と同じ） (NUM_ACTIONS,) bool。
+    legal_action_mask のうち合法手生成が作る手だけを残し、ペア・階段の場で出せる手があればパスを除く
+    """
+    mask = legal_action_mask(hand_mask, field_action, revolution)
+    mask &= offered_actions([hand_mask], _ALL_ACTIONS, lead=field_action < 0)[0]
+    if field_action >= 0 and ACTION_KIND[field_action] in (KIND_SET, KIND_STRAIGHT) and mask[1:].any():
+        mask[PASS_ACTION] = False
+    return mask
@@ -0,0 +1,191 @@
+from .card import Card, SUITS, RANKS, JOKER_ID, NUM_CARD_IDS
+
+# -----------------------------
+# 54bit整数マスクによるカード集合表現
+# ビット番号は DaifugoSimpleEnv._encode_card と同じ（スート番号*13 + ランク-1、ジョーカー=53）
+# 52番は2枚目のジョーカー用に予約
+# -----------------------------
+
+# スート → スート番号
+SUIT_INDEX = {suit: i for i, suit in enumerate(SUITS)}
+
+FULL_MASK = (1 << NUM_CARD_IDS) - 1
+JOKER_MASK = 1 << JOKER_ID
+
+# 1スート分（13ランク）のビット幅
+SUIT_RANK_BITS = 0x1FFF
+
+# スートごとのマスク
+SUIT_MASKS = [SUIT_RANK_BITS << (13 * i) for i in range(len(SUITS))]
+
+# ランクごとのマスク（4スート分）
+RANK_MASKS = {
+    rank: sum(1 << (13 * i + rank - 1) for i in range(len(SUITS)))
+    for rank in RANKS
+}
+
+
+def card_id(card):
+    """
+    カードのビット番号（0〜53）を返す（Card.card_id と同じ）
+    """
+    return card.card_id
+
+
+# カードの表示文字列（'♠A', '♦10' など）→ ビット番号
+CARD_STR_TO_ID = {
+    str(Card(suit, rank)): SUIT_INDEX[suit] * 13 + (rank - 1)
+    for suit in SUITS for rank in RANKS
+}
+
+
+def card_id_from_str(text):
+    """
+    カードの表示文字列からビット番号を返す（'JOKER(♠5)' のような代用表示もジョーカー扱い）
+    """
+    if text.startswith('JOKER'):
+        return JOKER_ID
+    return CARD_STR_TO_ID[text]
+
+
+def mask_from_strs(texts):
+    """
+    カードの表示文字列リストをマスクに変換する
+    """
+    mask = 0
+    for text in texts:
+        mask |= 1 << card_id_from_str(text)
+    return mask
+
+
+def card_bit(card):
+    """
+    カード1枚分のマスクを返す
+    """
+    return 1 << card.card_id
+
+
+def mask_of(cards):
+    """
+    カードリストをマスクに変換する
+    """
+    mask = 0
+    for card in cards:
+        mask |= 1 << card.card_id
+    return mask
+
+
+def popcount(mask):
+    """
+    マスクに含まれるカード枚数
+    """
+    return mask.bit_count()
+
+
+def iter_ids(mask):
+    """
+    マスクに含まれるビット番号を小さい順に列挙する
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def suit_rank_mask(mask, suit_index):
+    """
+    指定スートのランク集合を13bitマスク（ビットi = ランクi+1）で返す
+    """
+    return (mask >> (13 * suit_index)) & SUIT_RANK_BITS
+
+
+def build_card_table(cards):
+    """
+    ビット番号 → Cardオブジェクトの対応表を作る（デッキのカードをそのまま使う）
+    """
+    table = [None] * NUM_CARD_IDS
+    for card in cards:
+        table[card_id(card)] = card
+    return table
+
+
+class BitmaskHand:
+    """
+    整数マスクで管理する手札。
+    list と同じ操作（len, in, 反復, remove, append, extend）を提供するので、
+    既存の Game / RuleChecker / エージェントのコードからはリストと同様に扱える。
+    追加・削除・所持判定はビット演算、枚数はpopcountで求める。
+    """
+
+    def __init__(self, card_table, mask=0):
+        self.card_table = card_table  # ビット番号 → Card
+        self.mask = mask
+        self._cards = None  # 反復用のカードリスト（マスク変更時に破棄）
+
+    def set_mask(self, mask):
+        """
+        手札をマスクで丸ごと置き換える
+        """
+        self.mask = mask
+        self._cards = None
+
+    def _card_list(self):
+        if self._cards is None:
+            table = self.card_table
+            self._cards = [table[i] for i in iter_ids(self.mask)]
+        return self._cards
+
+    # --- マスク操作 ---
+    def add_mask(self, mask):
+        self.set_mask(self.mask | mask)
+
+    def remove_mask(self, mask):
+        """
+        マスク分のカードを手札から取り除く（すべて手札にある場合のみ）
+        """
+        if self.mask & mask != mask:
+            raise ValueError("手札にないカードが含まれています")
+        self.set_mask(self.mask & ~mask)
+
+    def contains_mask(self, mask):
+        return self.mask & mask == mask
+
+    # --- list互換の操作 ---
+    def append(self, card):
+        self.set_mask(self.mask | card_bit(card))
+
+    def extend(self, cards):
+        self.set_mask(self.mask | mask_of(cards))
+
+    def remove(self, card):
+        bit = card_bit(card)
+        if not self.mask & bit:
+            raise ValueError(f"手札に {card} がありません")
+        self.set_mask(self.mask & ~bit)
+
+    def clear(self):
+        self.set_mask(0)
+
+    def __contains__(self, card):
+        return bool(self.mask & card_bit(card))
+
+    def __len__(self):
+        return self.mask.bit_count()
+
+    def __bool__(self):
+        return self.mask != 0
+
+    def __iter__(self):
+        return iter(self._card_list())
+
+    def __getitem__(self, index):
+        return self._card_list()[index]
+
+    def __delitem__(self, index):
+        cards = self._card_list()[index]
+        if not isinstance(cards, list):
+            cards = [cards]
+        self.set_mask(self.mask & ~mask_of(cards))
+
+    def __repr__(self):
+        return repr(self._card_list())
@@ -12,86 +12,167 @@ DAIFUGO_STRENGTH = {
     11: 9, 12: 10, 13: 11, 1: 12, 2: 13  # 1=A, 11=J, 12=Q, 13=K
 }
 
+# カードの整数ID（スート番号*13 + ランク-1、ジョーカー=53。52番は2枚目のジョーカー用に予約）
+JOKER_ID = 53
+NUM_CARD_IDS = 54
+
+# ジョーカー単体の強さ（最強）
+JOKER_STRENGTH = 15
+
+_RANK_STR = {1: 'A', 11: 'J', 12: 'Q', 13: 'K'}
+
+
+def rank_strength(rank):
+    """
+    ランクの強さ。3が最弱（1）、Kが11、Aが13、2が14
+    """
+    if rank == 1:  # A
+        return 13
+    if rank == 2:
+        return 14
+    return rank - 2  # 3→1, 4→2, ..., K→11
+
+
+def _rank_str(rank):
+    return _RANK_STR.get(rank, str(rank))
+
+
 # カード1枚を表すクラス
 class Card:
-    def __init__(self, suit=None, rank=None, is_joker=False):
-        self.suit = suit  # スート（♠, ♥, ♦, ♣）
-        self.rank = rank  # ランク（1〜13、またはNone）
-        self.is_joker = is_joker
-        # ジョーカーが何の代用か（ペアや階段で使うとき一時的にセット）
-        self.joker_as_suit = None
-        self.joker_as_rank = None
+    """
+    物理的なカード1枚。同じカードは常に同じオブジェクト（インターン済み）で、生成後は変更できない。
+    - card_id: 整数ID（同一判定・ビットマスクに使う）
+    - strength(): 事前計算済みの強さ
+    ジョーカーを何かの代用として扱うときは JokerSubstitute を使う（カード自体は書き換えない）。
+    """
+    __slots__ = ('suit', 'rank', 'is_joker', 'card_id', '_strength', '_text')
+
+    # ジョーカーの代用情報（物理カードは常に代用なし）
+    joker_as_suit = None
+    joker_as_rank = None
+
+    _interned = {}
+
+    def __new__(cls, suit=None, rank=None, is_joker=False):
+        if is_joker:
+            key = JOKER_ID
+        else:
+            if suit not in SUITS or rank not in RANKS:
+                raise ValueError(f"不正なカードです: suit={suit}, rank={rank}")
+            key = SUITS.index(suit) * 13 + (rank - 1)
+        card = cls._interned.get(key)
+        if card is None:
+            card = object.__new__(cls)
+            if is_joker:
+                values = (None, None, True, key, JOKER_STRENGTH, 'JOKER')
+            else:
+                values = (suit, rank, False, key, rank_strength(rank), f'{suit}{_rank_str(rank)}')
+            for name, value in zip(cls.__slots__, values):
+                object.__setattr__(card, name, value)
+            cls._interned[key] = card
+        return card
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Card は変更できません（ジョーカーの代用は JokerSubstitute を使う）")
+
+    def __delattr__(self, name):
+        raise AttributeError("Card は変更できません")
+
+    def __reduce__(self):
+        # pickle / copy / deepcopy でも同じオブジェクトを返す
+        return card_from_id, (self.card_id,)
 
     def strength(self):
         """
         大富豪ルールに基づくカードの強さを返す。
         Jokerは最強（15）、2が次に強く、3が最弱（1）
-        ただし、joker_as_rankがセットされていればその強さを返す
         """
-        if self.is_joker:
-            if self.joker_as_rank is not None:
-                # 代用するカードの強さ
-                if self.joker_as_rank == 1:
-                    return 13
-                elif self.joker_as_rank == 2:
-                    return 14
-                else:
-                    return self.joker_as_rank - 2
-            return 15  # Joker単体は最強
-        elif self.rank == 1:  # A
-            return 13
-        elif self.rank == 2:
-            return 14
-        else:
-            return self.rank - 2  # 3→1, 4→2, ..., K→12
+        return self._strength
 
-    def set_joker_substitute(self, rank, suit):
-        """
-        ジョーカーを特定のランク・スートの代用として使う場合にセットする
-        """
-        self.joker_as_rank = rank
-        self.joker_as_suit = suit
+    def __lt__(self, other):
+        # カードの強さに基づいて比較
+        return self._strength < other.strength()
+
+    def __repr__(self):
+        #カードの表示形式
+        return self._text
+
+
+class JokerSubstitute:
+    """
+    ジョーカーを特定のランク・スートの代用として扱うときの解釈オブジェクト。
+    カードとしての属性（is_joker, card_id, suit, rank）はジョーカーそのままで、
+    代用先は joker_as_rank / joker_as_suit に持つ。強さは代用先のランクの強さ。
+    """
+    __slots__ = ('joker_as_rank', 'joker_as_suit')
+
+    suit = None
+    rank = None
+    is_joker = True
+    card_id = JOKER_ID
+
+    def __init__(self, rank, suit):
+        object.__setattr__(self, 'joker_as_rank', rank)
+        object.__setattr__(self, 'joker_as_suit', suit)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("JokerSubstitute は変更できません")
 
-    def reset_joker_substitute(self):
+    def __reduce__(self):
+        return JokerSubstitute, (self.joker_as_rank, self.joker_as_suit)
+
+    @property
+    def card(self):
         """
-        ジョーカーの代用情報をリセット（手札に戻す場合など）
+        元の物理カード（ジョーカー）
         """
-        self.joker_as_rank = None
-        self.joker_as_suit = None
+        return JOKER
+
+    def strength(self):
+        return rank_strength(self.joker_as_rank)
 
     def __lt__(self, other):
-        # カードの強さに基づいて比較
         return self.strength() < other.strength()
 
-    def __repr__(self):
-        #カードの表示形式
-        if self.is_joker:
-            if self.joker_as_suit is not None and self.joker_as_rank is not None:
-                rank_str = { 1: 'A', 11: 'J', 12: 'Q', 13: 'K'}.get(self.joker_as_rank, str(self.joker_as_rank))
-                return f'JOKER({self.joker_as_suit}{rank_str})'
-            return 'JOKER'
-        rank_str = { 1: 'A', 11: 'J', 12: 'Q', 13: 'K'}.get(self.rank, str(self.rank))
-        return f'{self.suit}{rank_str}'
-
     def __eq__(self, other):
-        # カードの等価性を比較
-        if not isinstance(other, Card):
-            return False
         return (
-            self.suit == other.suit and
-            self.rank == other.rank and
-            self.is_joker == other.is_joker and
-            self.joker_as_suit == other.joker_as_suit and
-            self.joker_as_rank == other.joker_as_rank
+            isinstance(other, JokerSubstitute)
+            and self.joker_as_rank == other.joker_as_rank
+            and self.joker_as_suit == other.joker_as_suit
         )
 
-# トランプのデッキを表すクラス（ジョーカー2枚を含む）
+    def __hash__(self):
+        return hash((JOKER_ID, self.joker_as_rank, self.joker_as_suit))
+
+    def __repr__(self):
+        return f'JOKER({self.joker_as_suit}{_rank_str(self.joker_as_rank)})'
+
+
+# 全カード（通常カード52枚＋ジョーカー1枚、ID順）
+JOKER = Card(is_joker=True)
+ALL_CARDS = [Card(suit, rank) for suit in SUITS for rank in RANKS] + [JOKER]
+
+# 整数ID → カード（52番は欠番）
+CARD_BY_ID = [None] * NUM_CARD_IDS
+for _card in ALL_CARDS:
+    CARD_BY_ID[_card.card_id] = _card
+
+
+def card_from_id(i):
+    """
+    整数IDからカードを返す
+    """
+    return CARD_BY_ID[i]
+
+
+# トランプのデッキを表すクラス（ジョーカー1枚を含む）
 class CardDeck:
     
-    def __init__(self):
-        # 通常カード＋ジョーカー1枚を生成
-        self.cards = [Card(suit, rank) for suit in SUITS for rank in RANKS]
-        self.cards.append(Card(is_joker=True))
+    def __init__(self, rng=None):
+        # 通常カード＋ジョーカー1枚
+        self.cards = list(ALL_CARDS)
+        # シャッフルに使う乱数生成器（Noneならグローバルな random）
+        self.rng = rng if rng is not None else random
 
     def shuffle(self):
-        random.shuffle(self.cards)
+        self.rng.shuffle(self.cards)
@@ -0,0 +1,220 @@
+import time
+from collections import namedtuple
+from itertools import islice
+import numpy as np
+from .logger import headless_logger
+from .action_space import (
+    PASS_ACTION, KIND_JOKER_SINGLE, ACTION_KIND, ACTION_MASKS, ACTION_SIZE, ACTION_IS_8CUT,
+    MASK_TO_ACTION, offered_legal_action_mask,
+)
+
+# -----------------------------
+# 終盤の厳密解（残り2人の局面を最後まで読み切る）
+# 残り2人になると、相手の手札は「出ていない・自分の手札にない」カードそのものなので完全情報になる。
+# Game.apply / undo で局面を進め戻ししながら、先に上がるのはどちらかを αβ（勝ち負けの2値なので
+# 勝ちが1つ見つかれば残りを打ち切る AND/OR 探索）で求め、結果を置換表に入れて使い回す。
+# 8切り・ジョーカー流し・革命などの特殊ルールは Game の進行そのものなので、探索でもそのまま効く。
+# -----------------------------
+
+# 残り枚数の合計がこれ以下なら終盤とみなす（既定値）
+DEFAULT_MAX_CARDS = 14
+
+# 合法手リストのキャッシュの上限（超えたら作り直す）
+MAX_MOVE_CACHE_SIZE = 1 << 16
+
+# 予算の残り時間を調べる間隔（ノード数）
+TIME_CHECK_INTERVAL = 256
+
+# action: 手番プレイヤーの最善手（行動番号。読み切れなかった場合は探索済みで一番ましな手）
+# value: 手番プレイヤーから見た値（先に上がれるなら 1、上がれないなら -1、読み切れなければ None）
+# winner: 2人のうち先に上がるプレイヤー（読み切れなければ None）
+# solved: 読み切れたか、nodes: 今回展開したノード数
+EndgameResult = namedtuple('EndgameResult', ['action', 'value', 'winner', 'solved', 'nodes'])
+
+
+class BudgetExceeded(Exception):
+    """
+    ノード数・時間の予算を使い切った（EndgameSolver.solve の中だけで使う）
+    """
+
+
+class TranspositionTable:
+    """
+    局面キー → 勝者 の置換表。
+    値は手番によらない「どちらが先に上がるか」なので、別の根からの探索でもそのまま使い回せる。
+    max_entries を超えたら、古く入れた項目から evict_fraction の割合をまとめて捨てる。
+    """
+
+    def __init__(self, max_entries=1 << 20, evict_fraction=0.25):
+        self.max_entries = max_entries
+        self.evict_fraction = evict_fraction
+        self.table = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.table)
+
+    def get(self, key):
+        winner = self.table.get(key)
+        if winner is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return winner
+
+    def put(self, key, winner):
+        table = self.table
+        if len(table) >= self.max_entries:
+            count = max(1, int(len(table) * self.evict_fraction))
+            for old in list(islice(table, count)):
+                del table[old]
+            self.evictions += count
+        table[key] = winner
+
+    def clear(self):
+        self.table.clear()
+
+
+def remaining_players(game):
+    """
+    まだ手札が残っているプレイヤーのリスト
+    """
+    return [player.player_id for player in game.players if len(player.hand) > 0]
+
+
+def position_key(game):
+    """
+    置換表のキー（手札・場・手番・パス・最後に出した人・革命。これで以降の進行が決まる）
+    """
+    return (
+        tuple(player.hand.mask for player in game.players), game.field_mask, game.turn,
+        tuple(game.passed), game.last_player, game.rule_checker.revolution,
+    )
+
+
+class EndgameSolver:
+    """
+    残り2人の終盤を読み切るソルバー。
+    - solve(game) は game を変更しない（内部の Game に状態を写して探索する）
+    - 合法手は DaifugoSimpleEnv が示すものと同じ（game.action_space.offered_legal_action_mask。階段は3〜K の範囲で
+      場が空なら3〜5枚、ジョーカー入りの組・階段は合法手生成が作るものだけ、ペア・階段の場は出せる手がなければパスのみ）。
+      ただし場が空のときのパスは除く（パスし合う手順が循環しないように。出せる手は必ずある）
+    - node_limit / time_limit（秒）を渡すと、使い切った時点で solved=False の結果を返す
+    置換表は solve をまたいで保持する（同じゲームの次の手番でも使い回せる）。
+    """
+
+    def __init__(self, max_cards=DEFAULT_MAX_CARDS, node_limit=None, time_limit=None, max_entries=1 << 20):
+        self.max_cards = max_cards
+        self.node_limit = node_limit
+        self.time_limit = time_limit
+        self.table = TranspositionTable(max_entries=max_entries)
+        self._sim = None  # 探索用の Game（マスク手札・ログなし）
+        self._moves = {}  # (手札マスク, 場の行動番号, 革命) → 並べ替え済みの合法手
+        self.nodes = 0
+        self._node_budget = None
+        self._deadline = None
+
+    def is_endgame(self, game):
+        """
+        残り2人で、残り枚数の合計が max_cards 以下なら True
+        """
+        if game.done:
+            return False
+        remaining = remaining_players(game)
+        if len(remaining) != 2:
+            return False
+        return sum(len(game.players[pid].hand) for pid in remaining) <= self.max_cards
+
+    def solve(self, game, node_limit=None, time_limit=None):
+        """
+        手番プレイヤーの最善手と勝敗を求める（EndgameResult を返す）。
+        node_limit / time_limit: この呼び出しだけの予算（省略時はコンストラクタの値）
+        """
+        if len(remaining_players(game)) != 2:
+            raise ValueError(f"終盤ソルバーは残り2人の局面だけを扱います: 残り {remaining_players(game)}")
+        node_limit = self.node_limit if node_limit is None else node_limit
+        time_limit = self.time_limit if time_limit is None else time_limit
+        sim = self._sim
+        if sim is None or sim.num_players != game.num_players:
+            sim = self._sim = game.clone(use_bitmask=True, logger=headless_logger())
+        else:
+            sim.restore(game.snapshot())
+        self.nodes = 0
+        self._node_budget = node_limit
+        self._deadline = time.perf_counter() + time_limit if time_limit is not None else None
+        mover = sim.turn
+        moves = self._ordered_moves(sim)
+        best = moves[0]
+        try:
+            for action in moves:
+                token = sim.apply(action)
+                winner = self._search(sim)
+                sim.undo(token)
+                if winner == mover:
+                    return EndgameResult(action, 1, winner, True, self.nodes)
+            # どの手でも上がれない（最初の手を返す）
+            return EndgameResult(best, -1, winner, True, self.nodes)
+        except BudgetExceeded:
+            return EndgameResult(best, None, None, False, self.nodes)
+
+    def _search(self, sim):
+        """
+        sim の局面から互いに最善を尽くしたときに先に上がるプレイヤーを返す（sim は元に戻す）
+        """
+        if sim.done:
+            return sim.rankings[-2]
+        key = position_key(sim)
+        winner = self.table.get(key)
+        if winner is not None:
+            return winner
+        self._charge()
+        mover = sim.turn
+        for action in self._ordered_moves(sim):
+            token = sim.apply(action)
+            winner = self._search(sim)
+            sim.undo(token)
+            if winner == mover:
+                break  # 勝ちが見つかれば他の手は読まない
+        self.table.put(key, winner)
+        return winner
+
+    def _charge(self):
+        """
+        ノードを1つ数え、予算を超えたら BudgetExceeded を送出する
+        """
+        self.nodes += 1
+        if self._node_budget is not None and self.nodes > self._node_budget:
+            raise BudgetExceeded()
+        if self._deadline is not None and self.nodes % TIME_CHECK_INTERVAL == 0 and time.perf_counter() > self._deadline:
+            raise BudgetExceeded()
+
+    def _ordered_moves(self, sim):
+        """
+        手番プレイヤーの合法手（行動番号）を有望な順に返す。
+        手札を出し切る手 → 8切り・ジョーカー単体（場を流して手番を保つ）→ 枚数の多い手 → パス
+        """
+        hand_mask = sim.players[sim.turn].hand.mask
+        field_action = MASK_TO_ACTION[sim.field_mask] if sim.current_field else -1
+        revolution = sim.rule_checker.revolution
+        key = (hand_mask, field_action, revolution)
+        moves = self._moves.get(key)
+        if moves is not None:
+            return moves
+        mask = offered_legal_action_mask(hand_mask, field_action, revolution)
+        can_pass = field_action >= 0 and bool(mask[PASS_ACTION])
+        mask[PASS_ACTION] = False
+        plays = np.flatnonzero(mask).tolist()
+        plays.sort(key=lambda a: (
+            int(ACTION_MASKS[a]) != hand_mask,
+            not (ACTION_IS_8CUT[a] or ACTION_KIND[a] == KIND_JOKER_SINGLE),
+            -int(ACTION_SIZE[a]),
+        ))
+        if can_pass:
+            plays.append(PASS_ACTION)
+        moves = plays or [PASS_ACTION]
+        if len(self._moves) >= MAX_MOVE_CACHE_SIZE:
+            self._moves.clear()
+        self._moves[key] = moves
+        return moves
@@ -1,27 +1,65 @@
 import random
 import numpy as np
 from game.game import Game
+from game.rules import FIELD_EMPTY, FIELD_PAIR, FIELD_STRAIGHT, describe_field
 from agents.straight_agent import StraightAgent
-from game.card import Card
+from game.card import JokerSubstitute
+from game.bitmask import iter_ids, mask_of
+from game.action_space import MASK_TO_ACTION, PASS_ACTION, action_index_of, actions_to_mask, offered_legal_action_mask
+from game.action_index import HandActionIndex, INDEX_STRAIGHT_LENGTHS
+from game.logger import GameLogger, DEBUG, headless_logger
+from game.observation import ObservationEncoder
+from game.hand_sampler import PublicInfoTracker
+from game.seeding import make_rng, spawn_seed
+from game.record import GameRecord
 
 
 
 class DaifugoSimpleEnv:
 
-    def __init__(self, num_players=4, agent_classes=None):
+    def __init__(self, num_players=4, agent_classes=None, use_bitmask=False, record_sink=None,
+                 logger=None, headless=False, profiler=None, track_public_info=False, seed=None):
         self.num_players = num_players   #プレイヤーの人数設定
-        self.game = Game(num_players=self.num_players)  # Game クラスのインスタンス生成
+        # ログ出力（headless=True なら一切出力しない大量シミュレーション用モード）
+        if headless:
+            logger = headless_logger()
+        self.logger = logger if logger is not None else GameLogger()
+        # ゲームごとのシードを引く乱数（seed を渡さなければグローバルな random から引く）
+        self.rng = make_rng(seed)
+        # use_bitmask=True で手札・場をビットマスクで管理するエンジンモードを使う
+        self.game = Game(
+            num_players=self.num_players, use_bitmask=use_bitmask, logger=self.logger, seed=spawn_seed(self.rng)
+        )  # Game クラスのインスタンス生成
         self.current_player = self.game.turn  # 現在のプレイヤー番号（ターン）
         self.done = False  # ゲーム終了フラグ
         # agent_classes: [AgentClass, ...] で指定できる。なければ全員StraightAgent
         if agent_classes is None:
             agent_classes = [StraightAgent] * num_players
         self.agents = [agent_classes[i](player_id=i) for i in range(num_players)]
+        # seed を渡した場合は乱数を使うエージェント（rng 属性を持つもの）にも独立したシードの生成器を渡す
+        if seed is not None:
+            for agent in self.agents:
+                if hasattr(agent, 'rng'):
+                    agent.rng = random.Random(spawn_seed(self.rng))
+        # プレイヤーごとの出し方候補の索引（手札の変化分だけ更新）
+        self.action_indexes = [HandActionIndex() for _ in range(num_players)]
+        # テンソル観測のエンコーダ（出力バッファを使い回す）
+        self.obs_encoder = ObservationEncoder(num_players)
         # 区間履歴バッファ
         self.stage_history = []  # 各区間のstep履歴（dictのリスト）
         self.already_won_players = set()  # 区間開始時点ですでに上がっていたプレイヤー
         self.stage_id = 0  # 区間ID
         self.turn_idx = 0  # ゲーム全体の手番番号
+        self.game_id = -1  # reset のたびに1増えるゲーム識別子
+        self.game_record = None  # 進行中のゲームの対戦記録（reset で作る）
+        # step のフェーズ別計測（game.profiler.StepProfiler。Noneなら計測しない）
+        self.profiler = profiler
+        if profiler is not None:
+            profiler.attach_rule_checker(self.game.rule_checker)
+        # 公開情報の追跡（game.hand_sampler.HandSampler で相手の手札をサンプリングする場合に使う）
+        self.public_info = PublicInfoTracker(num_players) if track_public_info else None
+        # 区間が終わるたびにレコードを受け取る出力先（write_stage(records) を持つもの。例: TrajectoryShardWriter）
+        self.record_sink = record_sink
 
     def _is_pair(self, cards):
         """
@@ -35,7 +73,7 @@ class DaifugoSimpleEnv:
         rank = non_jokers[0].rank
         return all(c.rank == rank or c.is_joker for c in cards)
 
-    def _make_pair_sets(self, hand, jokers, field_count, rule_checker, field):
+    def _make_pair_sets(self, hand, jokers, field_count, rule_checker, field, field_info=None):
         """
         手札からペア・スリーカード・フォーカードの組み合わせを生成
         """
@@ -53,14 +91,12 @@ class DaifugoSimpleEnv:
                         pair = list(comb)
                         # ジョーカーを代用として追加
                         for i in range(needed_jokers):
-                            joker_card = Card(is_joker=True)
-                            joker_card.set_joker_substitute(rank, pair[0].suit)
-                            pair.append(joker_card)
-                        if rule_checker.is_valid_move(pair, field):
+                            pair.append(JokerSubstitute(rank, pair[0].suit))
+                        if rule_checker.is_valid_move(pair, field, field_info):
                             legal_actions.append(pair)
         return legal_actions
 
-    def _make_straight_sets(self, hand, jokers, field_count, rule_checker, field):
+    def _make_straight_sets(self, hand, jokers, field_count, rule_checker, field, field_info=None):
         """
         手札から階段の組み合わせを生成
         """
@@ -88,10 +124,8 @@ class DaifugoSimpleEnv:
                             break
                     if not found:
                         if used_jokers < len(available_jokers):
-                            joker_card = available_jokers.pop(0)
-                            joker_card = Card(is_joker=True)
-                            joker_card.set_joker_substitute(val, suit)
-                            temp.append(joker_card)
+                            available_jokers.pop(0)
+                            temp.append(JokerSubstitute(val, suit))
                             used_jokers += 1
                         else:
                             break
@@ -103,78 +137,114 @@ class DaifugoSimpleEnv:
                             if rank == v:
                                 temp_sorted.append(c)
                                 break
-                    if rule_checker.is_valid_move(temp_sorted, field):
+                    if rule_checker.is_valid_move(temp_sorted, field, field_info):
                         legal_actions.append(temp_sorted)
         return legal_actions
 
-    def _remove_duplicate_actions(self, legal_actions):
+    def _dedupe_actions(self, legal_actions):
         """
-        legal_actionsの重複除去（カードの等価性で）
+        legal_actionsの重複除去（固定行動空間の行動番号で判定。パスは PASS_ACTION）
+        戻り値: {行動番号: カードリスト or None}（最初に出てきた順）
         """
-        def cardset_key(cardset):
-            if cardset is None:
-                return (None,)
-            return tuple(sorted(str(c) for c in cardset))
         unique = {}
         for action in legal_actions:
-            unique[cardset_key(action)] = action
-        return list(unique.values())
+            if action is None:
+                unique[PASS_ACTION] = None
+                continue
+            mask = mask_of(action)
+            unique[MASK_TO_ACTION.get(mask, -mask)] = action
+        return unique
 
-    def reset(self):
+    def reset(self, seed=None):
+        """
+        次のゲームを始める。配札はゲームごとのシード（seed を渡せばそれ、なければ self.rng から引く）で決まり、
+        シード・前回順位・選んだ行動番号を self.game_record（game.record.GameRecord）に記録する
+        """
+        if seed is None:
+            seed = spawn_seed(self.rng)
+        prev_rankings = self.game.rankings if len(self.game.rankings) == self.num_players else []
+        self.game_record = GameRecord(self.num_players, seed, tuple(prev_rankings), [])
+        self.game.seed(seed)
         # ゲームをリセット（インスタンスは使い回し、rankingsを維持）
         self.game.reset()
+        # 配布・交換後の手札を索引に反映
+        for player, action_index in zip(self.game.players, self.action_indexes):
+            action_index.sync(player.hand)
         self.current_player = self.game.turn
         self.done = False
         self.stage_history = []
         self.already_won_players = set()
         self.stage_id = 0
         self.turn_idx = 0
+        self.game_id += 1
+        if self.public_info is not None:
+            self.public_info.reset(self.game)
         return self._get_obs()
 
-    def _generate_legal_actions(self, hand, field):
+    def _generate_legal_actions(self, hand, field, action_index=None, with_ids=False, field_info=None):
         """
         現在の手札と場の状態から出せる全ての合法なカードセット（legal actions）を列挙する。
         パス(None)も必ず含める。
         場の状態に応じて出せる役種・枚数を限定する。
+        action_indexを渡した場合は、索引の候補を場に対して絞り込むだけで求める。
+        並びは行動番号順（パスは最後）で、索引の有無・手札の表現（リスト / BitmaskHand）に依らない。
+        with_ids=True なら (合法手リスト, 行動番号リスト) を返す。
+        field_info: 場の FieldDescriptor（Game.field_info）。省略時は field から求める
         """
         rule_checker = self.game.rule_checker
+        if field_info is None:
+            field_info = describe_field(field)
         legal_actions = []
         field_count = len(field)
         jokers = [c for c in hand if c.is_joker]
-        is_field_straight = rule_checker.is_straight(field) if field else False
-        is_field_pair = False
-        if field and not is_field_straight:
-            non_jokers = [c for c in field if not c.is_joker]
-            if non_jokers and all(c.rank == non_jokers[0].rank or c.is_joker for c in field):
-                is_field_pair = True if len(field) >= 2 else False
+        is_field_straight = field_info.kind == FIELD_STRAIGHT
+        is_field_pair = field_info.kind == FIELD_PAIR
 
-        if not field:
+        if action_index is not None and not (is_field_straight and field_count not in INDEX_STRAIGHT_LENGTHS):
+            action_index.sync(hand)
+            if not field:
+                kind = 'empty'
+            elif is_field_straight:
+                kind = 'straight'
+            elif is_field_pair:
+                kind = 'pair'
+            else:
+                kind = 'single'
+            for action in action_index.candidates(field, kind):
+                if rule_checker.is_valid_move(action, field, field_info):
+                    legal_actions.append(action)
+        elif not field:
             # 1枚出し
             for card in hand:
-                if rule_checker.is_valid_move([card], field):
+                if rule_checker.is_valid_move([card], field, field_info):
                     legal_actions.append([card])
             # ペア・スリーカード・フォーカード
-            legal_actions += self._make_pair_sets(hand, jokers, 2, rule_checker, field)
+            legal_actions += self._make_pair_sets(hand, jokers, 2, rule_checker, field, field_info)
             # 階段
             for length in range(3, 6):
-                legal_actions += self._make_straight_sets(hand, jokers, length, rule_checker, field)
+                legal_actions += self._make_straight_sets(hand, jokers, length, rule_checker, field, field_info)
             # ジョーカー単体
             for card in hand:
-                if card.is_joker and rule_checker.is_valid_move([card], field):
+                if card.is_joker and rule_checker.is_valid_move([card], field, field_info):
                     legal_actions.append([card])
         elif is_field_straight:
-            legal_actions += self._make_straight_sets(hand, jokers, field_count, rule_checker, field)
+            legal_actions += self._make_straight_sets(hand, jokers, field_count, rule_checker, field, field_info)
         elif is_field_pair:
-            legal_actions += self._make_pair_sets(hand, jokers, field_count, rule_checker, field)
+            legal_actions += self._make_pair_sets(hand, jokers, field_count, rule_checker, field, field_info)
         else:
             for card in hand:
-                if rule_checker.is_valid_move([card], field):
+                if rule_checker.is_valid_move([card], field, field_info):
                     legal_actions.append([card])
             for card in hand:
-                if card.is_joker and rule_checker.is_valid_move([card], field):
+                if card.is_joker and rule_checker.is_valid_move([card], field, field_info):
                     legal_actions.append([card])
         legal_actions.append(None)
-        return self._remove_duplicate_actions(legal_actions)
+        unique = self._dedupe_actions(legal_actions)
+        # 索引の候補と作り直した候補では並びが違うので、行動番号順にそろえる（パスは最後）
+        ids = sorted(unique, key=lambda action_id: (action_id == PASS_ACTION, action_id))
+        if with_ids:
+            return [unique[action_id] for action_id in ids], ids
+        return [unique[action_id] for action_id in ids]
 
     def step(self, return_info=False):
         # 現在のターンのプレイヤーIDを保存
@@ -182,45 +252,56 @@ class DaifugoSimpleEnv:
         player = self.game.players[current_player_id]
         hand = player.hand
         field = self.game.current_field[:]
+        field_info = self.game.field_info  # 場の分類（Game が場を置いたときに求めたもの）
+        profiler = self.profiler
+        if profiler is not None:
+            timer = profiler.timer
+            t = timer()
         # legal_actions生成
-        legal_actions = self._generate_legal_actions(hand, field)
+        legal_actions, legal_ids = self._generate_legal_actions(
+            hand, field, self.action_indexes[current_player_id], with_ids=True, field_info=field_info
+        )
+        if profiler is not None:
+            t = self._profile_phase(profiler, 'legal_actions', t)
         # --- ここからエージェントによる行動選択 ---
         obs = {
             'hand': hand,
-            'field': field
+            'field': field,
+            'game': self.game,  # 探索型エージェント用（相手の手札は見ずに公開情報と自分の手札だけを使うこと）
+            'field_info': field_info,  # 場の分類（game.rules.FieldDescriptor）
         }
+        if self.public_info is not None:
+            obs['public_info'] = self.public_info
         rule_checker = self.game.rule_checker
-        is_field_straight = rule_checker.is_straight(field) if field else False
-        is_field_pair = False
-        if field and not is_field_straight:
-            non_jokers = [c for c in field if not c.is_joker]
-            if non_jokers and all(c.rank == non_jokers[0].rank or c.is_joker for c in field):
-                is_field_pair = True if len(field) >= 2 else False
-        filtered_actions = []
-        if is_field_straight:
-            for action in legal_actions:
-                if action is not None and rule_checker.is_straight(action):
-                    filtered_actions.append(action)
-            if not filtered_actions:
-                filtered_actions = [None]
-        elif is_field_pair:
-            for action in legal_actions:
-                if (
-                    action is not None
-                    and rule_checker.is_same_rank_or_joker(action)
-                    and len(action) == len(field)
-                    and rule_checker.is_valid_move(action, field)
-                ):
-                    filtered_actions.append(action)
-            if not filtered_actions:
-                filtered_actions = [None]
+        # 階段・ペアの場では出せる手があればパスできない
+        # （legal_actions は is_valid_move を通った同じ役種・枚数の手だけなので、パス以外をそのまま残す）
+        if field_info.kind == FIELD_STRAIGHT or field_info.kind == FIELD_PAIR:
+            filtered_actions = [action for action in legal_actions if action is not None] or [None]
         else:
             filtered_actions = legal_actions
-        action_cards = self.agents[current_player_id].select_action(obs, legal_actions=filtered_actions)
+        # 固定行動空間での行動番号とマスク（パスは PASS_ACTION）
+        action_id_of = {id(action): i for action, i in zip(legal_actions, legal_ids)}
+        offered_ids = obs['action_ids'] = [action_id_of[id(action)] for action in filtered_actions]
+        offered_mask = obs['action_mask'] = actions_to_mask(offered_ids)
+        if profiler is not None:
+            t = self._profile_phase(profiler, 'filter', t)
+        agent = self.agents[current_player_id]
+        action_cards = agent.select_action(obs, legal_actions=filtered_actions)
+        # 探索型エージェント（MCTSAgent など）の探索結果
+        search_info = getattr(agent, 'last_search_info', None)
+        if profiler is not None:
+            t = self._profile_phase(profiler, 'select_action', t)
         # --- ここまで ---
         # プレイ実行（Noneならパス）
+        revolution_before = rule_checker.revolution
+        played_before = self.game.played_mask
+        passed_before = self.game.passed[:]
         obs_, done, reset_happened = self.game.step(current_player_id, action_cards)
         self.done = self.game.done
+        if self.public_info is not None:
+            self.public_info.observe(current_player_id, field, revolution_before, played_before, self.game)
+        if profiler is not None:
+            t = self._profile_phase(profiler, 'game_step', t)
         # プレイ後の最新の場を取得
         new_field = self.game.current_field[:]
         # legal_actions/filtered_actionsを再生成（次のプレイヤーのための状態管理用）
@@ -232,19 +313,19 @@ class DaifugoSimpleEnv:
         others_hand_counts = [len(self.game.players[i].hand) for i in range(self.num_players)]
         # 革命フラグ
         is_revolution = getattr(self.game.rule_checker, 'revolution', False)
-        # 場の役種
-        field_type = 'empty'
-        if field:
-            if rule_checker.is_straight(field):
-                field_type = 'straight'
-            elif len(field) >= 2 and all((c.rank == field[0].rank or c.is_joker) for c in field):
-                field_type = 'pair'
-            else:
-                field_type = 'single'
-        # 合法手（カード集合のリスト）
-        legal_actions_list = [[str(c) for c in action] if action is not None else None for action in legal_actions]
+        # 場の役種（empty / single / pair / straight。ジョーカー単体などは single）
+        field_type = field_info.kind
+        if field_type not in (FIELD_EMPTY, FIELD_PAIR, FIELD_STRAIGHT):
+            field_type = 'single'
+        # 合法手（エージェントに示した手。カード集合のリスト）
+        legal_actions_list = [[str(c) for c in action] if action is not None else None for action in filtered_actions]
         # 選択行動（カード集合のリスト）
         action_taken = [str(c) for c in action_cards] if action_cards is not None else None
+        action_taken_index = action_id_of.get(id(action_cards))
+        if action_taken_index is None:
+            action_taken_index = action_index_of(action_cards)
+        if self.game_record is not None:
+            self.game_record.actions.append(action_taken_index)
         # 区間開始時点のremaining_players, already_won
         remaining_players = [i for i in range(self.num_players) if i not in self.already_won_players]
         already_won = set(self.already_won_players)
@@ -252,7 +333,7 @@ class DaifugoSimpleEnv:
         step_idx_in_stage = len(self.stage_history)
         # レコード生成
         step_record = {
-            'game_id': None,  # ゲーム識別子（後で付与）
+            'game_id': self.game_id,  # ゲーム識別子
             'stage_id': self.stage_id,
             'turn_idx': self.turn_idx,
             'step_idx_in_stage': step_idx_in_stage,
@@ -264,23 +345,31 @@ class DaifugoSimpleEnv:
                 'field': [str(c) for c in field],
                 'revolution': is_revolution,
                 'others_hand_counts': others_hand_counts,
-                'field_type': field_type
+                'field_type': field_type,
+                # 手を選んだ時点の局面（観測テンソルの再構成用。revolution / others_hand_counts はプレイ後）
+                'played_mask': played_before,
+                'passed': passed_before,
+                'revolution_before': revolution_before,
             },
             'legal_actions': legal_actions_list,
-            'legal_actions_mask': None,  # MCTS未実装なのでNone
-            'policy_target': None,  # MCTS未実装なのでNone
+            'legal_action_ids': offered_ids,  # 合法手の行動番号（legal_actionsと同じ順。obs['action_ids'] と同じ）
+            'legal_actions_mask': offered_mask,  # (NUM_ACTIONS,) bool（obs['action_mask'] と同じ）
+            'policy_target': search_info['policy_target'] if search_info else None,  # (NUM_ACTIONS,) 訪問回数の分布
             'action_taken': action_taken,
+            'action_index': action_taken_index,  # 選択行動の行動番号
             'value_target': None,  # 後で一括付与
             'value_weight': None,  # 後で一括付与
             'is_terminal_in_stage': False,  # 後で一括付与
             'stage_winner': None,  # 後で一括付与
-            'mcts_root_value': None,  # MCTS未実装なのでNone
-            'mcts_visits': None,  # MCTS未実装なのでNone
-            'exploration_meta': None,  # MCTS未実装なのでNone
+            'mcts_root_value': search_info['root_value'] if search_info else None,
+            'mcts_visits': search_info['visits'] if search_info else None,  # {行動番号: 訪問回数}
+            'exploration_meta': search_info['exploration_meta'] if search_info else None,
             'reason_tag': None  # 後で一括付与
         }
         self.stage_history.append(step_record)
         self.turn_idx += 1
+        if profiler is not None:
+            t = self._profile_phase(profiler, 'record', t)
 
         # --- 誰かが上がったら区間の全履歴に一括で報酬付与 ---
         reward = 0.0
@@ -291,9 +380,17 @@ class DaifugoSimpleEnv:
             # このstepのvalue_targetを履歴から取得
             reward = self.stage_history[-1]['value_target']
             # デバッグ出力
-            print(f"[DEBUG] 区間終了: winner={winner_id}, already_won={self.already_won_players}")
-            for i, step in enumerate(self.stage_history):
-                print(f"  [DEBUG] step{i}: player={step['player_id']} value_target={step['value_target']} value_weight={step['value_weight']} reason_tag={step['reason_tag']}")
+            if self.logger.is_enabled(DEBUG):
+                self.logger.debug('stage_end', "[DEBUG] 区間終了: winner=%s, already_won=%s", winner_id, self.already_won_players,
+                                  winner=winner_id, stage_id=self.stage_id)
+                for i, step in enumerate(self.stage_history):
+                    self.logger.debug(
+                        'stage_step', "  [DEBUG] step%s: player=%s value_target=%s value_weight=%s reason_tag=%s",
+                        i, step['player_id'], step['value_target'], step['value_weight'], step['reason_tag'],
+                    )
+            # 報酬付与済みの区間レコードを出力先へ流す
+            if self.record_sink is not None:
+                self.record_sink.write_stage(self.stage_history)
             # 区間終了後、履歴をリセットし、すでに上がった人を更新
             self.already_won_players.update(new_winners)
             self.stage_id += 1
@@ -302,6 +399,10 @@ class DaifugoSimpleEnv:
             # 誰も上がっていなければrewardは0.0
             reward = 0.0
 
+        if profiler is not None:
+            self._profile_phase(profiler, 'reward', t)
+            profiler.end_step()
+
         if return_info:
             return obs, reward, self.done, {
                 "player_id": player.player_id,
@@ -312,6 +413,14 @@ class DaifugoSimpleEnv:
         else:
             return obs, reward, self.done
 
+    def _profile_phase(self, profiler, phase, start):
+        """
+        start からの経過時間を phase に加算し、次のフェーズの開始時刻を返す
+        """
+        now = profiler.timer()
+        profiler.add(phase, now - start)
+        return now
+
     def assign_stage_rewards(self, stage_history, winner_id, already_won_players):
         """
         区間内の全ステップに対して、次に上がった人だけ1.0、それ以外の残っていた人は0.0、既に上がっていた人は評価外(None)を付与
@@ -342,10 +451,37 @@ class DaifugoSimpleEnv:
         suit_map = {'♠': 0, '♥': 1, '♦': 2, '♣': 3}
         return suit_map[card.suit] * 13 + (card.rank - 1)
 
+    def legal_action_mask(self, player_id=None):
+        """
+        指定プレイヤー（省略時は手番）の現在局面での合法手マスク (NUM_ACTIONS,) bool を返す。
+        step で示す obs['action_mask'] と同じ（合法手生成が作る手だけ。ペア・階段の場で出せる手があればパスは含まない）。
+        ルール上出せる手すべてが欲しい場合は game.action_space.legal_action_mask を使う
+        """
+        if player_id is None:
+            player_id = self.game.turn
+        hand = self.game.players[player_id].hand
+        hand_mask = hand.mask if self.game.use_bitmask else mask_of(hand)
+        field = self.game.current_field
+        field_action = MASK_TO_ACTION.get(self.game.field_info.mask) if field else -1
+        if field_action is None:
+            raise ValueError(f"場のカードが行動空間にありません: {field}")
+        return offered_legal_action_mask(hand_mask, field_action, self.game.rule_checker.revolution)
+
+    def encode_observation(self, player_id=None, out=None):
+        """
+        指定プレイヤー（省略時は手番）視点のテンソル観測（game.observation の並び）を返す。
+        戻り値はエンコーダのバッファなので、保持する場合はコピーするか out を渡す
+        """
+        return self.obs_encoder.encode(self.game, player_id, out=out)
+
     def _get_obs(self):
         player = self.game.players[self.game.turn]  # 現在のプレイヤー
         # 手札を数値化して長さを27枚に固定（足りない分は -1 で埋める）
-        hand_encoded = [self._encode_card(c) for c in player.hand]
+        if self.game.use_bitmask:
+            # マスクのビット番号がそのままエンコード値
+            hand_encoded = list(iter_ids(player.hand.mask))
+        else:
+            hand_encoded = [self._encode_card(c) for c in player.hand]
         hand_encoded += [-1] * (27 - len(hand_encoded))
         # 現在場に出ているカードを数値化
         field_card = self.game.current_field[-1] if self.game.current_field else None
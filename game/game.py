@@ -1,25 +1,60 @@
 import random
-from .card import CardDeck
+from collections import namedtuple
+from .card import CardDeck, card_from_id
 from .player import Player
-from .rules import RuleChecker 
+from .rules import RuleChecker, EMPTY_FIELD, FIELD_STRAIGHT, describe_field
+from .action_space import ACTION_CARD_IDS
+from .bitmask import BitmaskHand, build_card_table, iter_ids, mask_of
+from .logger import GameLogger, INFO
+from .seeding import make_rng
+
+# ゲーム状態のスナップショット（不変なのでスレッド間で共有できる）
+# hands: 各プレイヤーの手札（リスト手札ならカードのタプル、マスク手札ならマスク整数）
+# field: 場のカード（Card / JokerSubstitute はどちらも不変）、field_info: 場の記述子（戻すときに求め直さない）
+GameSnapshot = namedtuple('GameSnapshot', [
+    'hands', 'field', 'field_info', 'field_mask', 'played_mask', 'turn', 'turn_count', 'passed',
+    'done', 'last_player', 'rankings', 'revolution',
+])
+
+# Game.apply が返す1手分の取り消し情報（手番プレイヤーの手札と、1手で変わりうる値だけを持つ）
+UndoToken = namedtuple('UndoToken', [
+    'turn', 'hand', 'field', 'field_info', 'field_mask', 'played_mask', 'turn_count', 'passed',
+    'done', 'last_player', 'num_ranked', 'revolution',
+])
+
 
 # -----------------------------
 # 大富豪のゲーム本体クラス
 # -----------------------------
 class Game:
     
-    def __init__(self, num_players=4):
+    def __init__(self, num_players=4, use_bitmask=False, logger=None, seed=None, rng=None):
         self.num_players = num_players
-        self.players = [Player(player_id=i) for i in range(num_players)]
-        self.deck = CardDeck() # トランプのデッキを生成
-        self.rule_checker = RuleChecker()  # ルールチェッカーを用意
+        # ログ出力先（指定がなければ従来通りコンソールに全て出力）
+        self.logger = logger if logger is not None else GameLogger()
+        # 配札の乱数（seed / rng を渡さなければグローバルな random）
+        self.rng = make_rng(seed, rng)
+        self.deck = CardDeck(rng=self.rng) # トランプのデッキを生成
+        # use_bitmask=True のとき、手札を54bitマスク（BitmaskHand）で管理するエンジンモード
+        self.use_bitmask = use_bitmask
+        if use_bitmask:
+            self.card_table = build_card_table(self.deck.cards)  # ビット番号 → Card
+            self.players = [Player(player_id=i, hand=BitmaskHand(self.card_table)) for i in range(num_players)]
+        else:
+            self.card_table = None
+            self.players = [Player(player_id=i) for i in range(num_players)]
+        self.rule_checker = RuleChecker(logger=self.logger)  # ルールチェッカーを用意
         self.current_field = []  # 場に出ているカード（最後に出されたカード）
+        self.field_info = EMPTY_FIELD  # 場の記述子（役種・枚数・強さなど。場を置き換えるときに1回だけ求める）
         self.turn = 0  # 現在のプレイヤー番号
         self.turn_count = 0  # ターン数
         self.passed = [False] * num_players
         self.done = False  # ゲーム終了フラグ
         self.last_player = None # 最後にカードを出したプレイヤー
         self.rankings = []  # 上がった順に記録するリスト
+        self.field_mask = 0  # 場のカードのマスク
+        self.played_mask = 0  # このゲームで出されたカードのマスク
+        self.last_exchange = []  # 直近の reset で行ったカード交換 [(渡した人, 受け取った人, カードリスト)]
         self._deal_cards()  # カードを配る
 
     def _all_others_passed(self):
@@ -33,12 +68,22 @@ class Game:
             for i in range(self.num_players) if i != self.last_player
         )
 
+    def seed(self, seed):
+        """
+        配札の乱数を seed で初期化し直す（山札も初期の並びに戻すので、次の reset の配札が seed だけで決まる）
+        """
+        self.rng = random.Random(seed)
+        self.deck = CardDeck(rng=self.rng)
+
     def reset(self):
         """ゲームを初期状態にリセットする"""
         # まず手札をリセット
         for player in self.players:
-            player.hand = []
+            player.hand.clear()
         self.current_field = []
+        self.field_info = EMPTY_FIELD
+        self.field_mask = 0
+        self.played_mask = 0
         self.turn = 0
         self.turn_count = 0
         self.passed = [False] * self.num_players
@@ -50,8 +95,9 @@ class Game:
         self._deal_cards()  # 新しい手札を配る
         self.rule_checker.reset_revolution()  # 革命状態もリセット
         # 新しい手札が配られた後にカード交換を実施
+        self.last_exchange = []
         if prev_rankings and len(prev_rankings) == self.num_players:
-            self.rule_checker.exchange_cards_by_rankings(self.players, prev_rankings)
+            self.last_exchange = self.rule_checker.exchange_cards_by_rankings(self.players, prev_rankings)
 
         # ゲーム開始時はダイヤの3を持つ人が最初の権利を持つ（必ずしもダイヤの3を出す必要はない）
         diamond3_player = None
@@ -68,15 +114,122 @@ class Game:
         # 場は空のまま、ダイヤ3を持つ人から自由に1枚出しでスタート
         return self.get_state(self.turn)  # 最初の状態を返す
 
+    def snapshot(self):
+        """
+        現在のゲーム状態を不変の GameSnapshot として返す（探索の分岐用）
+        """
+        if self.use_bitmask:
+            hands = tuple(player.hand.mask for player in self.players)
+        else:
+            hands = tuple(tuple(player.hand) for player in self.players)
+        return GameSnapshot(
+            hands, tuple(self.current_field), self.field_info, self.field_mask, self.played_mask, self.turn, self.turn_count,
+            tuple(self.passed), self.done, self.last_player, tuple(self.rankings), self.rule_checker.revolution,
+        )
+
+    def restore(self, snapshot):
+        """
+        snapshot() で取った状態に戻す（手札のリスト・BitmaskHand は同じオブジェクトを書き換える）
+        """
+        # 手札はどちらの表現（カードのタプル / マスク）のスナップショットからでも戻せる
+        if self.use_bitmask:
+            for player, hand in zip(self.players, snapshot.hands):
+                player.hand.set_mask(hand if isinstance(hand, int) else mask_of(hand))
+        else:
+            for player, hand in zip(self.players, snapshot.hands):
+                player.hand[:] = [card_from_id(i) for i in iter_ids(hand)] if isinstance(hand, int) else hand
+        self.current_field = list(snapshot.field)
+        self.field_info = snapshot.field_info
+        self.field_mask = snapshot.field_mask
+        self.played_mask = snapshot.played_mask
+        self.turn = snapshot.turn
+        self.turn_count = snapshot.turn_count
+        self.passed = list(snapshot.passed)
+        self.done = snapshot.done
+        self.last_player = snapshot.last_player
+        self.rankings = list(snapshot.rankings)
+        self.rule_checker.revolution = snapshot.revolution
+
+    def clone(self, use_bitmask=None, logger=None):
+        """
+        現在の状態をコピーした別の Game を返す（配り直しや乱数の消費はしない）
+        use_bitmask: 複製側の手札の表現（Noneなら元と同じ）、logger: 複製側のロガー（Noneなら共有）
+        """
+        game = Game.__new__(Game)
+        game.num_players = self.num_players
+        game.logger = logger if logger is not None else self.logger
+        # 乱数は元の状態をコピーする（元の系列は消費せず、複製も同じ seed から再現できる）
+        game.rng = random.Random()
+        game.rng.setstate(self.rng.getstate())
+        game.deck = CardDeck(rng=game.rng)
+        game.use_bitmask = self.use_bitmask if use_bitmask is None else use_bitmask
+        if game.use_bitmask:
+            game.card_table = self.card_table if self.card_table is not None else build_card_table(game.deck.cards)
+            game.players = [Player(player_id=i, hand=BitmaskHand(game.card_table)) for i in range(self.num_players)]
+        else:
+            game.card_table = None
+            game.players = [Player(player_id=i) for i in range(self.num_players)]
+        game.rule_checker = RuleChecker(logger=game.logger)
+        game.last_exchange = list(self.last_exchange)
+        game.restore(self.snapshot())
+        return game
+
+    def apply(self, action):
+        """
+        手番プレイヤーとして1手進め、取り消し用の UndoToken を返す（探索用）。
+        action: 出すカードリスト、None（パス）、または game.action_space の行動番号
+        進め方は step と同じ（_handle_action / _handle_special_rules をそのまま通る）
+        """
+        player_id = self.turn
+        hand = self.players[player_id].hand
+        token = UndoToken(
+            player_id, hand.mask if self.use_bitmask else tuple(hand), self.current_field,
+            self.field_info, self.field_mask, self.played_mask, self.turn_count, tuple(self.passed),
+            self.done, self.last_player, len(self.rankings), self.rule_checker.revolution,
+        )
+        if action is not None and not isinstance(action, (list, tuple)):
+            action = [card_from_id(i) for i in ACTION_CARD_IDS[action]] or None
+        self.step(player_id, action)
+        return token
+
+    def undo(self, token):
+        """
+        apply で進めた1手を取り消す（後に apply した手から順に取り消すこと）
+        """
+        hand = self.players[token.turn].hand
+        if self.use_bitmask:
+            hand.set_mask(token.hand)
+        else:
+            hand[:] = token.hand
+        # 場のリストは置き換えで更新されるので、元のリストをそのまま戻せる
+        self.current_field = token.field
+        self.field_info = token.field_info
+        self.field_mask = token.field_mask
+        self.played_mask = token.played_mask
+        self.turn = token.turn
+        self.turn_count = token.turn_count
+        self.passed = list(token.passed)
+        self.done = token.done
+        self.last_player = token.last_player
+        del self.rankings[token.num_ranked:]
+        self.rule_checker.revolution = token.revolution
+
     def is_valid_play(self, cards):
         """現在の場にこのカード群が出せるかどうか"""
         if cards is None or len(cards) == 0:
             return True  # パスは常に有効
-        return self.rule_checker.is_valid(self.current_field, cards)  # ルール判定
+        return self.rule_checker.is_valid_move(cards, self.current_field, self.field_info)  # ルール判定
 
     def _deal_cards(self):
         """山札をシャッフルしてプレイヤーにカードを配る"""
         self.deck.shuffle()
+        if self.use_bitmask:
+            masks = [0] * self.num_players
+            for i, card in enumerate(self.deck.cards):
+                masks[i % self.num_players] |= 1 << card.card_id
+            for player, mask in zip(self.players, masks):
+                player.hand.add_mask(mask)
+            return
         for i, card in enumerate(self.deck.cards):
             self.players[i % self.num_players].hand.append(card)
 
@@ -93,9 +246,9 @@ class Game:
 
     def log(self, msg):
         """
-        ログ出力用メソッド。将来的なUI/ログ管理のためprintを一元化。
+        ログ出力用メソッド。INFOレベルでロガーに渡す。
         """
-        print(msg)
+        self.logger.info('game', msg)
 
     def step(self, player_id, action_cards):
         """
@@ -130,9 +283,12 @@ class Game:
         # 出すカードの検証・ルール判定
         if card_objs is not None and len(card_objs) > 0:
             if empty_field:
-                valid = is_first_turn or self.rule_checker.is_valid_move(card_objs, self.current_field)
+                valid = is_first_turn or self.rule_checker.is_valid_move(card_objs, self.current_field, self.field_info)
             else:
-                valid = len(card_objs) == len(self.current_field) and self.rule_checker.is_valid_move(card_objs, self.current_field)
+                valid = (
+                    len(card_objs) == len(self.current_field)
+                    and self.rule_checker.is_valid_move(card_objs, self.current_field, self.field_info)
+                )
         # カードを出す処理
         if valid:
             self._play_cards(player, card_objs)
@@ -178,13 +334,14 @@ class Game:
         """
         # 革命
         if self.rule_checker.check_revolution(card_objs):
-            self.log(f"革命発生! 現在の革命状態: {self.rule_checker.revolution}")
-        # 階段
-        if self.rule_checker.is_straight(card_objs):
-            self.log(f"Player {self.turn} が階段を出しました: {[str(c) for c in card_objs]}")
+            self.logger.info('revolution', "革命発生! 現在の革命状態: %s", self.rule_checker.revolution)
+        # 階段（_play_cards で求めた場の役種を使う）
+        if self.field_info.kind == FIELD_STRAIGHT:
+            if self.logger.is_enabled(INFO):
+                self.logger.info('straight', "Player %s が階段を出しました: %s", self.turn, [str(c) for c in self.current_field])
         # 8切り
         if self.rule_checker.is_8cut(card_objs):
-            self.log(f"8切り発動 by Player {self.turn}!")
+            self.logger.info('eight_cut', "8切り発動 by Player %s!", self.turn)
             self.last_player = self.turn
             self._reset_field()
             return True, (self.get_state(self.turn), False, True)
@@ -211,37 +368,58 @@ class Game:
 
     # --- 補助メソッド ---
     def _find_hand_cards(self, player, action_cards):
-        """手札からaction_cardsに該当するCardオブジェクトリストを返す"""
-        hand_card_strs = [str(c) for c in player.hand]
-        if all(str(card) in hand_card_strs for card in action_cards):
-            return [next(c for c in player.hand if str(c) == str(card)) for card in action_cards]
+        """
+        手札からaction_cardsに該当するCardオブジェクトリストを返す。
+        カードの整数IDで照合する（ジョーカーの代用解釈は手札のジョーカーと一致する）
+        """
+        # 同じカードの重複指定は不可
+        ids = [card.card_id for card in action_cards]
+        mask = mask_of(action_cards)
+        if len(set(ids)) != len(ids):
+            return None
+        if self.use_bitmask:
+            if not player.hand.contains_mask(mask):
+                return None
+            return [self.card_table[i] for i in ids]
+        hand_ids = {card.card_id: card for card in player.hand}
+        if all(i in hand_ids for i in ids):
+            return [hand_ids[i] for i in ids]
         return None
 
     def _play_cards(self, player, card_objs):
-        """カードを場に出し、手札から削除し、場の状態を更新（str(card)一致で削除）"""
-        self.current_field = card_objs[:]
-        # 手札のカードをstr一致で削除（同じカードが複数ある場合も1枚ずつ）
+        """カードを場に出し、手札から削除し、場の状態を更新（カードIDで削除）"""
+        # 場にはジョーカーの代用解釈を付けた状態で置く（カード自体は変更しない）
+        # 役種などの分類もここで1回だけ求め、以降は field_info を使う
+        self.field_info = describe_field(card_objs)
+        self.current_field = list(self.field_info.cards)
+        play_mask = self.field_info.mask
+        self.field_mask = play_mask
+        self.played_mask |= play_mask
+        if self.use_bitmask:
+            # マスクモードはビット演算で一括削除
+            player.hand.remove_mask(play_mask)
+            self.passed = [False] * self.num_players
+            return
+        # 手札のカードを削除（カードはインターン済みなので同一オブジェクトで照合できる）
         for card in card_objs:
-            found = False
-            for i, h in enumerate(player.hand):
-                if str(h) == str(card):
-                    del player.hand[i]
-                    found = True
-                    break
-            if not found:
+            try:
+                player.hand.remove(card)
+            except ValueError:
                 # デバッグ用: 一致しない場合は警告
-                self.log(f"[WARNING] 手札からカードが見つかりません: {str(card)}")
+                self.logger.warning('card_not_found', "[WARNING] 手札からカードが見つかりません: %s", card)
         self.passed = [False] * self.num_players
 
     def _reset_field(self):
         """場をリセットし、パス情報もリセット"""
         self.current_field = []
+        self.field_info = EMPTY_FIELD
+        self.field_mask = 0
         self.passed = [False] * self.num_players
         self.turn_count += 1
         # 場リセット時は必ず最後に出したプレイヤーから再開
         if self.last_player is not None:
             self.turn = self.last_player
-        self.log("--- 場がリセットされました ---")
+        self.logger.info('field_reset', "--- 場がリセットされました ---")
 
     def _advance_turn(self):
         """次のプレイヤーにターンを進める（手札がない場合はスキップ）"""
@@ -0,0 +1,134 @@
+from collections import namedtuple
+from functools import lru_cache
+from .bitmask import mask_of
+from .action_space import (
+    KIND_STRAIGHT, ACTION_CARD_IDS, ACTION_KIND, ACTION_SIZE, NUM_ACTIONS, OFFERED_LEAD_ACTIONS, PASS_ACTION,
+    offered_actions,
+)
+
+# -----------------------------
+# 手札の分解（何手で出し切れるか、どう組めばよいか）
+# 手札を単体・同ランクの組・階段（ジョーカーの代用を含む）に分ける分け方のうち、手数が最小のものを
+# 「一番小さいカードを含む組を選んで残りを分解する」再帰（DP）で求める。
+# 部分手札ごとの結果と手札ごとの結果は手札マスク（カードの並びによらない正規のキー）で LRU キャッシュする。
+# 組は DaifugoSimpleEnv が場が空のときに作る手（階段は3〜K の3〜5枚）だけを使う。
+# -----------------------------
+
+# 手札ごとの結果を覚えておく件数
+MAX_HAND_CACHE_SIZE = 1 << 12
+
+# 部分手札（分解の途中）の結果を覚えておく件数
+MAX_SUBHAND_CACHE_SIZE = 1 << 14
+
+# num_plays: 出し切るのに必要な最小の手数
+# groups: その分け方（行動番号のタプル。枚数の多い組から順）
+HandDecomposition = namedtuple('HandDecomposition', ['num_plays', 'groups'])
+
+
+def _build_groups_by_card():
+    """
+    カードのビット番号 → そのカードを含む組 [(マスク, 行動番号)]（枚数の多い順）
+    """
+    groups = {}
+    for action in range(NUM_ACTIONS):
+        if action == PASS_ACTION or not OFFERED_LEAD_ACTIONS[action]:
+            continue
+        ids = ACTION_CARD_IDS[action]
+        mask = 0
+        for i in ids:
+            mask |= 1 << i
+        for i in ids:
+            groups.setdefault(i, []).append((mask, action))
+    for entries in groups.values():
+        entries.sort(key=lambda entry: (-int(ACTION_SIZE[entry[1]]), entry[1]))
+    return groups
+
+
+_GROUPS_BY_CARD = _build_groups_by_card()
+
+# 階段の行動番号とマスク（hand_straights 用）
+_STRAIGHTS = [
+    (mask, action)
+    for entries in _GROUPS_BY_CARD.values() for mask, action in entries
+    if ACTION_KIND[action] == KIND_STRAIGHT
+]
+_STRAIGHTS = sorted(set(_STRAIGHTS), key=lambda entry: entry[1])
+
+
+def hand_key(hand):
+    """
+    手札の正規のキー（マスク整数）。マスク・BitmaskHand・カードのリストのどれでもよい
+    """
+    if isinstance(hand, int):
+        return hand
+    mask = getattr(hand, 'mask', None)
+    return mask if mask is not None else mask_of(hand)
+
+
+@lru_cache(maxsize=MAX_SUBHAND_CACHE_SIZE)
+def _decompose(mask):
+    """
+    mask を出し切る最小手数と分け方（行動番号のタプル）
+    """
+    if mask == 0:
+        return 0, ()
+    low = mask & -mask
+    best_count = None
+    best_groups = ()
+    # 一番小さいビット番号のカードはどれかの組に入るので、その候補だけを試す
+    for group_mask, action in _GROUPS_BY_CARD[low.bit_length() - 1]:
+        if mask & group_mask != group_mask:
+            continue
+        count, groups = _decompose(mask & ~group_mask)
+        if best_count is None or count + 1 < best_count:
+            best_count = count + 1
+            best_groups = (action,) + groups
+            if best_count == 1:
+                break
+    return best_count, best_groups
+
+
+@lru_cache(maxsize=MAX_HAND_CACHE_SIZE)
+def _analyze(mask):
+    count, groups = _decompose(mask)
+    return HandDecomposition(count, tuple(sorted(groups, key=lambda action: (-int(ACTION_SIZE[action]), action))))
+
+
+def analyze_hand(hand):
+    """
+    手札を出し切る最小手数とその分け方（HandDecomposition）を返す
+    """
+    return _analyze(hand_key(hand))
+
+
+def min_plays(hand):
+    """
+    手札を出し切るのに必要な最小の手数
+    """
+    return _analyze(hand_key(hand)).num_plays
+
+
+@lru_cache(maxsize=MAX_HAND_CACHE_SIZE)
+def _hand_straights(mask):
+    actions = [action for straight_mask, action in _STRAIGHTS if mask & straight_mask == straight_mask]
+    if not actions:
+        return ()
+    # ジョーカー入りの階段は、ジョーカーが代わるカードを持っていないものだけ
+    offered = offered_actions([mask], actions, lead=True)[0]
+    return tuple(action for action, ok in zip(actions, offered) if ok)
+
+
+def hand_straights(hand):
+    """
+    場が空のときに DaifugoSimpleEnv が作る階段（行動番号のタプル。スート順・長さ順・弱い順）
+    """
+    return _hand_straights(hand_key(hand))
+
+
+def clear_caches():
+    """
+    キャッシュを捨てる（メモリを空けたいとき用）
+    """
+    _decompose.cache_clear()
+    _analyze.cache_clear()
+    _hand_straights.cache_clear()
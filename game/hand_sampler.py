@@ -0,0 +1,177 @@
+import random
+import numpy as np
+from .card import ALL_CARDS
+from .bitmask import iter_ids, mask_of
+from .rules import FIELD_PAIR, FIELD_STRAIGHT, describe_field
+from .action_space import (
+    PASS_ACTION, ACTION_MASKS, OFFERED_ACTIONS, MASK_TO_ACTION, compatibility_table, offered_actions,
+)
+
+# -----------------------------
+# 見えていない手札のサンプリング（不完全情報の探索用）
+# PublicInfoTracker: 対戦の進行から公開情報（出たカード・枚数・交換で分かったカード・パス）を集める
+# HandSampler: 公開情報と矛盾しない配り方をランダムに作る（1件ずつ / NumPy配列でまとめて）
+# -----------------------------
+
+# デッキ全体のマスク
+DECK_MASK = mask_of(ALL_CARDS)
+
+
+def _offers_any(hand_masks, action_ids):
+    """
+    手札 hand_masks (N,) のそれぞれで、DaifugoSimpleEnv が action_ids のどれかを合法手として作るか (N,) bool
+    """
+    hands = np.asarray(hand_masks, dtype=np.uint64)[:, None]
+    action_masks = ACTION_MASKS[action_ids][None, :]
+    contained = (hands & action_masks) == action_masks
+    return (contained & offered_actions(hands[:, 0], action_ids)).any(axis=1)
+
+
+class PublicInfoTracker:
+    """
+    1ゲーム分の公開情報を集める。
+    - known[observer][holder]: observer が「holder が持っている」と知っているカード（カード交換で渡した分）
+    - voids[holder]: holder が作れないと分かる出し方（行動番号の配列）のリスト。
+      DaifugoSimpleEnv ではペア・階段の場に出せる手があるときはパスできないので、
+      そこでパスしたプレイヤーはその場に出せる組を1つも持っていない（strict_passes=True のとき）
+    出たカード・残り枚数は Game（played_mask と手札の枚数）から読む。
+    """
+
+    def __init__(self, num_players=4, strict_passes=True):
+        self.num_players = num_players
+        self.strict_passes = strict_passes
+        self.reset()
+
+    def reset(self, game=None):
+        """
+        新しいゲームの開始時に呼ぶ（game を渡すと直前のカード交換の内容を取り込む）
+        """
+        n = self.num_players
+        self.known = [[0] * n for _ in range(n)]
+        self.voids = [[] for _ in range(n)]
+        self._void_keys = [set() for _ in range(n)]
+        if game is not None:
+            for giver, receiver, cards in game.last_exchange:
+                self.known[giver][receiver] |= mask_of(cards)
+
+    def observe(self, player_id, field_before, revolution_before, played_before, game):
+        """
+        1手進んだ後に呼ぶ。field_before / revolution_before / played_before はその手の前の場・革命・出たカードのマスク
+        """
+        if game.played_mask != played_before:
+            return  # カードを出した（出たカードは played_mask で分かる）
+        if not self.strict_passes:
+            return
+        field_info = describe_field(field_before)
+        if field_info.kind != FIELD_STRAIGHT and field_info.kind != FIELD_PAIR:
+            return  # 単体の場へのパスは任意なので何も分からない
+        field_action = MASK_TO_ACTION.get(field_info.mask)
+        key = (field_action, bool(revolution_before))
+        if field_action is None or key in self._void_keys[player_id]:
+            return
+        # この場で DaifugoSimpleEnv が示しうる手（offered_legal_action_mask と同じ相性表・生成の範囲）。
+        # 手札で決まる部分（手札に含まれるか・ジョーカー入りの組を作るか）は _offers_any で判定する
+        row = compatibility_table()[int(bool(revolution_before)), field_action + 1] & OFFERED_ACTIONS
+        row[PASS_ACTION] = False
+        self._void_keys[player_id].add(key)
+        self.voids[player_id].append(np.flatnonzero(row).astype(np.int64))
+
+    def known_masks(self, observer, played_mask):
+        """
+        observer から見た各プレイヤーの確定カード（まだ出ていないもの）
+        """
+        return [mask & ~played_mask for mask in self.known[observer]]
+
+
+class HandSampler:
+    """
+    observer から見て、公開情報と矛盾しない他プレイヤーの手札をサンプリングする。
+    確定カードを先に置き、残りを見えていないカードからランダムに配る。
+    パスによる制約（持っていない組）に反した配り方は引き直す（max_tries 回まで。超えたら制約を外した配り方を返す）
+    """
+
+    def __init__(self, tracker, observer, seed=None, max_tries=100):
+        self.tracker = tracker
+        self.observer = observer
+        self.rng = random.Random(seed)
+        self.np_rng = np.random.default_rng(seed)
+        self.max_tries = max_tries
+        self.relaxed = 0  # 制約を満たせず制約なしで返した回数
+
+    def _setup(self, game):
+        """
+        確定カード・配る枚数・配る元のカードを求める
+        """
+        played = game.played_mask
+        own = game.players[self.observer].hand
+        own_mask = own.mask if game.use_bitmask else mask_of(own)
+        known = self.tracker.known_masks(self.observer, played)
+        known[self.observer] = own_mask
+        counts = [len(player.hand) for player in game.players]
+        holders = [pid for pid in range(game.num_players) if pid != self.observer and counts[pid] > 0]
+        needs = [counts[pid] - known[pid].bit_count() for pid in holders]
+        fixed = 0
+        for mask in known:
+            fixed |= mask
+        pool = list(iter_ids(DECK_MASK & ~played & ~fixed))
+        return known, holders, needs, pool
+
+    def sample(self, game):
+        """
+        1件サンプリングする。戻り値: 各プレイヤーの手札マスクのタプル（observer は実際の手札）
+        """
+        known, holders, needs, pool = self._setup(game)
+        voids = self.tracker.voids
+        total = sum(needs)
+        for _ in range(self.max_tries):
+            drawn = self.rng.sample(pool, total)
+            hands = list(known)
+            pos = 0
+            ok = True
+            for pid, need in zip(holders, needs):
+                mask = known[pid]
+                for i in drawn[pos:pos + need]:
+                    mask |= 1 << i
+                pos += need
+                hands[pid] = mask
+                if any(_offers_any([mask], void)[0] for void in voids[pid]):
+                    ok = False
+                    break
+            if ok:
+                return tuple(hands)
+        self.relaxed += 1
+        hands = list(known)
+        pos = 0
+        for pid, need in zip(holders, needs):
+            for i in drawn[pos:pos + need]:
+                hands[pid] |= 1 << i
+            pos += need
+        return tuple(hands)
+
+    def sample_batch(self, game, num_samples, max_rounds=20):
+        """
+        num_samples 件まとめてサンプリングする。戻り値: (num_samples, num_players) uint64 の手札マスク
+        制約を満たさない行は max_rounds 回まで引き直す（残った行は制約なしのまま）
+        """
+        known, holders, needs, pool = self._setup(game)
+        pool_bits = np.left_shift(np.uint64(1), np.array(pool, dtype=np.uint64))
+        total = sum(needs)
+        hands = np.tile(np.array(known, dtype=np.uint64), (num_samples, 1))
+        rows = np.arange(num_samples)
+        for _ in range(max_rounds):
+            if len(rows) == 0:
+                break
+            # 行ごとに見えていないカードのランダムな並びを作り、先頭から枚数分ずつ配る
+            order = np.argsort(self.np_rng.random((len(rows), len(pool))), axis=1)[:, :total]
+            drawn = pool_bits[order]
+            pos = 0
+            bad = np.zeros(len(rows), dtype=bool)
+            for pid, need in zip(holders, needs):
+                dealt = np.bitwise_or.reduce(drawn[:, pos:pos + need], axis=1) if need > 0 else np.uint64(0)
+                hands[rows, pid] = np.uint64(known[pid]) | dealt
+                pos += need
+                for void in self.tracker.voids[pid]:
+                    bad |= _offers_any(hands[rows, pid], void)
+            rows = rows[bad]
+        self.relaxed += len(rows)
+        return hands
@@ -0,0 +1,107 @@
+import json
+import time
+from collections import deque
+
+# -----------------------------
+# ゲーム内ログの出力レベル付きロガー
+# 無効なレベルのログは文字列整形を一切行わずに捨てる
+# -----------------------------
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+SILENT = 100  # すべてのログを出さない（ヘッドレス実行用）
+
+LEVEL_NAMES = {DEBUG: 'DEBUG', INFO: 'INFO', WARNING: 'WARNING'}
+
+
+class GameLogger:
+    """
+    レベル付きのログ出力。
+    - console=True ならコンソールに print する（従来の出力と同じ）
+    - sink を指定すると、イベントを辞書として sink.emit(event) に渡す（リングバッファやファイル）
+    メッセージは msg % args の形で、レベルが有効なときだけ整形する。
+    """
+
+    def __init__(self, level=DEBUG, console=True, sink=None):
+        self.level = level
+        self.console = console
+        self.sink = sink
+
+    def is_enabled(self, level):
+        """
+        このレベルのログが出力されるか（重い引数を作る前の判定用）
+        """
+        return level >= self.level and (self.console or self.sink is not None)
+
+    def log(self, level, event, msg, *args, **fields):
+        """
+        event: イベント名（'field_reset' など）、fields: 構造化出力用の追加情報
+        """
+        if level < self.level:
+            return
+        if not self.console and self.sink is None:
+            return
+        text = msg % args if args else msg
+        if self.console:
+            print(text)
+        if self.sink is not None:
+            record = {
+                'time': time.time(),
+                'level': LEVEL_NAMES.get(level, str(level)),
+                'event': event,
+                'message': text,
+            }
+            record.update(fields)
+            self.sink.emit(record)
+
+    def debug(self, event, msg, *args, **fields):
+        self.log(DEBUG, event, msg, *args, **fields)
+
+    def info(self, event, msg, *args, **fields):
+        self.log(INFO, event, msg, *args, **fields)
+
+    def warning(self, event, msg, *args, **fields):
+        self.log(WARNING, event, msg, *args, **fields)
+
+
+def headless_logger():
+    """
+    大量シミュレーション用: 何も出力しないロガー
+    """
+    return GameLogger(level=SILENT, console=False)
+
+
+class RingBufferSink:
+    """
+    直近 capacity 件のイベントだけをメモリに保持する（事後デバッグ用）
+    """
+
+    def __init__(self, capacity=10000):
+        self.events = deque(maxlen=capacity)
+
+    def emit(self, record):
+        self.events.append(record)
+
+    def dump(self, path):
+        """
+        保持しているイベントをJSON Lines形式で書き出す
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            for record in self.events:
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+
+
+class JsonlFileSink:
+    """
+    イベントをJSON Lines形式でファイルに追記する
+    """
+
+    def __init__(self, path):
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def emit(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,176 @@
+import numpy as np
+from .card import NUM_CARD_IDS
+from .bitmask import iter_ids, mask_of
+
+# -----------------------------
+# 観測のテンソル表現（float32の1次元ベクトル）
+# 並び: 手札 / 場 / 既に出たカード（各54次元のone-hot、ビット番号はカードID）
+#       / 他プレイヤーの手札枚数（自分の次の席から順に num_players-1 次元）
+#       / 革命フラグ / パス状況（自分から席順に num_players 次元） / 自分の席（one-hot）
+# エンコーダは出力バッファを使い回すので、保持したい場合は呼び出し側でコピーする
+# -----------------------------
+
+# 1バイト → 8ビット分のone-hot（バッチ版のone-hot展開用、下位ビットから）
+_BYTE_BITS = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1, bitorder='little').astype(np.float32)
+
+
+def observation_slices(num_players):
+    """
+    各要素のベクトル内の位置 {名前: slice} を返す
+    """
+    sizes = [
+        ('hand', NUM_CARD_IDS),
+        ('field', NUM_CARD_IDS),
+        ('played', NUM_CARD_IDS),
+        ('others_hand_counts', num_players - 1),
+        ('revolution', 1),
+        ('passed', num_players),
+        ('seat', num_players),
+    ]
+    slices = {}
+    start = 0
+    for name, size in sizes:
+        slices[name] = slice(start, start + size)
+        start += size
+    return slices
+
+
+def observation_size(num_players):
+    return observation_slices(num_players)['seat'].stop
+
+
+def _game_state(game, player_id):
+    """
+    Game から観測に必要なマスク・枚数などを取り出す
+    """
+    hand = game.players[player_id].hand
+    hand_mask = hand.mask if game.use_bitmask else mask_of(hand)
+    hand_counts = [len(player.hand) for player in game.players]
+    return hand_mask, game.field_mask, game.played_mask, hand_counts, game.rule_checker.revolution, game.passed
+
+
+class ObservationEncoder:
+    """
+    1局面分の観測を事前確保したバッファに書き込むエンコーダ
+    """
+
+    def __init__(self, num_players=4):
+        self.num_players = num_players
+        self.slices = observation_slices(num_players)
+        self.size = observation_size(num_players)
+        self.buffer = np.zeros(self.size, dtype=np.float32)
+
+    def encode_masks(self, hand_mask, field_mask, played_mask, hand_counts, revolution, passed, seat, out=None):
+        """
+        マスク・枚数などから観測を書き込む。
+        hand_counts, passed は席順（プレイヤーID順）のリスト
+        out: 書き込み先（省略時は self.buffer）
+        """
+        if out is None:
+            out = self.buffer
+        out.fill(0.0)
+        s = self.slices
+        n = self.num_players
+        for offset, mask in ((s['hand'].start, hand_mask), (s['field'].start, field_mask), (s['played'].start, played_mask)):
+            for i in iter_ids(mask):
+                out[offset + i] = 1.0
+        # 他プレイヤーの手札枚数・パス状況は自分を基準にした席順で並べる
+        start = s['others_hand_counts'].start
+        for k in range(1, n):
+            out[start + k - 1] = hand_counts[(seat + k) % n]
+        out[s['revolution'].start] = 1.0 if revolution else 0.0
+        start = s['passed'].start
+        for k in range(n):
+            if passed[(seat + k) % n]:
+                out[start + k] = 1.0
+        out[s['seat'].start + seat] = 1.0
+        return out
+
+    def encode(self, game, player_id=None, out=None):
+        """
+        Game の現在局面を player_id（省略時は手番）視点で書き込む
+        """
+        if player_id is None:
+            player_id = game.turn
+        return self.encode_masks(*_game_state(game, player_id), player_id, out=out)
+
+
+class BatchObservationEncoder:
+    """
+    N局面分の観測を (N, size) の事前確保バッファにまとめて書き込むエンコーダ。
+    one-hot展開も作業用バッファ上で行い、呼び出しごとの大きな配列確保をしない
+    """
+
+    def __init__(self, batch_size, num_players=4):
+        self.batch_size = batch_size
+        self.num_players = num_players
+        self.slices = observation_slices(num_players)
+        self.size = observation_size(num_players)
+        self.buffer = np.zeros((batch_size, self.size), dtype=np.float32)
+        self._bits = np.zeros((batch_size, 8, 8), dtype=np.float32)  # one-hot展開の作業領域（8バイト×8ビット）
+        self._seat_order = np.zeros((batch_size, num_players), dtype=np.int64)  # 自分基準の席順
+        self._rows = np.arange(batch_size)[:, None]
+        self._offsets = np.arange(num_players)[None, :]
+        # Game から集める場合の入力バッファ
+        self._hand_masks = np.zeros(batch_size, dtype=np.uint64)
+        self._field_masks = np.zeros(batch_size, dtype=np.uint64)
+        self._played_masks = np.zeros(batch_size, dtype=np.uint64)
+        self._hand_counts = np.zeros((batch_size, num_players), dtype=np.int64)
+        self._revolution = np.zeros(batch_size, dtype=bool)
+        self._passed = np.zeros((batch_size, num_players), dtype=bool)
+        self._seats = np.zeros(batch_size, dtype=np.int64)
+
+    def _unpack_into(self, masks, out):
+        """
+        uint64マスク (n,) を out (n, 54) にone-hotで書き込む（バイトごとの表引き）
+        """
+        n = len(masks)
+        masks = np.ascontiguousarray(masks, dtype='<u8')
+        bits = self._bits[:n]
+        np.take(_BYTE_BITS, masks.view(np.uint8).reshape(n, 8), axis=0, out=bits)
+        out[...] = bits.reshape(n, 64)[:, :NUM_CARD_IDS]
+
+    def encode(self, hand_masks, field_masks, played_masks, hand_counts, revolution, passed, seats, out=None):
+        """
+        hand_masks, field_masks, played_masks: (N,) uint64
+        hand_counts: (N, num_players) 各プレイヤーの手札枚数（プレイヤーID順）
+        revolution: (N,) bool、passed: (N, num_players) bool、seats: (N,) 視点となるプレイヤーID
+        戻り値: (N, size) float32（N <= batch_size。buffer の先頭N行を使い回す）
+        """
+        n = len(seats)
+        if out is None:
+            out = self.buffer[:n]
+        s = self.slices
+        self._unpack_into(np.asarray(hand_masks, dtype=np.uint64), out[:, s['hand']])
+        self._unpack_into(np.asarray(field_masks, dtype=np.uint64), out[:, s['field']])
+        self._unpack_into(np.asarray(played_masks, dtype=np.uint64), out[:, s['played']])
+        seat_order = self._seat_order[:n]
+        np.add(np.asarray(seats)[:, None], self._offsets, out=seat_order)
+        np.remainder(seat_order, self.num_players, out=seat_order)
+        rows = self._rows[:n]
+        out[:, s['others_hand_counts']] = np.asarray(hand_counts)[rows, seat_order[:, 1:]]
+        out[:, s['revolution'].start] = revolution
+        out[:, s['passed']] = np.asarray(passed)[rows, seat_order]
+        seat_plane = out[:, s['seat']]
+        np.equal(self._offsets, np.asarray(seats)[:, None], out=seat_plane, casting='unsafe')
+        return out
+
+    def encode_games(self, games, player_ids=None):
+        """
+        複数の Game の現在局面をまとめて書き込む（player_ids 省略時は各ゲームの手番）
+        """
+        n = len(games)
+        for i, game in enumerate(games):
+            player_id = game.turn if player_ids is None else player_ids[i]
+            hand_mask, field_mask, played_mask, hand_counts, revolution, passed = _game_state(game, player_id)
+            self._hand_masks[i] = hand_mask
+            self._field_masks[i] = field_mask
+            self._played_masks[i] = played_mask
+            self._hand_counts[i] = hand_counts
+            self._revolution[i] = revolution
+            self._passed[i] = passed
+            self._seats[i] = player_id
+        return self.encode(
+            self._hand_masks[:n], self._field_masks[:n], self._played_masks[:n], self._hand_counts[:n],
+            self._revolution[:n], self._passed[:n], self._seats[:n],
+        )
@@ -1,8 +1,9 @@
 class Player:
-    def __init__(self, player_id, name=None):
+    def __init__(self, player_id, name=None, hand=None):
         self.player_id = player_id  # プレイヤーID（識別用）
         self.name = name if name else f"P{player_id}"  # 名前（指定がなければ"P0", "P1"などになる）
-        self.hand = []  # プレイヤーの手札（Cardオブジェクトのリスト）
+        # プレイヤーの手札（Cardオブジェクトのリスト、またはビットマスク手札 BitmaskHand）
+        self.hand = hand if hand is not None else []
 
     def draw_hand(self, deck, n):
         """
@@ -0,0 +1,180 @@
+import json
+import sys
+import time
+from . import rules
+
+# -----------------------------
+# DaifugoSimpleEnv.step のフェーズ別計測（任意で有効化）
+# 環境に profiler を渡したときだけ計測し、渡さなければ step の処理は変わらない
+# -----------------------------
+
+# step のフェーズ（計測順）
+STEP_PHASES = (
+    'legal_actions',  # 合法手生成
+    'filter',  # 場の役種判定と合法手の絞り込み
+    'select_action',  # agent.select_action
+    'game_step',  # Game.step
+    'record',  # 観測の再取得と手番レコードの作成
+    'reward',  # 区間の報酬付与と出力先への書き出し
+)
+
+# 呼び出し回数を数える RuleChecker のメソッド（出す手の判定は下の game.rules の関数に委ねている）
+RULE_CHECKER_METHODS = (
+    'is_valid_move',
+    'validate',
+    'is_8cut',
+    'check_revolution',
+)
+
+# 呼び出し回数と結果キャッシュのヒット・ミスを数える game.rules の関数 → そのキャッシュ
+RULE_FUNCTION_CACHES = {
+    'describe_field': rules._FIELD_CACHE,
+    'validate_move': rules._MOVE_CACHE,
+}
+
+# 差し替える前の関数（from game.rules import で取り込んだモジュールも、これと同じものを指していれば差し替える）
+_ORIGINAL_RULE_FUNCTIONS = {name: getattr(rules, name) for name in RULE_FUNCTION_CACHES}
+
+
+class StepProfiler:
+    """
+    フェーズごとの累計時間・呼び出し回数と、RuleChecker のメソッド呼び出し回数、
+    describe_field / validate_move の呼び出し回数とキャッシュのヒット・ミスを集計する。
+    使い方:
+        profiler = StepProfiler()
+        env = DaifugoSimpleEnv(..., profiler=profiler)
+        ...（対戦）
+        print(profiler.format_table())
+    """
+
+    def __init__(self):
+        self.timer = time.perf_counter
+        self.reset()
+
+    def reset(self):
+        self.phase_time = {phase: 0.0 for phase in STEP_PHASES}
+        self.phase_calls = {phase: 0 for phase in STEP_PHASES}
+        self.rule_calls = {name: 0 for name in RULE_CHECKER_METHODS}
+        self.cache_calls = {name: 0 for name in RULE_FUNCTION_CACHES}
+        self.cache_misses = {name: 0 for name in RULE_FUNCTION_CACHES}
+        self.steps = 0
+
+    def add(self, phase, elapsed):
+        self.phase_time[phase] += elapsed
+        self.phase_calls[phase] += 1
+
+    def end_step(self):
+        self.steps += 1
+
+    def attach_rule_checker(self, rule_checker):
+        """
+        RuleChecker のメソッドを呼び出し回数を数えるラッパーに差し替える（インスタンス単位）。
+        あわせて describe_field / validate_move を数えるラッパーに差し替える。
+        こちらはモジュールの関数なので、detach_rule_checker で戻すまでプロセス内の全ての呼び出しを数える
+        """
+        for name in RULE_CHECKER_METHODS:
+            method = getattr(type(rule_checker), name).__get__(rule_checker)
+            setattr(rule_checker, name, self._counting(name, method))
+        for name, original in _ORIGINAL_RULE_FUNCTIONS.items():
+            wrapper = self._counting_cache(name, original, RULE_FUNCTION_CACHES[name])
+            for module in list(sys.modules.values()):
+                if getattr(module, name, None) is original:
+                    setattr(module, name, wrapper)
+
+    def detach_rule_checker(self, rule_checker):
+        """
+        attach_rule_checker で差し替えたメソッド・関数を元に戻す
+        """
+        for name in RULE_CHECKER_METHODS:
+            rule_checker.__dict__.pop(name, None)
+        for name, original in _ORIGINAL_RULE_FUNCTIONS.items():
+            for module in list(sys.modules.values()):
+                if getattr(getattr(module, name, None), '__wrapped__', None) is original:
+                    setattr(module, name, original)
+
+    def _counting(self, name, method):
+        calls = self.rule_calls
+
+        def wrapper(*args, **kwargs):
+            calls[name] += 1
+            return method(*args, **kwargs)
+        return wrapper
+
+    def _counting_cache(self, name, func, cache):
+        """
+        呼び出しごとにキャッシュの件数の変化を見て、増えた（または上限で作り直した）ならミスとして数える
+        """
+        calls = self.cache_calls
+        misses = self.cache_misses
+
+        def wrapper(*args):
+            calls[name] += 1
+            size = len(cache)
+            result = func(*args)
+            if len(cache) != size:
+                misses[name] += 1
+            return result
+        wrapper.__wrapped__ = func
+        return wrapper
+
+    def summary(self):
+        """
+        集計結果を辞書で返す（時間は秒、per_step は1手あたり）
+        """
+        steps = self.steps or 1
+        total = sum(self.phase_time.values())
+        phases = {}
+        for phase in STEP_PHASES:
+            elapsed = self.phase_time[phase]
+            phases[phase] = {
+                'total_sec': elapsed,
+                'calls': self.phase_calls[phase],
+                'per_step_us': elapsed / steps * 1e6,
+                'share': elapsed / total if total > 0 else 0.0,
+            }
+        return {
+            'steps': self.steps,
+            'total_sec': total,
+            'phases': phases,
+            'rule_checker_calls': {
+                name: {'calls': count, 'per_step': count / steps}
+                for name, count in self.rule_calls.items()
+            },
+            # hits はキャッシュを引かずに済んだ呼び出し（場が空のときの即答を含む）
+            'rule_cache': {
+                name: {
+                    'calls': count,
+                    'hits': count - self.cache_misses[name],
+                    'misses': self.cache_misses[name],
+                    'hit_rate': (count - self.cache_misses[name]) / count if count else 0.0,
+                    'per_step': count / steps,
+                }
+                for name, count in self.cache_calls.items()
+            },
+        }
+
+    def format_table(self):
+        """
+        集計結果を表形式の文字列にする
+        """
+        summary = self.summary()
+        lines = [f"steps: {summary['steps']}  total: {summary['total_sec']:.3f}s"]
+        lines.append(f"{'phase':16s} {'total[s]':>10s} {'calls':>9s} {'us/step':>10s} {'share':>7s}")
+        for phase, stats in summary['phases'].items():
+            lines.append(
+                f"{phase:16s} {stats['total_sec']:10.3f} {stats['calls']:9d} "
+                f"{stats['per_step_us']:10.1f} {stats['share']:7.1%}"
+            )
+        lines.append(f"{'RuleChecker':24s} {'calls':>9s} {'per step':>10s}")
+        for name, stats in summary['rule_checker_calls'].items():
+            lines.append(f"{name:24s} {stats['calls']:9d} {stats['per_step']:10.2f}")
+        lines.append(f"{'rules cache':24s} {'calls':>9s} {'per step':>10s} {'misses':>9s} {'hit rate':>9s}")
+        for name, stats in summary['rule_cache'].items():
+            lines.append(
+                f"{name:24s} {stats['calls']:9d} {stats['per_step']:10.2f} {stats['misses']:9d} {stats['hit_rate']:9.1%}"
+            )
+        return '\n'.join(lines)
+
+    def dump_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, ensure_ascii=False, indent=2)
@@ -0,0 +1,92 @@
+import struct
+from array import array
+from collections import namedtuple
+from .game import Game
+from .logger import headless_logger
+
+# -----------------------------
+# 1ゲーム分のコンパクトな対戦記録（シード + 選んだ行動番号）と再生
+# 配札は Game.seed(seed) 後の reset だけで決まり、カード交換は前回順位で決まるので、
+# (人数, シード, 前回順位, 行動番号の列) があれば同じ対戦をエンジンの速度で再現できる
+# -----------------------------
+
+GameRecord = namedtuple('GameRecord', ['num_players', 'seed', 'prev_rankings', 'actions'])
+
+# バイト列のヘッダ: 人数, 前回順位の人数, シード
+_HEADER = struct.Struct('<BBQ')
+
+
+def record_to_bytes(record):
+    """
+    GameRecord をバイト列にする（行動番号は1手2バイト）
+    """
+    header = _HEADER.pack(record.num_players, len(record.prev_rankings), record.seed)
+    return header + bytes(record.prev_rankings) + array('H', record.actions).tobytes()
+
+
+def record_from_bytes(data):
+    """
+    record_to_bytes の逆変換
+    """
+    num_players, num_prev, seed = _HEADER.unpack_from(data)
+    start = _HEADER.size
+    prev_rankings = tuple(data[start:start + num_prev])
+    actions = array('H')
+    actions.frombytes(data[start + num_prev:])
+    return GameRecord(num_players, seed, prev_rankings, actions.tolist())
+
+
+def replay_game(record, use_bitmask=True, logger=None, on_step=None):
+    """
+    記録どおりに Game を進め、終局した Game を返す（既定はマスク手札・ログなし）。
+    on_step(game, action) を渡すと各手の直前に呼ぶ（局面の再生成用）
+    """
+    game = Game(
+        num_players=record.num_players, use_bitmask=use_bitmask,
+        logger=logger if logger is not None else headless_logger(),
+    )
+    game.rankings = list(record.prev_rankings)
+    game.seed(record.seed)
+    game.reset()
+    for action in record.actions:
+        if on_step is not None:
+            on_step(game, action)
+        game.apply(action)
+    return game
+
+
+class ReplayAgent:
+    """
+    記録された行動番号を順に選ぶエージェント（replay_trajectory 用）。
+    observation['action_ids'] から記録の行動番号に対応する候補を返す
+    """
+
+    def __init__(self, player_id=None):
+        self.player_id = player_id
+        self.actions = []
+
+    def select_action(self, observation, legal_actions=None):
+        action = self.actions.pop()
+        return legal_actions[observation['action_ids'].index(action)]
+
+
+def replay_trajectory(record, record_sink=None, use_bitmask=False):
+    """
+    記録を DaifugoSimpleEnv で再生し、手番レコード（stage_history と同じ形式）を再生成する。
+    record_sink（write_stage を持つもの）を渡すと区間ごとに書き出す。戻り値: 再生した環境
+    """
+    from .environment import DaifugoSimpleEnv
+    env = DaifugoSimpleEnv(
+        num_players=record.num_players, agent_classes=[ReplayAgent] * record.num_players,
+        use_bitmask=use_bitmask, record_sink=record_sink, headless=True,
+    )
+    env.game.rankings = list(record.prev_rankings)
+    env.reset(seed=record.seed)
+    # 手番ごとに記録の行動を割り振る（各エージェントは後ろから取り出す）
+    turns = []
+    replay_game(record, on_step=lambda game, action: turns.append(game.turn))
+    for player_id, action in zip(reversed(turns), reversed(record.actions)):
+        env.agents[player_id].actions.append(action)
+    for _ in record.actions:
+        env.step()
+    return env
@@ -1,100 +1,84 @@
+from collections import namedtuple
+from .card import JokerSubstitute, JOKER_STRENGTH
+from .straight_table import lookup_straight
+from .logger import GameLogger, INFO, headless_logger
+
+# -----------------------------
+# カード組の記述子（場に置くカードも出そうとするカードも同じ形で表す不変の分類結果）
+# Game は場を置き換えるときに1回だけ求め、is_valid_move / DaifugoSimpleEnv / エージェントは
+# 場のカードを判定し直さずにこれを使う。カード自体は変更しないので、結果はキャッシュして共有できる
+# -----------------------------
+
+# 役種
+FIELD_EMPTY = 'empty'
+FIELD_SINGLE = 'single'  # 自然札1枚
+FIELD_JOKER = 'joker'  # ジョーカー単体
+FIELD_PAIR = 'pair'  # 同ランク2枚以上（ジョーカー込み）
+FIELD_STRAIGHT = 'straight'  # 階段
+FIELD_OTHER = 'other'  # どれにも当たらない組（通常は場に出ない）
+
+# cards: ジョーカーの代用解釈を付けたカード（タプル）、mask: カードのマスク、kind: 役種、count: 枚数
+# strength_max / strength_min: 自然札の強さの最大・最小（自然札がなければ -1）
+# lead_suit: 階段ならそのスート（ジョーカーの位置に依らない）、それ以外は先頭カードのスート（先頭がジョーカーなら None）
+# ranks: 階段のジョーカー補完後のランク列（階段以外は空）
+# is_two_joker_pair: 2 + ジョーカー のペア（上から何も出せない）
+# jokers: ジョーカーごとの代用先 (ランク, スート) の列（代用しないジョーカーは (None, None)）
+FieldDescriptor = namedtuple('FieldDescriptor', [
+    'cards', 'mask', 'kind', 'count', 'strength_max', 'strength_min', 'lead_suit', 'ranks', 'is_two_joker_pair',
+    'jokers',
+])
+
+EMPTY_FIELD = FieldDescriptor((), 0, FIELD_EMPTY, 0, -1, -1, None, (), False, ())
+
+
+# カード交換で渡すカードの並び順（同じ強さならカードID順。手札の並びやマスク手札かどうかに依らない）
+def _strong_first(card):
+    return (-card.strength(), card.card_id)
+
+
+def _weak_first(card):
+    return (card.strength(), card.card_id)
+
+
 class RuleChecker:
-    def __init__(self):
+    def __init__(self, logger=None):
         self.revolution = False  # 革命フラグ
+        self.logger = logger if logger is not None else GameLogger()
 
     def is_valid(self, current_field, cards):
         if cards is None or len(cards) == 0:
             return True
         return self.is_valid_move(cards, current_field)
 
-    def is_valid_move(self, cards, current_field):
-        play_count = len(cards)
-        strengths = [card.strength() for card in cards if not card.is_joker]
-
-        # 階段判定
-        is_straight = self.is_straight(cards)
-
+    def is_valid_move(self, cards, current_field, field_info=None):
+        """
+        cards を current_field の上に出せるか判定する（カードは変更しない）。
+        field_info: 場の FieldDescriptor（Game.field_info）。省略時は describe_field で求める（キャッシュあり）
+        """
         # 場が空ならOK
         if not current_field:
             return True
+        if field_info is None:
+            field_info = describe_field(current_field)
+        return validate_move(describe_field(cards), field_info, self.revolution) is not None
 
-        field_count = len(current_field)
-        # ★場が空でなければ、出す枚数と場の枚数が一致しない場合はFalse
-        if play_count != field_count:
-            return False
-
-        field_strengths = [card.strength() for card in current_field if not card.is_joker]
-        field_is_straight = self.is_straight(current_field)
-
-        # ジョーカー単独出し特別ルール
-        if play_count == 1 and cards[0].is_joker:
-            # ジョーカーの仮想ランク・スートをリセット
-            cards[0].joker_as_rank = None
-            cards[0].joker_as_suit = None
-            # 場がジョーカー単独なら、次もジョーカー単独でしか出せない
-            if field_count == 1 and current_field[0].is_joker:
-                return True
-            # 革命時は3より強い、通常時は2より強い
-            if self.revolution:
-                # 3の強さは1
-                return (field_count == 1 and (not current_field[0].is_joker) and current_field[0].strength() < 2)
-            else:
-                # 2の強さは14
-                return (field_count == 1 and (not current_field[0].is_joker) and current_field[0].strength() < 15)
-
-        # 階段同士の比較
-        if is_straight and field_is_straight:
-            if play_count != field_count:
-                return False
-            if cards[0].suit != current_field[0].suit:
-                return False
-            # ジョーカーを補完した最大/最小ランクで比較
-            play_ranks = self.get_straight_ranks(cards)
-            field_ranks = self.get_straight_ranks(current_field)
-            if not play_ranks or not field_ranks:
-                return False
-            if self.revolution:
-                return self.compare_strength(min(play_ranks), min(field_ranks))
-            else:
-                return self.compare_strength(max(play_ranks), max(field_ranks))
-
-        # 階段出し→通常出し、またはその逆は禁止
-        if is_straight != field_is_straight:
-            return False
-
-        # 通常出し（同ランクのカード or ジョーカー）
-        if not self.is_same_rank_or_joker(cards):
-            return False
-
-        if play_count != field_count:
-            return False
-
-        # --- 2のペア＋ジョーカーの特殊判定 ---
-        # 場が2,ジョーカー(2)のペアなら、何も上書きできない
-        if (
-            play_count == 2 and field_count == 2
-            and self.is_same_rank_or_joker(current_field)
-            and any(card.is_joker for card in current_field)
-            and all((card.rank == 2 or card.is_joker) for card in current_field)
-        ):
-            # 2,ジョーカー(2)のペアが場に出ている場合は、どんなペアも不可
-            return False
-
-        # 強さ比較
-        if self.revolution:
-            field_strength = min(field_strengths) if field_strengths else -1
-            play_strength = min(strengths) if strengths else 0
-        else:
-            field_strength = max(field_strengths) if field_strengths else -1
-            play_strength = max(strengths) if strengths else 0
-        return self.compare_strength(play_strength, field_strength)
+    def validate(self, cards, current_field, field_info=None):
+        """
+        is_valid_move と同じ判定で、出せるなら cards の FieldDescriptor（役種・ジョーカーの代用先・強さなど）、
+        出せなければ None を返す。
+        """
+        play = describe_field(cards)
+        if not current_field:
+            return play
+        if field_info is None:
+            field_info = describe_field(current_field)
+        return validate_move(play, field_info, self.revolution)
 
     def compare_strength(self, a, b):
         """
         革命フラグに応じた強さ比較。ただしジョーカーは常に最強
         a, bはstrength値
         """
-        JOKER_STRENGTH = 15
         if a == JOKER_STRENGTH and b != JOKER_STRENGTH:
             return True
         if b == JOKER_STRENGTH and a != JOKER_STRENGTH:
@@ -104,21 +88,9 @@ class RuleChecker:
     def is_same_rank_or_joker(self, cards):
         non_jokers = [card for card in cards if not card.is_joker]
         if not non_jokers:
-            # 全部ジョーカーの場合は仮想ランク・スートをNoneにリセット
-            for card in cards:
-                if card.is_joker:
-                    card.joker_as_rank = None
-                    card.joker_as_suit = None
             return True
         rank = non_jokers[0].rank
-        suit = non_jokers[0].suit
-        valid = all(card.rank == rank or card.is_joker for card in cards)
-        # ジョーカーが含まれる場合は仮想ランク・スートをセット
-        for card in cards:
-            if card.is_joker:
-                card.joker_as_rank = rank
-                card.joker_as_suit = suit
-        return valid
+        return all(card.rank == rank or card.is_joker for card in cards)
 
     def is_8cut(self, cards):
         """8が含まれていて、かつジョーカーだけではないとき、8切り発動"""
@@ -126,54 +98,40 @@ class RuleChecker:
         has_normal = any(not card.is_joker for card in cards)
         return has_8 and has_normal
 
+    def _lookup_straight(self, cards):
+        """
+        階段判定表（straight_table）を引く。
+        成立すれば (スート, ランク列, ジョーカー割り当てランク列)、不成立ならNoneを返す。
+        ジョーカー以外のカードはすべて同じスートである必要がある。
+        """
+        suit = None
+        rank_mask = 0
+        joker_count = 0
+        for card in cards:
+            if card.is_joker:
+                joker_count += 1
+                continue
+            if suit is None:
+                suit = card.suit
+            elif card.suit != suit:
+                return None
+            rank_mask |= 1 << (card.rank - 1)
+        entry = lookup_straight(rank_mask, joker_count, len(cards))
+        if entry is None:
+            return None
+        return suit, entry[0], entry[1]
+
     def is_straight(self, cards):
         """
         同じスートで連続したランクか判定（ジョーカーで間を埋めることも許可）
         例: 4,ジョーカー,6 や Q,ジョーカー,A など
         ただし2が末尾以外に来る階段（A,2,3や2,3,4等）は不可。K,A,2のみOK。
         ジョーカー補完後も厳密に判定。
+        判定は import 時に構築した階段判定表を1回引くだけで行う。
         """
         if len(cards) < 3:
             return False
-        jokers = [card for card in cards if card.is_joker]
-        non_jokers = [card for card in cards if not card.is_joker]
-        n = len(cards)
-        suit_candidates = set([card.suit for card in non_jokers]) if non_jokers else set(['♠', '♥', '♦', '♣'])
-        for suit in suit_candidates:
-            # 手札のランクリスト
-            hand_ranks = [card.rank for card in non_jokers if card.suit == suit]
-            for start in range(1, 14):
-                expected = [(start + i - 1) % 13 + 1 for i in range(n)]
-                # 2が含まれる場合は2が末尾でなければ不可
-                if 2 in expected and expected[-1] != 2:
-                    continue
-                temp_ranks = hand_ranks[:]
-                used_jokers = []
-                jokers_left = jokers[:]
-                match = 0
-                for idx, val in enumerate(expected):
-                    if val in temp_ranks:
-                        temp_ranks.remove(val)
-                        match += 1
-                    else:
-                        if jokers_left:
-                            # ジョーカーをこのランク・スートに割り当て
-                            joker = jokers_left.pop(0)
-                            joker.joker_as_rank = val
-                            joker.joker_as_suit = suit
-                            used_jokers.append(joker)
-                        else:
-                            break
-                if match + len(used_jokers) == n:
-                    # 2が末尾以外に来る場合は不可
-                    if 2 in expected and expected[-1] != 2:
-                        continue
-                    return True
-        # 失敗時はリセット
-        for joker in jokers:
-            joker.joker_as_rank = None
-            joker.joker_as_suit = None
-        return False
+        return self._lookup_straight(cards) is not None
 
     def get_straight_ranks(self, cards):
         """
@@ -183,42 +141,31 @@ class RuleChecker:
         ただし2が末尾以外に来る階段（A,2,3や2,3,4等）は不可。K,A,2のみOK。
         ジョーカー補完後も厳密に判定。
         """
-        jokers = [c for c in cards if c.is_joker]
-        non_jokers = [c for c in cards if not c.is_joker]
-        n = len(cards)
-        if not non_jokers:
+        if all(c.is_joker for c in cards):
             return []
-        suit_candidates = set([c.suit for c in non_jokers]) if non_jokers else set(['♠', '♥', '♦', '♣'])
-        for suit in suit_candidates:
-            hand_ranks = [c.rank for c in non_jokers if c.suit == suit]
-            for start in range(1, 14):
-                expected = [(start + i - 1) % 13 + 1 for i in range(n)]
-                if 2 in expected and expected[-1] != 2:
-                    continue
-                temp_ranks = hand_ranks[:]
-                used_jokers = []
-                jokers_left = jokers[:]
-                match = 0
-                for idx, val in enumerate(expected):
-                    if val in temp_ranks:
-                        temp_ranks.remove(val)
-                        match += 1
-                    else:
-                        if jokers_left:
-                            joker = jokers_left.pop(0)
-                            joker.joker_as_rank = val
-                            joker.joker_as_suit = suit
-                            used_jokers.append(joker)
-                        else:
-                            break
-                if match + len(used_jokers) == n:
-                    if 2 in expected and expected[-1] != 2:
-                        continue
-                    return expected
-        for joker in jokers:
-            joker.joker_as_rank = None
-            joker.joker_as_suit = None
-        return []
+        found = self._lookup_straight(cards)
+        if found is None:
+            return []
+        return list(found[1])
+
+    def interpret_jokers(self, cards):
+        """
+        出されたカード中のジョーカーを、何の代用として出されたかの解釈（JokerSubstitute）に置き換えたリストを返す。
+        カード自体は変更しない。階段なら補完したランク、同ランクの組なら先頭の自然札のランク・スート。
+        ジョーカー単体やジョーカーだけの組はそのまま。
+        """
+        if not any(card.is_joker for card in cards) or len(cards) < 2:
+            return list(cards)
+        found = self._lookup_straight(cards) if len(cards) >= 3 else None
+        if found is not None:
+            suit, _, joker_ranks = found
+            substitutes = iter(joker_ranks)
+            return [JokerSubstitute(next(substitutes), suit) if card.is_joker else card for card in cards]
+        non_jokers = [card for card in cards if not card.is_joker]
+        if not non_jokers or not self.is_same_rank_or_joker(cards):
+            return list(cards)
+        rank, suit = non_jokers[0].rank, non_jokers[0].suit
+        return [JokerSubstitute(rank, suit) if card.is_joker else card for card in cards]
 
     def check_revolution(self, cards):
         """
@@ -250,11 +197,12 @@ class RuleChecker:
         大富豪ルールの順位に応じたカード交換を行う。
         players: プレイヤーオブジェクトのリスト
         rankings: [1位, 2位, ..., n位]のplayer_idリスト（0-indexed, 1位=大富豪, 最下位=大貧民）
-        デバッグ用に誰がどのカードをもらったかをprint出力
+        デバッグ用に誰がどのカードをもらったかをロガーに出力（INFOレベル）
+        戻り値: 交換内容 [(渡した人, 受け取った人, カードリスト), ...]（交換しなければ空リスト）
         """
         n = len(rankings)
         if n < 4:
-            return  # 順位が確定していない場合は何もしない
+            return []  # 順位が確定していない場合は何もしない
 
         daifugo = rankings[0]
         fugo = rankings[1]
@@ -262,31 +210,190 @@ class RuleChecker:
         dai_hinmin = rankings[-1]
 
         # --- 大貧民→大富豪（2枚） ---　自分の最も強いカードを2枚渡す。
-        dai_hinmin_hand = sorted(players[dai_hinmin].hand, key=lambda c: c.strength(), reverse=True)
+        dai_hinmin_hand = sorted(players[dai_hinmin].hand, key=_strong_first)
         dai_hinmin_give = dai_hinmin_hand[:2]
         for card in dai_hinmin_give:
             players[dai_hinmin].hand.remove(card)
         players[daifugo].hand.extend(dai_hinmin_give)
-        print(f"大貧民(Player {dai_hinmin})→大富豪(Player {daifugo}): {[str(c) for c in dai_hinmin_give]}")
+        if self.logger.is_enabled(INFO):
+            self.logger.info('exchange', "大貧民(Player %s)→大富豪(Player %s): %s", dai_hinmin, daifugo, [str(c) for c in dai_hinmin_give])
 
         # --- 大富豪→大貧民（2枚） ---　自分の最も弱いカードを2枚渡す。
-        daifugo_hand = sorted(players[daifugo].hand, key=lambda c: c.strength())
+        daifugo_hand = sorted(players[daifugo].hand, key=_weak_first)
         daifugo_give = daifugo_hand[:2]
         for card in daifugo_give:
             players[daifugo].hand.remove(card)
         players[dai_hinmin].hand.extend(daifugo_give)
-        print(f"大富豪(Player {daifugo})→大貧民(Player {dai_hinmin}): {[str(c) for c in daifugo_give]}")
+        if self.logger.is_enabled(INFO):
+            self.logger.info('exchange', "大富豪(Player %s)→大貧民(Player %s): %s", daifugo, dai_hinmin, [str(c) for c in daifugo_give])
 
         # --- 貧民→富豪（1枚） ---　自分の最も強いカードを1枚渡す。
-        hinmin_hand = sorted(players[hinmin].hand, key=lambda c: c.strength(), reverse=True)
+        hinmin_hand = sorted(players[hinmin].hand, key=_strong_first)
         hinmin_give = hinmin_hand[0]
         players[hinmin].hand.remove(hinmin_give)
         players[fugo].hand.append(hinmin_give)
-        print(f"貧民(Player {hinmin})→富豪(Player {fugo}): {hinmin_give}")
+        self.logger.info('exchange', "貧民(Player %s)→富豪(Player %s): %s", hinmin, fugo, hinmin_give)
 
         # --- 富豪→貧民（1枚） ---　自分の最も弱いカードを1枚渡す。
-        fugo_hand = sorted(players[fugo].hand, key=lambda c: c.strength())
+        fugo_hand = sorted(players[fugo].hand, key=_weak_first)
         fugo_give = fugo_hand[0]
         players[fugo].hand.remove(fugo_give)
         players[hinmin].hand.append(fugo_give)
-        print(f"富豪(Player {fugo})→貧民(Player {hinmin}): {fugo_give}")
+        self.logger.info('exchange', "富豪(Player %s)→貧民(Player %s): %s", fugo, hinmin, fugo_give)
+
+        return [
+            (dai_hinmin, daifugo, dai_hinmin_give),
+            (daifugo, dai_hinmin, daifugo_give),
+            (hinmin, fugo, [hinmin_give]),
+            (fugo, hinmin, [fugo_give]),
+        ]
+
+
+# 記述子を作るための判定用（革命の状態に依らない判定だけを使う）
+_DESCRIBER = RuleChecker(logger=headless_logger())
+
+# カードID列 → 記述子（出し方の数は限られるが、念のため上限を超えたら作り直す）
+_FIELD_CACHE = {}
+MAX_FIELD_CACHE_SIZE = 1 << 16
+
+
+def describe_field(cards):
+    """
+    場に置くカード（ジョーカーの解釈の有無はどちらでもよい）の FieldDescriptor を返す。
+    同じ並びのカードには同じ記述子を返す（カードID列でキャッシュ）
+    """
+    if not cards:
+        return EMPTY_FIELD
+    key = tuple(card.card_id for card in cards)
+    found = _FIELD_CACHE.get(key)
+    if found is not None:
+        return found
+    if len(_FIELD_CACHE) >= MAX_FIELD_CACHE_SIZE:
+        _FIELD_CACHE.clear()
+    found = _FIELD_CACHE[key] = _describe_field(cards)
+    return found
+
+
+def _describe_field(cards):
+    rules = _DESCRIBER
+    cards = tuple(rules.interpret_jokers(cards))
+    mask = 0
+    for card in cards:
+        mask |= 1 << card.card_id
+    count = len(cards)
+    strengths = [card.strength() for card in cards if not card.is_joker]
+    ranks = ()
+    lead_suit = cards[0].suit
+    if rules.is_straight(cards):
+        kind = FIELD_STRAIGHT
+        ranks = tuple(rules.get_straight_ranks(cards))
+        # 階段同士はスートで比べるので、出した並び（ジョーカーが先頭かどうか）で変わらないようにする
+        lead_suit = next(card.suit for card in cards if not card.is_joker)
+    elif count == 1:
+        kind = FIELD_JOKER if cards[0].is_joker else FIELD_SINGLE
+    elif strengths and rules.is_same_rank_or_joker(cards):
+        kind = FIELD_PAIR
+    else:
+        kind = FIELD_OTHER
+    is_two_joker_pair = (
+        count == 2
+        and rules.is_same_rank_or_joker(cards)
+        and any(card.is_joker for card in cards)
+        and all(card.rank == 2 or card.is_joker for card in cards)
+    )
+    jokers = tuple((card.joker_as_rank, card.joker_as_suit) for card in cards if card.is_joker)
+    return FieldDescriptor(
+        cards, mask, kind, count,
+        max(strengths) if strengths else -1, min(strengths) if strengths else -1,
+        lead_suit, ranks, is_two_joker_pair, jokers,
+    )
+
+
+# (出す手の記述子, 場の記述子, 革命) → 判定結果（記述子と革命の状態だけで決まるのでメモ化できる）
+_MOVE_CACHE = {}
+MAX_MOVE_CACHE_SIZE = 1 << 18
+
+
+def validate_move(play, field, revolution):
+    """
+    play（出す手の FieldDescriptor）を field（場の FieldDescriptor）の上に出せるか判定する純粋関数。
+    出せるなら play、出せなければ None を返す。カードにも RuleChecker にも触れないので、
+    スレッドや探索の分岐をまたいで結果を共有できる。
+    """
+    if field.kind == FIELD_EMPTY:
+        return play
+    key = (play, field, revolution)
+    found = _MOVE_CACHE.get(key, False)
+    if found is not False:
+        return found
+    if len(_MOVE_CACHE) >= MAX_MOVE_CACHE_SIZE:
+        _MOVE_CACHE.clear()
+    found = _MOVE_CACHE[key] = play if _check_move(play, field, revolution) else None
+    return found
+
+
+def clear_caches():
+    """
+    describe_field / validate_move のキャッシュを捨てる（キャッシュなしの時間を測るとき・メモリを空けたいとき用）
+    """
+    _FIELD_CACHE.clear()
+    _MOVE_CACHE.clear()
+
+
+def _stronger(a, b, revolution):
+    """革命フラグに応じた強さ比較（RuleChecker.compare_strength と同じ。ジョーカーは常に最強）"""
+    if a == JOKER_STRENGTH and b != JOKER_STRENGTH:
+        return True
+    if b == JOKER_STRENGTH and a != JOKER_STRENGTH:
+        return False
+    return a < b if revolution else a > b
+
+
+def _check_move(play, field, revolution):
+    # ★出す枚数と場の枚数が一致しない場合はFalse
+    if play.count != field.count:
+        return False
+
+    # ジョーカー単独出し特別ルール
+    if play.kind == FIELD_JOKER:
+        # 場がジョーカー単独なら、次もジョーカー単独でしか出せない
+        if field.kind == FIELD_JOKER:
+            return True
+        if field.kind != FIELD_SINGLE:
+            return False
+        # 革命時は3より強い（3の強さは1）、通常時は2より強い（2の強さは14）
+        return field.strength_max < (2 if revolution else 15)
+
+    is_straight = play.kind == FIELD_STRAIGHT
+    field_is_straight = field.kind == FIELD_STRAIGHT
+
+    # 階段同士の比較
+    if is_straight and field_is_straight:
+        if play.lead_suit != field.lead_suit:
+            return False
+        # ジョーカーを補完した最大/最小ランクで比較
+        if not play.ranks or not field.ranks:
+            return False
+        if revolution:
+            return _stronger(min(play.ranks), min(field.ranks), revolution)
+        return _stronger(max(play.ranks), max(field.ranks), revolution)
+
+    # 階段出し→通常出し、またはその逆は禁止
+    if is_straight != field_is_straight:
+        return False
+
+    # 通常出し（同ランクのカード or ジョーカー。自然札のない組も同ランク扱い）
+    if play.kind == FIELD_OTHER and play.strength_max != -1:
+        return False
+
+    # --- 2のペア＋ジョーカーの特殊判定 ---
+    # 場が2,ジョーカー(2)のペアなら、何も上書きできない
+    if field.is_two_joker_pair:
+        return False
+
+    # 強さ比較（自然札のない組の強さは 0）
+    if revolution:
+        play_strength = play.strength_min if play.strength_min != -1 else 0
+        return _stronger(play_strength, field.strength_min, revolution)
+    play_strength = play.strength_max if play.strength_max != -1 else 0
+    return _stronger(play_strength, field.strength_max, revolution)
@@ -0,0 +1,28 @@
+import random
+
+# -----------------------------
+# 乱数生成器の受け渡し
+# Game / DaifugoSimpleEnv / エージェントは seed か rng（random.Random）を受け取り、自分の生成器だけを使う。
+# どちらも渡さなければ従来通りグローバルな random モジュールを使う
+# -----------------------------
+
+# 子の生成器に渡すシードのビット数
+SEED_BITS = 63
+
+
+def make_rng(seed=None, rng=None):
+    """
+    rng があればそれを、seed があれば random.Random(seed) を、どちらもなければ random モジュールを返す
+    """
+    if rng is not None:
+        return rng
+    if seed is not None:
+        return random.Random(seed)
+    return random
+
+
+def spawn_seed(rng):
+    """
+    rng から子の生成器用のシードを1つ引く（ワーカー・ゲーム・エージェントごとに独立した系列を作る）
+    """
+    return rng.getrandbits(SEED_BITS)
@@ -0,0 +1,73 @@
+from itertools import combinations
+
+# -----------------------------
+# 階段（同スート連番）の判定表
+# キー: (スート内ランクマスク, ジョーカー枚数, 枚数)
+# 値:   (補完後のランク列, ジョーカーに割り当てるランク列)
+# import時に一度だけ構築し、RuleChecker.is_straight / get_straight_ranks から参照する
+# -----------------------------
+
+# 想定するジョーカーの最大枚数（デッキは1枚だが54枚構成にも対応）
+MAX_JOKERS = 2
+
+# 1スート13枚 + ジョーカーで作れる最大枚数
+MAX_STRAIGHT_LENGTH = 13 + MAX_JOKERS
+
+
+def _expected_ranks(start, length):
+    """
+    startから始まるlength枚の連番（Kの次はA, Aの次は2）
+    """
+    return [(start + i - 1) % 13 + 1 for i in range(length)]
+
+
+def _rank_mask(ranks):
+    mask = 0
+    for rank in ranks:
+        mask |= 1 << (rank - 1)
+    return mask
+
+
+def _build_straight_table():
+    """
+    従来の探索（開始ランク1〜13を順に試し、足りないランクをジョーカーで埋める）と
+    同じ結果になるように表を作る。
+    - 2が末尾以外に来る並び（A,2,3 や 2,3,4 など）は不可。K,A,2 のみOK
+    - 複数の開始位置で成立する場合は開始ランクが小さいものを優先
+    """
+    table = {}
+    for length in range(1, MAX_STRAIGHT_LENGTH + 1):
+        for start in range(1, 14):
+            expected = _expected_ranks(start, length)
+            if 2 in expected and expected[-1] != 2:
+                continue
+            distinct = sorted(set(expected))
+            for jokers in range(MAX_JOKERS + 1):
+                natural_count = length - jokers
+                if natural_count < 0 or natural_count > len(distinct):
+                    continue
+                for removed in combinations(distinct, len(distinct) - natural_count):
+                    naturals = [r for r in distinct if r not in removed]
+                    key = (_rank_mask(naturals), jokers, length)
+                    if key in table:
+                        continue  # 開始ランクが小さい並びを優先
+                    # ジョーカーは出現順に、見つからないランクへ前から割り当てる
+                    remaining = naturals[:]
+                    joker_ranks = []
+                    for val in expected:
+                        if val in remaining:
+                            remaining.remove(val)
+                        else:
+                            joker_ranks.append(val)
+                    table[key] = (tuple(expected), tuple(joker_ranks))
+    return table
+
+
+STRAIGHT_TABLE = _build_straight_table()
+
+
+def lookup_straight(rank_mask, joker_count, length):
+    """
+    階段として成立すれば (ランク列, ジョーカーの割り当てランク列) を、不成立ならNoneを返す
+    """
+    return STRAIGHT_TABLE.get((rank_mask, joker_count, length))
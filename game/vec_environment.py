@@ -0,0 +1,296 @@
+import numpy as np
+from .bitmask import JOKER_ID, NUM_CARD_IDS
+from .card import card_from_id
+from .action_space import (
+    PASS_ACTION, KIND_JOKER_SINGLE,
+    ACTION_MASKS, ACTION_KIND, ACTION_IS_8CUT, ACTION_IS_REVOLUTION,
+    legal_action_mask_batch,
+)
+from .observation import BatchObservationEncoder
+
+# デッキに含まれるカードのビット番号（52枚 + ジョーカー1枚）
+DECK_IDS = np.array(list(range(52)) + [JOKER_ID], dtype=np.int64)
+
+# カードの強さ（Card.strength と同じ。ジョーカーは15）
+CARD_STRENGTH = np.zeros(NUM_CARD_IDS, dtype=np.int8)
+for _i in DECK_IDS:
+    CARD_STRENGTH[_i] = card_from_id(_i).strength()
+
+# 強い順・弱い順に並べたビット番号（カード交換用）
+_STRONG_FIRST = [int(i) for i in sorted(DECK_IDS, key=lambda i: -CARD_STRENGTH[i])]
+_WEAK_FIRST = [int(i) for i in sorted(DECK_IDS, key=lambda i: CARD_STRENGTH[i])]
+
+
+def popcount64(masks):
+    """
+    uint64配列の各要素のビット数
+    """
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(masks).astype(np.int8)
+    return unpack_masks(masks).sum(axis=-1, dtype=np.int8)
+
+
+def unpack_masks(masks):
+    """
+    uint64マスク配列を (..., 54) のbool配列に展開する
+    """
+    masks = np.ascontiguousarray(masks, dtype='<u8')
+    bits = np.unpackbits(masks.view(np.uint8).reshape(masks.shape + (8,)), axis=-1, bitorder='little')
+    return bits[..., :NUM_CARD_IDS].astype(bool)
+
+
+def _take_cards(mask, order, k):
+    """
+    マスクから order の順にk枚選んだマスクを返す（カード交換用）
+    """
+    taken = 0
+    for i in order:
+        if k == 0:
+            break
+        if mask >> i & 1:
+            taken |= 1 << i
+            k -= 1
+    return taken
+
+
+class VecDaifugoEnv:
+    """
+    N個の独立したゲームを同時に1手ずつ進める環境。
+    手札・場・手番・パス・革命・順位はすべてNumPy配列で保持し、
+    観測・合法手マスク・報酬を配列で返す。終了したゲームは自動でリセットする。
+    ルールは Game / RuleChecker と同じ（行動は game.action_space の番号で指定）。
+    """
+
+    def __init__(self, num_envs, num_players=4, seed=None, exchange=True):
+        self.num_envs = num_envs
+        self.num_players = num_players
+        self.exchange = exchange  # 前回順位によるカード交換を行うか
+        self.rng = np.random.default_rng(seed)
+        n, p = num_envs, num_players
+        self.hands = np.zeros((n, p), dtype=np.uint64)  # 各プレイヤーの手札マスク
+        self.field = np.full(n, -1, dtype=np.int64)  # 場の行動番号（-1 = 場が空）
+        self.played = np.zeros(n, dtype=np.uint64)  # 出されたカードのマスク
+        self.turn = np.zeros(n, dtype=np.int64)  # 手番プレイヤー
+        self.turn_count = np.zeros(n, dtype=np.int64)
+        self.passed = np.zeros((n, p), dtype=bool)
+        self.last_player = np.full(n, -1, dtype=np.int64)  # 最後にカードを出したプレイヤー（-1 = なし）
+        self.revolution = np.zeros(n, dtype=bool)
+        self.rankings = np.full((n, p), -1, dtype=np.int64)  # 上がった順のプレイヤーID
+        self.num_ranked = np.zeros(n, dtype=np.int64)
+        self.prev_rankings = np.full((n, p), -1, dtype=np.int64)  # 前回ゲームの順位（交換用）
+        self.episode_count = np.zeros(n, dtype=np.int64)
+        self._legal_mask = None
+        self.obs_encoder = BatchObservationEncoder(num_envs, num_players)
+
+    # --- リセット ---
+    def reset(self):
+        """
+        全ゲームを初期化し、(観測, 合法手マスク) を返す
+        """
+        self.prev_rankings[:] = -1
+        self._reset_envs(np.arange(self.num_envs))
+        return self._get_obs(), self.legal_action_mask()
+
+    def _reset_envs(self, env_ids):
+        """
+        指定したゲームだけ配り直す（前回順位があればカード交換も行う）
+        """
+        if len(env_ids) == 0:
+            return
+        p = self.num_players
+        decks = self.rng.permuted(np.tile(DECK_IDS, (len(env_ids), 1)), axis=1)
+        bits = np.left_shift(np.uint64(1), decks.astype(np.uint64))
+        for player in range(p):
+            self.hands[env_ids, player] = np.bitwise_or.reduce(bits[:, player::p], axis=1)
+        self.field[env_ids] = -1
+        self.played[env_ids] = 0
+        self.turn[env_ids] = 0
+        self.turn_count[env_ids] = 0
+        self.passed[env_ids] = False
+        self.last_player[env_ids] = -1
+        self.revolution[env_ids] = False
+        self.rankings[env_ids] = -1
+        self.num_ranked[env_ids] = 0
+        if self.exchange and p >= 4:
+            for env_id in env_ids:
+                if self.prev_rankings[env_id, -1] >= 0:
+                    self._exchange_cards(env_id, self.prev_rankings[env_id])
+
+    def _exchange_cards(self, env_id, rankings):
+        """
+        RuleChecker.exchange_cards_by_rankings と同じ順序で交換する
+        """
+        hands = [int(h) for h in self.hands[env_id]]
+        daifugo, fugo, hinmin, dai_hinmin = rankings[0], rankings[1], rankings[-2], rankings[-1]
+        for giver, receiver, order, k in (
+            (dai_hinmin, daifugo, _STRONG_FIRST, 2),
+            (daifugo, dai_hinmin, _WEAK_FIRST, 2),
+            (hinmin, fugo, _STRONG_FIRST, 1),
+            (fugo, hinmin, _WEAK_FIRST, 1),
+        ):
+            give = _take_cards(hands[giver], order, k)
+            hands[giver] &= ~give
+            hands[receiver] |= give
+        self.hands[env_id] = np.array(hands, dtype=np.uint64)
+
+    # --- 1手進める ---
+    def step(self, actions):
+        """
+        各ゲームの手番プレイヤーの行動番号を受け取り、1手ずつ進める。
+        合法でない行動はパスとして扱う（Game.step と同じ）。
+        戻り値: (観測, 合法手マスク, 報酬, 終了フラグ, info)
+        報酬は手番プレイヤーがこの手で上がった場合1.0
+        """
+        n, p = self.num_envs, self.num_players
+        env_ids = np.arange(n)
+        actions = np.asarray(actions, dtype=np.int64)
+        if self._legal_mask is None:
+            self.legal_action_mask()
+        players = self.turn.copy()
+        field_before = self.field.copy()
+        valid = self._legal_mask[env_ids, actions] & (actions != PASS_ACTION)
+        rewards = np.zeros(n, dtype=np.float32)
+        special = np.zeros(n, dtype=bool)
+
+        # --- カードを出す ---
+        play = env_ids[valid]
+        if len(play):
+            a = actions[play]
+            pp = players[play]
+            action_masks = ACTION_MASKS[a]
+            self.hands[play, pp] &= ~action_masks
+            self.played[play] |= action_masks
+            self.field[play] = a
+            self.last_player[play] = pp
+            self.passed[play] = False
+            self.revolution[play] ^= ACTION_IS_REVOLUTION[a]
+            # 上がり判定
+            out = play[self.hands[play, pp] == 0]
+            if len(out):
+                self.rankings[out, self.num_ranked[out]] = players[out]
+                self.num_ranked[out] += 1
+                rewards[out] = 1.0
+            # 8切り・ジョーカー単体は場を流して同じプレイヤーから再開
+            special[play] = ACTION_IS_8CUT[a] | (ACTION_KIND[a] == KIND_JOKER_SINGLE)
+            self._reset_field(env_ids[special])
+
+        # --- パス ---
+        skip = env_ids[~valid]
+        if len(skip):
+            self.passed[skip, players[skip]] = True
+
+        # 最後に出したプレイヤー以外が全員パスまたは上がり → 場を流す
+        # （カードを出した場合は、出す前の場が空でなかったときのみ。Game._handle_action と同じ）
+        others_done = self.passed | (self.hands == 0)
+        has_last = self.last_player >= 0
+        others_done[env_ids[has_last], self.last_player[has_last]] = True
+        flush = has_last & others_done.all(axis=1) & (~valid | (~special & (field_before >= 0)))
+        self._reset_field(env_ids[flush])
+
+        # 残り1人になったら最下位を確定
+        finishing = env_ids[self.num_ranked == p - 1]
+        for env_id in finishing:
+            last = [i for i in range(p) if i not in self.rankings[env_id, :p - 1]][0]
+            self.rankings[env_id, p - 1] = last
+            self.num_ranked[env_id] = p
+        done = self.num_ranked == p
+
+        # 手番を進める（場が流れた場合は最後に出したプレイヤーから再開）
+        field_reset = special | flush
+        self._advance_turn(env_ids[~done & ~field_reset])
+        # 再開するプレイヤーがすでに上がっていたら次の人へ
+        stalled = env_ids[~done & field_reset]
+        stalled = stalled[self.hands[stalled, self.turn[stalled]] == 0]
+        self._advance_turn(stalled)
+
+        # --- 終了したゲームを自動リセット ---
+        final_rankings = np.full((n, p), -1, dtype=np.int64)
+        finished = env_ids[done]
+        if len(finished):
+            final_rankings[finished] = self.rankings[finished]
+            self.prev_rankings[finished] = self.rankings[finished]
+            self.episode_count[finished] += 1
+            self._reset_envs(finished)
+
+        info = {
+            'acting_player': players,
+            'played': valid,
+            'final_rankings': final_rankings,
+        }
+        return self._get_obs(), self.legal_action_mask(), rewards, done, info
+
+    def _reset_field(self, env_ids):
+        """
+        場を流し、パス情報をリセット。最後に出したプレイヤーに手番を戻す
+        """
+        if len(env_ids) == 0:
+            return
+        self.field[env_ids] = -1
+        self.passed[env_ids] = False
+        self.turn_count[env_ids] += 1
+        self.turn[env_ids] = self.last_player[env_ids]
+
+    def _advance_turn(self, env_ids):
+        """
+        手札が残っている次のプレイヤーに手番を進める
+        """
+        if len(env_ids) == 0:
+            return
+        current = self.turn[env_ids]
+        active = self.hands[env_ids] != 0
+        next_turn = current.copy()
+        found = np.zeros(len(env_ids), dtype=bool)
+        for offset in range(1, self.num_players + 1):
+            candidate = (current + offset) % self.num_players
+            hit = ~found & active[np.arange(len(env_ids)), candidate]
+            next_turn[hit] = candidate[hit]
+            found |= hit
+        self.turn_count[env_ids] += next_turn != current
+        self.turn[env_ids] = next_turn
+
+    # --- 観測 ---
+    def current_hands(self):
+        """
+        各ゲームの手番プレイヤーの手札マスク (N,)
+        """
+        return self.hands[np.arange(self.num_envs), self.turn]
+
+    def legal_action_mask(self):
+        """
+        各ゲームの手番プレイヤーの合法手マスク (N, NUM_ACTIONS)
+        """
+        self._legal_mask = legal_action_mask_batch(self.current_hands(), self.field, self.revolution)
+        return self._legal_mask
+
+    def _get_obs(self):
+        field_masks = np.where(self.field >= 0, ACTION_MASKS[np.maximum(self.field, 0)], np.uint64(0))
+        return {
+            'hand': unpack_masks(self.current_hands()),
+            'field': unpack_masks(field_masks),
+            'played': unpack_masks(self.played),
+            'hand_counts': popcount64(self.hands),
+            'revolution': self.revolution.copy(),
+            'passed': self.passed.copy(),
+            'turn': self.turn.copy(),
+        }
+
+    def encode_observations(self, out=None):
+        """
+        各ゲームの手番プレイヤー視点のテンソル観測 (N, size) float32（game.observation の並び）。
+        戻り値はエンコーダのバッファなので、保持する場合はコピーするか out を渡す
+        """
+        field_masks = ACTION_MASKS[np.maximum(self.field, 0)]  # 場が空（-1）はパス（空マスク）
+        return self.obs_encoder.encode(
+            self.current_hands(), field_masks, self.played, popcount64(self.hands),
+            self.revolution, self.passed, self.turn, out=out,
+        )
+
+    def sample_random_actions(self, legal_mask=None):
+        """
+        合法手から一様にランダムに選んだ行動番号 (N,)
+        """
+        if legal_mask is None:
+            legal_mask = self._legal_mask if self._legal_mask is not None else self.legal_action_mask()
+        cumulative = np.cumsum(legal_mask, axis=1, dtype=np.int32)
+        pick = (self.rng.random(len(legal_mask)) * cumulative[:, -1]).astype(np.int32)
+        return (cumulative <= pick[:, None]).argmin(axis=1)
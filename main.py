@@ -3,13 +3,77 @@ from collections import defaultdict
 from agents.straight_agent import StraightAgent
 from agents.random_agent import RandomAgent
 from agents.rule_based_agent import RuleBasedAgent
+from runner.selfplay_runner import run_selfplay
+from runner.tournament import run_tournament, print_standings
+from game.logger import GameLogger, DEBUG, INFO, headless_logger
+from game.profiler import StepProfiler
 
 NUM_EPISODES = 10  # シミュレーションするゲームの回数
+NUM_WORKERS = 1  # 並列に自己対戦を行うプロセス数（1なら1プロセスで逐次実行し、対戦ログを表示）
+SEED = 0  # 並列実行時の乱数シード（ワーカーごとに SEED + ワーカー番号 を使う）
+LOG_LEVEL = DEBUG  # 逐次実行時のログレベル（DEBUG: 区間ごとの報酬まで表示、INFO: 対戦の進行のみ）
+HEADLESS = False  # Trueならゲーム中のログを一切出さず、最後の順位集計だけ表示
+PROFILE = False  # Trueなら step のフェーズ別の時間と RuleChecker の呼び出し回数を最後に表示
+TOURNAMENT = False  # Trueなら TOURNAMENT_POOL の総当たり戦（座席をずらした全ての並び）を NUM_WORKERS プロセスで行う
+TOURNAMENT_OUTPUT = 'tournament.json'  # 総当たり戦の結果JSONの出力先
+TOURNAMENT_POOL = [RandomAgent, RuleBasedAgent, StraightAgent]  # 総当たり戦に出すエージェント（評価したいクラスを足す）
+
+
+def print_rank_stats(rank_stats, num_players):
+    """
+    累計順位集計を表示する
+    """
+    print("\n📊 累計順位集計（プレイヤー別）:")
+
+    # 各プレイヤーごとに順位回数を表示
+    for player_id in range(num_players):
+        print(f"Player {player_id}: ", end="")
+        for rank in range(1, num_players + 1):
+            count = rank_stats[rank].get(player_id, 0)
+            print(f"{rank}位: {count}回 ", end="")
+        print()  # 改行
+
+
+def main_parallel(agent_classes, num_players=4):
+    """
+    プロセスプールで自己対戦を行い、順位集計とワーカーごとのスループットを表示する
+    """
+    rank_stats, worker_stats = run_selfplay(
+        agent_classes, NUM_EPISODES, num_workers=NUM_WORKERS, num_players=num_players, seed=SEED
+    )
+    print_rank_stats(rank_stats, num_players)
+    print("\n⚡ ワーカー別スループット:")
+    for stats in worker_stats:
+        print(
+            f"Worker {stats['worker_id']}: {stats['episodes']}ゲーム "
+            f"{stats['episodes_per_sec']:.1f} games/s {stats['steps_per_sec']:.1f} steps/s"
+        )
+
+
+def main_tournament(agent_pool, num_players=4):
+    """
+    agent_pool の総当たり戦を行い、レーティング順の成績を表示して結果をJSONに書き出す
+    """
+    report = run_tournament(
+        agent_pool, games_per_seating=NUM_EPISODES, num_players=num_players, num_workers=NUM_WORKERS, seed=SEED,
+        output_path=TOURNAMENT_OUTPUT,
+    )
+    print_standings(report)
+    print(f"\n結果を書き出しました: {TOURNAMENT_OUTPUT}")
+
 
 def main():
     # エージェントのクラスを指定
     agent_classes = [RandomAgent, RandomAgent, RuleBasedAgent, RuleBasedAgent]
-    env = DaifugoSimpleEnv(num_players=4, agent_classes=agent_classes)  # プレイヤー数4人で環境を初期化
+    if TOURNAMENT:
+        main_tournament(TOURNAMENT_POOL, num_players=4)
+        return
+    if NUM_WORKERS > 1:
+        main_parallel(agent_classes, num_players=4)
+        return
+    logger = headless_logger() if HEADLESS else GameLogger(level=LOG_LEVEL)
+    profiler = StepProfiler() if PROFILE else None
+    env = DaifugoSimpleEnv(num_players=4, agent_classes=agent_classes, logger=logger, profiler=profiler)  # プレイヤー数4人で環境を初期化
 
     # 順位の集計用: {順位（1〜4）: {player_id: カウント数}}
     rank_stats = defaultdict(lambda: defaultdict(int))
@@ -18,23 +82,23 @@ def main():
         obs = env.reset()
         done = False
 
-        print(f"\n🃏 Episode {episode + 1} 開始")  # ゲーム開始のログ表示
+        logger.info('episode_start', "\n🃏 Episode %s 開始", episode + 1)  # ゲーム開始のログ表示
 
         # 1ゲームが終了するまでステップを繰り返す
         while not done:
             obs, reward, done, info = env.step(return_info=True)
 
             # 出されたカード or パスの表示
-            if 'played_cards' in info:
+            if 'played_cards' in info and logger.is_enabled(INFO):
                 if info['played_cards']:
-                    print(f"Player {info['player_id']} played: ", end="")
-                    print(", ".join(str(card) for card in info['played_cards']))
+                    logger.info('play', "Player %s played: %s", info['player_id'],
+                                ", ".join(str(card) for card in info['played_cards']))
                 else:
-                    print(f"Player {info['player_id']} passed.")
+                    logger.info('pass', "Player %s passed.", info['player_id'])
 
             # 場がリセットされた場合
             if info.get('reset_happened'):
-                print("--- 場がリセットされました ---")
+                logger.info('field_reset', "--- 場がリセットされました ---")
 
     
         # 順位集計
@@ -43,15 +107,10 @@ def main():
 
 
     # 全エピソード終了後の順位集計を表示
-    print("\n📊 累計順位集計（プレイヤー別）:")
-
-    # 各プレイヤーごとに順位回数を表示
-    for player_id in range(env.num_players):
-        print(f"Player {player_id}: ", end="")
-        for rank in range(1, env.num_players + 1):
-            count = rank_stats[rank].get(player_id, 0)
-            print(f"{rank}位: {count}回 ", end="")
-        print()  # 改行
+    print_rank_stats(rank_stats, env.num_players)
+    if profiler is not None:
+        print("\n⏱ step のフェーズ別計測:")
+        print(profiler.format_table())
 
 if __name__ == "__main__":
     main()
@@ -1,9 +1,15 @@
 #------ランダムな動作をするエージェント（デバッグ・学習比較用）------
 import random
+import numpy as np
 
-def select_random_action(observation):
-    hand = observation['hand']
-    # 手札のうち、カード枚数が0でないもののインデックスを列挙し、最後にパス用のアクション（handの長さ）を追加
-    possible_actions = [i for i, r in enumerate(hand) if r != 0] + [len(hand)]  # PASS = last index
-    # 可能なアクションの中からランダムに1つ選択して返す
+def select_random_action(observation, action_mask=None):
+    """
+    re_game.environment.DaifugoEnv 用: 合法手マスク（info['action_mask']）の中からランダムに行動番号を選ぶ。
+    action_mask を渡さなければ、手札（観測の先頭54次元）のカード1枚かパス（0）をランダムに選ぶ
+    """
+    if action_mask is not None:
+        return int(random.choice(np.flatnonzero(action_mask)))
+    # 単体出しの行動番号はカードのビット番号 + 1（ジョーカーは53番）
+    hand = observation[:54]
+    possible_actions = [i + 1 if i < 52 else 53 for i in np.flatnonzero(hand)] + [0]  # PASS = 0
     return random.choice(possible_actions)
@@ -1,64 +1,250 @@
 import random
-from re_game.game import Game  # ゲームのロジックを持つクラスをインポート
-from gym.spaces import Discrete, Dict, Box  # OpenAI Gym 形式の環境を作るための空間定義
 import numpy as np
+try:
+    import gymnasium as gym  # Gymnasium 形式（reset が (観測, info)、step が5つ組）
+except ImportError:
+    import gym  # 旧 OpenAI Gym しかない環境用（API は同じく Gymnasium 形式で返す）
+Discrete, Box = gym.spaces.Discrete, gym.spaces.Box
+from game.game import Game
+from game.card import NUM_CARD_IDS, card_from_id
+from game.bitmask import mask_of
+from game.logger import headless_logger
+from game.seeding import SEED_BITS
+from game.observation import ObservationEncoder
+from game.action_space import (
+    ACTION_CARD_IDS, NUM_ACTIONS, PASS_ACTION, MASK_TO_ACTION, action_index_of, legal_action_mask,
+)
 
-# 大富豪ゲームの強化学習用環境クラス
-class DaifugoEnv:
-    def __init__(self, num_players=4):
+# -----------------------------
+# 強化学習用の Gym / Gymnasium 互換環境（本体の game.game.Game の上に作る）
+# - 行動空間: game.action_space の固定の行動番号（Discrete(NUM_ACTIONS)、0 = パス）
+# - 観測: game.observation のテンソル（手番プレイヤー視点の float32 ベクトル）
+# - info['action_mask']: 合法手マスク (NUM_ACTIONS,) bool（MaskablePPO 等向けに action_masks() もある）
+# - reset は同じ Game をその場で配り直す（作り直さない）
+# opponents を渡すと learner_id の席だけを外から動かし、他の席はそのエージェントが自動で打つ。
+# 渡さなければ毎手、手番のプレイヤーの行動を受け取る（自己対戦用）
+# -----------------------------
+
+# 行動番号 → 出すカードリスト（パスはNone）
+ACTION_CARDS = [[card_from_id(i) for i in ids] or None for ids in ACTION_CARD_IDS]
+
+# 1ゲームの手数の上限（超えたら truncated）
+DEFAULT_MAX_STEPS = 1000
+
+
+def rank_score(rank, num_players):
+    """
+    順位（0始まり）の報酬。1位 = 1.0、最下位 = 0.0
+    """
+    return 1.0 - rank / (num_players - 1)
+
+
+class DaifugoEnv(gym.Env):
+    """
+    大富豪の Gym / Gymnasium 互換環境。
+    報酬は、対象のプレイヤー（opponents ありなら learner_id、なしなら手番のプレイヤー）が
+    上がって順位が決まった手で rank_score を与える。
+    合法手は RuleChecker と同じ判定を行動空間の表引きで求める。場が空のときのパスは除く（出せる手は必ずある）。
+    合法でない行動はパスとして扱い、info['invalid_action'] を True にする（Game.step と同じ）。
+    """
+    metadata = {'render_modes': ['human', 'ansi']}
+
+    def __init__(self, num_players=4, opponents=None, learner_id=0, seed=None, use_bitmask=True,
+                 max_steps=DEFAULT_MAX_STEPS, render_mode=None):
         self.num_players = num_players
-        self.game = Game(num_players=num_players)  # ゲームのインスタンスを生成
-        self.action_space = Discrete(54)  # 行動空間：最大54枚のカード（ジョーカー含む）
-        self.observation_space = Dict({  # 観測空間：手札と場のカード
-            'hand': Box(low=-1, high=53, shape=(27,), dtype=np.int32),  # 手札（最大27枚まで）
-            'field': Box(low=-1, high=53, shape=(), dtype=np.int32)  # 現在の場のカード（1枚）
-        })
-        self.reset()  # 初期化
-
-    # 環境の初期化（ゲームの再スタート）
-    def reset(self):
-        self.game = Game(num_players=self.num_players)
-        return self._get_obs()
-
-    # 環境の1ステップを進める（行動を実行）
-    def step(self, action_idx):
-        player = self.game.players[self.game.turn]
-        action_card = None
-
-        # 行動が有効なインデックス内であればカードを取得
-        if action_idx < len(player.hand):
-            action_card = player.hand[action_idx]
-
-        # ゲームに1ステップ進ませる
-        valid, reward, false = self.game.step(self.game.turn, action_card)
-        done = self.game.done  # ゲーム終了フラグ
-        obs = self._get_obs()  # 次の観測を取得
-        return obs, reward, done, {}  # Gym互換の戻り値
-
-    # カード情報を数値に変換する関数（観測用）
-    def _encode_card(self, card):
-        if card.is_joker:
-            return 53  # ジョーカーは53で表現
-        suit_map = {'♠': 0, '♥': 1, '♦': 2, '♣': 3}  # スートのマッピング
-        return suit_map[card.suit] * 13 + (card.rank - 1)  # 0〜51の範囲でエンコード
-
-    # 観測データの生成（手札と場のカードをエンコード）
-    def _get_obs(self):
-        player = self.game.players[self.game.turn]
-        hand_encoded = [self._encode_card(c) for c in player.hand]
-        hand_encoded += [-1] * (27 - len(hand_encoded))  # 手札が27枚未満なら-1で埋める
-        field_card = self.game.current_field[-1] if self.game.current_field else None
-        field_encoded = self._encode_card(field_card) if field_card else -1
-
-        return {
-            'hand': np.array(hand_encoded, dtype=np.int32),
-            'field': field_encoded
-        }
-
-    # 現在の状態をコンソールに出力（人間向けデバッグ用）
+        self.learner_id = learner_id if opponents is not None else None
+        self.max_steps = max_steps
+        self.render_mode = render_mode
+        self.game = Game(num_players=num_players, use_bitmask=use_bitmask, logger=headless_logger(), seed=seed)
+        self.opponents = self._make_opponents(opponents)
+        self.encoder = ObservationEncoder(num_players)
+        self.action_space = Discrete(NUM_ACTIONS)
+        # 手札枚数以外は0/1なので、上限は手札枚数の最大（デッキの枚数）で抑える
+        self.observation_space = Box(low=0.0, high=float(NUM_CARD_IDS), shape=(self.encoder.size,), dtype=np.float32)
+        self.steps = 0
+
+    def _make_opponents(self, opponents):
+        """
+        opponents（席ごとのエージェントまたはクラス。learner_id の席は無視）をエージェントのリストにする
+        """
+        if opponents is None:
+            return None
+        agents = []
+        for seat, opponent in enumerate(opponents):
+            if seat == self.learner_id or opponent is None:
+                agents.append(None)
+            else:
+                agents.append(opponent(player_id=seat) if isinstance(opponent, type) else opponent)
+        return agents
+
+    # --- Gym API ---
+    def reset(self, seed=None, options=None):
+        """
+        同じ Game をその場で配り直す。seed を渡すとその配札（と相手の乱数）を再現する
+        （前のゲームが最後まで進んでいれば、その順位でカード交換も行う）
+        戻り値: (観測, info)
+        """
+        super().reset(seed=seed)
+        if seed is not None:
+            self.game.seed(seed)
+            # 乱数を使う相手（rng 属性を持つもの）にも seed から引いた独立の生成器を渡す
+            for agent in self.opponents or ():
+                if agent is not None and hasattr(agent, 'rng'):
+                    agent.rng = random.Random(int(self.np_random.integers(1 << SEED_BITS)))
+        self.game.reset()
+        self.steps = 0
+        self._play_opponents()
+        return self._get_obs(), self._get_info()
+
+    def step(self, action):
+        """
+        手番のプレイヤーとして行動番号 action を実行する。
+        戻り値: (観測, 報酬, terminated, truncated, info)
+        """
+        game = self.game
+        player_id = game.turn
+        mask = self.action_masks()
+        action = int(action)
+        invalid = not mask[action]
+        num_ranked = len(game.rankings)
+        game.step(player_id, None if invalid else ACTION_CARDS[action])
+        self.steps += 1
+        target = player_id if self.learner_id is None else self.learner_id
+        reward = self._ranked_reward(target, num_ranked)
+        if self.learner_id is not None and not game.done and target not in game.rankings:
+            num_ranked = len(game.rankings)
+            self._play_opponents()
+            reward += self._ranked_reward(target, num_ranked)
+        terminated = game.done or (self.learner_id is not None and self.learner_id in game.rankings)
+        truncated = not terminated and self.steps >= self.max_steps
+        info = self._get_info()
+        info['invalid_action'] = invalid
+        info['acting_player'] = player_id
+        if self.render_mode == 'human':
+            self.render()
+        return self._get_obs(), reward, terminated, truncated, info
+
+    def action_masks(self):
+        """
+        手番プレイヤーの合法手マスク (NUM_ACTIONS,) bool
+        """
+        game = self.game
+        hand = game.players[game.turn].hand
+        hand_mask = hand.mask if game.use_bitmask else mask_of(hand)
+        field_action = MASK_TO_ACTION.get(game.field_info.mask) if game.current_field else -1
+        if field_action is None:
+            raise ValueError(f"場のカードが行動空間にありません: {game.current_field}")
+        mask = legal_action_mask(hand_mask, field_action, game.rule_checker.revolution)
+        if field_action < 0 and hand_mask:
+            mask[PASS_ACTION] = False
+        return mask
+
     def render(self):
-        field_cards = self.game.current_field if self.game.current_field else ["（場リセット）"]
-        print(f"--- 現在の場: {field_cards}")
-        print(f"あなたの手札: {[str(c) for c in self.game.players[0].hand]}")        
-        for i, p in enumerate(self.game.players[1:], 1):
-            print(f"Player {i} の手札枚数: {len(p.hand)}")
+        game = self.game
+        lines = [
+            f"--- 現在の場: {[str(c) for c in game.current_field] or '（場リセット）'}",
+            f"Player {game.turn} の手札: {[str(c) for c in game.players[game.turn].hand]}",
+        ]
+        for player in game.players:
+            if player.player_id != game.turn:
+                lines.append(f"Player {player.player_id} の手札枚数: {len(player.hand)}")
+        text = "\n".join(lines)
+        if self.render_mode == 'ansi':
+            return text
+        print(text)
+        return None
+
+    # --- 内部処理 ---
+    def _ranked_reward(self, player_id, num_ranked_before):
+        """
+        直前の進行で player_id の順位が決まっていれば rank_score、そうでなければ 0
+        """
+        rankings = self.game.rankings
+        if player_id in rankings[num_ranked_before:]:
+            return rank_score(rankings.index(player_id), self.num_players)
+        return 0.0
+
+    def _play_opponents(self):
+        """
+        learner_id の手番になるまで（またはゲームが終わるまで）相手の席を自動で進める
+        """
+        if self.opponents is None:
+            return
+        game = self.game
+        while not game.done and game.turn != self.learner_id and self.steps < self.max_steps:
+            agent = self.opponents[game.turn]
+            mask = self.action_masks()
+            action_ids = np.flatnonzero(mask).tolist()
+            legal_actions = [ACTION_CARDS[a] for a in action_ids]
+            observation = {
+                'hand': list(game.players[game.turn].hand),
+                'field': game.current_field[:],
+                'field_info': game.field_info,
+                'game': game,
+                'action_ids': action_ids,
+            }
+            chosen = agent.select_action(observation, legal_actions) if agent is not None else None
+            action = action_index_of(chosen)
+            game.step(game.turn, ACTION_CARDS[action] if action is not None and mask[action] else None)
+            self.steps += 1
+
+    def _get_obs(self):
+        # エンコーダのバッファは使い回すのでコピーして返す
+        return self.encoder.encode(self.game).copy()
+
+    def _get_info(self):
+        return {'action_mask': self.action_masks(), 'turn': self.game.turn}
+
+
+class DaifugoVecEnv:
+    """
+    DaifugoEnv を num_envs 個まとめて1手ずつ進めるラッパー（Gymnasium の同期ベクトル環境と同じ戻り値の形）。
+    終了・打ち切りになった環境はその場でリセットし、最後の観測を info['final_observation'] に入れる。
+    """
+
+    def __init__(self, num_envs, seed=None, **env_kwargs):
+        self.num_envs = num_envs
+        self.envs = [
+            DaifugoEnv(seed=None if seed is None else seed + i, **env_kwargs) for i in range(num_envs)
+        ]
+        self.single_action_space = self.envs[0].action_space
+        self.single_observation_space = self.envs[0].observation_space
+        size = self.single_observation_space.shape[0]
+        self._obs = np.zeros((num_envs, size), dtype=np.float32)
+        self._masks = np.zeros((num_envs, NUM_ACTIONS), dtype=bool)
+
+    def reset(self, seed=None, options=None):
+        """
+        戻り値: (観測 (N, size), info{'action_mask': (N, NUM_ACTIONS)})
+        """
+        for i, env in enumerate(self.envs):
+            obs, info = env.reset(seed=None if seed is None else seed + i, options=options)
+            self._obs[i] = obs
+            self._masks[i] = info['action_mask']
+        return self._obs.copy(), {'action_mask': self._masks.copy()}
+
+    def step(self, actions):
+        """
+        戻り値: (観測 (N, size), 報酬 (N,), terminated (N,), truncated (N,), info)
+        """
+        n = self.num_envs
+        rewards = np.zeros(n, dtype=np.float32)
+        terminated = np.zeros(n, dtype=bool)
+        truncated = np.zeros(n, dtype=bool)
+        final_obs = [None] * n
+        for i, (env, action) in enumerate(zip(self.envs, actions)):
+            obs, rewards[i], terminated[i], truncated[i], info = env.step(action)
+            if terminated[i] or truncated[i]:
+                final_obs[i] = obs
+                obs, info = env.reset()
+            self._obs[i] = obs
+            self._masks[i] = info['action_mask']
+        info = {'action_mask': self._masks.copy(), 'final_observation': final_obs}
+        return self._obs.copy(), rewards, terminated, truncated, info
+
+    def action_masks(self):
+        return self._masks.copy()
+
+    def close(self):
+        for env in self.envs:
+            env.close()
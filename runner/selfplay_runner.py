@@ -0,0 +1,84 @@
+import os
+import random
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from game.environment import DaifugoSimpleEnv
+
+
+def _split_episodes(num_episodes, num_workers):
+    """
+    エピソード数をワーカーごとにできるだけ均等に割り振る
+    """
+    base, extra = divmod(num_episodes, num_workers)
+    return [base + (1 if i < extra else 0) for i in range(num_workers)]
+
+
+def play_episodes(worker_id, agent_classes, num_episodes, num_players=4, seed=0, use_bitmask=False):
+    """
+    1ワーカー分の自己対戦を行う（プロセスプールから呼ばれる）。
+    ワーカーごとに環境と乱数を持ち、順位集計とスループットを返す。
+    """
+    # ワーカー専用の乱数シード（プロセスごとに独立）。環境とエージェントは環境に渡したシードの生成器を使い、
+    # グローバルな乱数は rng を持たないエージェント用
+    random.seed(seed + worker_id)
+    np.random.seed(seed + worker_id)
+    # ヘッドレスモード（ログの整形・出力を一切行わない）
+    env = DaifugoSimpleEnv(
+        num_players=num_players, agent_classes=agent_classes, use_bitmask=use_bitmask, headless=True,
+        seed=seed + worker_id,
+    )
+    rank_stats = defaultdict(lambda: defaultdict(int))
+    steps = 0
+    start = time.perf_counter()
+    for _ in range(num_episodes):
+        env.reset()
+        done = False
+        while not done:
+            _, _, done = env.step()
+            steps += 1
+        for rank, player_id in enumerate(env.game.rankings):
+            rank_stats[rank + 1][player_id] += 1
+    elapsed = time.perf_counter() - start
+    return {
+        'worker_id': worker_id,
+        'episodes': num_episodes,
+        'steps': steps,
+        'elapsed': elapsed,
+        'episodes_per_sec': num_episodes / elapsed if elapsed > 0 else 0.0,
+        'steps_per_sec': steps / elapsed if elapsed > 0 else 0.0,
+        'rank_stats': {rank: dict(counts) for rank, counts in rank_stats.items()},
+    }
+
+
+def merge_rank_stats(results):
+    """
+    ワーカーごとの順位集計を {順位: {player_id: カウント数}} にまとめる
+    """
+    rank_stats = defaultdict(lambda: defaultdict(int))
+    for result in results:
+        for rank, counts in result['rank_stats'].items():
+            for player_id, count in counts.items():
+                rank_stats[rank][player_id] += count
+    return rank_stats
+
+
+def run_selfplay(agent_classes, num_episodes, num_workers=None, num_players=4, seed=0, use_bitmask=False):
+    """
+    エピソードをプロセスプールに分散して自己対戦を行う。
+    num_workers: ワーカープロセス数（Noneなら CPU コア数）
+    戻り値: (順位集計, ワーカーごとのスループット情報のリスト)
+    """
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+    num_workers = max(1, min(num_workers, num_episodes))
+    counts = _split_episodes(num_episodes, num_workers)
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        futures = [
+            executor.submit(play_episodes, worker_id, agent_classes, count, num_players, seed, use_bitmask)
+            for worker_id, count in enumerate(counts)
+        ]
+        results = [future.result() for future in futures]
+    worker_stats = [{k: v for k, v in result.items() if k != 'rank_stats'} for result in results]
+    return merge_rank_stats(results), worker_stats
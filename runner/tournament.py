@@ -0,0 +1,260 @@
+import argparse
+import importlib
+import json
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations, combinations_with_replacement
+import numpy as np
+from game.environment import DaifugoSimpleEnv
+
+# -----------------------------
+# 総当たりの対戦評価
+# エージェントのプールから卓の組み合わせ（ラインナップ）を全て作り、座席を1つずつずらした並び全てで対戦する。
+# 対戦はプロセスプールで並列に行い、エージェントごとの平均順位（95%信頼区間つき）と
+# 多人数 Elo レーティング（1ゲームを全ての2人組の勝ち負けに分解して更新）を求めてJSONに書き出す。
+# 使い方（リポジトリ直下で）:
+#   python -m runner.tournament --agents agents.random_agent.RandomAgent agents.rule_based_agent.RuleBasedAgent \
+#       agents.straight_agent.StraightAgent --games 10 --workers 4 --output tournament.json
+# -----------------------------
+
+ELO_INITIAL = 1500.0
+ELO_K = 16.0
+Z_95 = 1.96  # 95%信頼区間の係数（正規近似）
+
+
+def agent_name(agent_class):
+    """
+    表示用のエージェント名（functools.partial なら元のクラス名）
+    """
+    func = getattr(agent_class, 'func', agent_class)
+    return getattr(func, '__name__', repr(agent_class))
+
+
+def normalize_pool(agent_pool):
+    """
+    {名前: クラス} またはクラスのリストを [(名前, クラス)] にそろえる（同名は #2, #3 … を付ける）
+    """
+    items = list(agent_pool.items()) if isinstance(agent_pool, dict) else [(agent_name(c), c) for c in agent_pool]
+    seen = {}
+    pool = []
+    for name, agent_class in items:
+        seen[name] = seen.get(name, 0) + 1
+        pool.append((name if seen[name] == 1 else f'{name}#{seen[name]}', agent_class))
+    return pool
+
+
+def schedule_lineups(pool_size, num_players=4):
+    """
+    ラインナップ（プール内の番号のタプル）と座席のずらし方の一覧 [(ラインナップ, 座席順)] を作る。
+    プールが num_players 以上なら異なるエージェントの組み合わせ、足りなければ重複ありの組み合わせを使う。
+    同じエージェントだけの卓（ミラー戦）は何も比較できないので除く。
+    座席順は各ラインナップを1席ずつ回転させた num_players 通り（各エージェントが全ての席に座る）
+    """
+    members = range(pool_size)
+    if pool_size >= num_players:
+        lineups = combinations(members, num_players)
+    else:
+        lineups = combinations_with_replacement(members, num_players)
+    schedule = []
+    for lineup in lineups:
+        if len(set(lineup)) < 2:
+            continue
+        for shift in range(num_players):
+            schedule.append((lineup, lineup[shift:] + lineup[:shift]))
+    return schedule
+
+
+def play_seating(task_id, seating, agent_classes, num_games, num_players=4, seed=0, use_bitmask=False):
+    """
+    1つの座席順で num_games ゲーム対戦する（プロセスプールから呼ばれる）。
+    seating: 席ごとのプール内の番号、agent_classes: 席ごとのエージェントクラス
+    戻り値: ゲームごとの上がり順（プール内の番号のタプル）のリストと経過時間
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    env = DaifugoSimpleEnv(
+        num_players=num_players, agent_classes=agent_classes, use_bitmask=use_bitmask, headless=True, seed=seed,
+    )
+    finishes = []
+    start = time.perf_counter()
+    for _ in range(num_games):
+        env.reset()
+        done = False
+        while not done:
+            _, _, done = env.step()
+        finishes.append(tuple(seating[player_id] for player_id in env.game.rankings))
+    return {'task_id': task_id, 'finishes': finishes, 'elapsed': time.perf_counter() - start}
+
+
+def update_elo(ratings, finish, k=ELO_K):
+    """
+    1ゲームの上がり順 finish（プール内の番号）で ratings を更新する。
+    全ての2人組について上位を勝ちとし、1ゲームあたりの変化が人数によらないよう K を (人数 - 1) で割る
+    """
+    n = len(finish)
+    scale = k / (n - 1)
+    deltas = [0.0] * len(ratings)
+    for i in range(n):
+        for j in range(i + 1, n):
+            winner, loser = finish[i], finish[j]
+            if winner == loser:
+                continue
+            expected = 1.0 / (1.0 + 10 ** ((ratings[loser] - ratings[winner]) / 400.0))
+            deltas[winner] += scale * (1.0 - expected)
+            deltas[loser] -= scale * (1.0 - expected)
+    for index, delta in enumerate(deltas):
+        ratings[index] += delta
+
+
+def summarize(pool, finishes, num_players, clusters=None):
+    """
+    全ゲームの上がり順からエージェントごとの成績をまとめる
+    （平均順位と95%信頼区間、順位ごとの回数、Elo レーティング）。
+    同じエージェントが1卓に複数いるゲームは席ごとの順位を平均して1ゲーム1標本にする
+    （同じゲームの席どうしは独立でないため）。games は出たゲーム数、rank_counts は席ごとに数える。
+    clusters: ゲームごとの座席順の番号（finishes と同じ並び。省略時はゲームごとに別扱い）。
+    同じ座席順の続きのゲームは前のゲームの順位でカード交換をするので独立でない。
+    信頼区間は座席順ごとの平均順位を1標本として求める（座席順どうしは別のシードで配るので独立として扱う）。
+    座席順の数が少ないときの正規近似なので目安として使うこと
+    """
+    if clusters is None:
+        clusters = range(len(finishes))
+    samples_by_agent = [{} for _ in pool]  # 座席順の番号 → ゲームごとの平均順位
+    seat_ranks = [[] for _ in pool]
+    ratings = [ELO_INITIAL] * len(pool)
+    for finish, cluster in zip(finishes, clusters):
+        game_ranks = {}
+        for rank, index in enumerate(finish):
+            game_ranks.setdefault(index, []).append(rank + 1)
+            seat_ranks[index].append(rank + 1)
+        for index, ranks in game_ranks.items():
+            samples_by_agent[index].setdefault(cluster, []).append(sum(ranks) / len(ranks))
+        update_elo(ratings, finish)
+    agents = []
+    for index, (name, _) in enumerate(pool):
+        by_cluster = samples_by_agent[index]
+        count = sum(len(samples) for samples in by_cluster.values())
+        mean = sum(sum(samples) for samples in by_cluster.values()) / count if count else None
+        # 座席順ごとの平均（どの座席順でも1卓に出るゲーム数は同じなので、その平均は全体の平均と一致する）
+        cluster_means = [sum(samples) / len(samples) for samples in by_cluster.values()]
+        half_width = None
+        if len(cluster_means) > 1:
+            center = sum(cluster_means) / len(cluster_means)
+            variance = sum((m - center) ** 2 for m in cluster_means) / (len(cluster_means) - 1)
+            half_width = Z_95 * math.sqrt(variance / len(cluster_means))
+        agents.append({
+            'name': name,
+            'games': count,
+            'seatings': len(cluster_means),
+            'mean_rank': mean,
+            'mean_rank_ci95': [mean - half_width, mean + half_width] if half_width is not None else None,
+            'rank_counts': {str(rank): seat_ranks[index].count(rank) for rank in range(1, num_players + 1)},
+            'elo': ratings[index],
+        })
+    return agents
+
+
+def run_tournament(agent_pool, games_per_seating=10, num_players=4, num_workers=None, seed=0,
+                   use_bitmask=False, output_path=None):
+    """
+    agent_pool の総当たり戦を行う。
+    agent_pool: {名前: エージェントクラス} またはクラスのリスト（プロセス間で渡すのでモジュール直下のクラスか partial）
+    games_per_seating: 1つの座席順あたりのゲーム数
+    num_workers: ワーカープロセス数（Noneなら CPU コア数、1ならプロセスを作らずに実行）
+    seed: 座席順ごとに seed + 番号 のシードで配る（同じ引数なら同じ結果）
+    output_path: 結果JSONの出力先（Noneなら書き出さない）
+    戻り値: 結果の辞書（config / agents / lineups）
+    """
+    pool = normalize_pool(agent_pool)
+    if len(pool) < 2:
+        raise ValueError("総当たり戦には2体以上のエージェントが必要です")
+    schedule = schedule_lineups(len(pool), num_players)
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+    num_workers = max(1, min(num_workers, len(schedule)))
+    tasks = [
+        (task_id, seating, [pool[index][1] for index in seating], games_per_seating, num_players, seed + task_id,
+         use_bitmask)
+        for task_id, (_, seating) in enumerate(schedule)
+    ]
+    start = time.perf_counter()
+    if num_workers == 1:
+        results = [play_seating(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            futures = [executor.submit(play_seating, *task) for task in tasks]
+            results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - start
+    # Elo はゲームの順番に依存するので、座席順の番号順・ゲーム順に並べて集計する（ワーカー数によらない）
+    results.sort(key=lambda result: result['task_id'])
+    finishes = [finish for result in results for finish in result['finishes']]
+    clusters = [result['task_id'] for result in results for _ in result['finishes']]
+    report = {
+        'config': {
+            'num_players': num_players,
+            'games_per_seating': games_per_seating,
+            'num_seatings': len(schedule),
+            'num_games': len(finishes),
+            'seed': seed,
+            'num_workers': num_workers,
+            'elapsed_sec': elapsed,
+        },
+        'agents': summarize(pool, finishes, num_players, clusters),
+        'lineups': [
+            {'lineup': [pool[index][0] for index in lineup], 'seating': [pool[index][0] for index in seating],
+             'finishes': [[pool[index][0] for index in finish] for finish in result['finishes']]}
+            for (lineup, seating), result in zip(schedule, results)
+        ],
+    }
+    if output_path is not None:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return report
+
+
+def print_standings(report):
+    """
+    レーティング順に成績を表示する
+    """
+    print(f"{'agent':24s} {'games':>6s} {'mean rank':>10s} {'95% CI':>17s} {'elo':>8s}")
+    for agent in sorted(report['agents'], key=lambda a: -a['elo']):
+        ci = agent['mean_rank_ci95']
+        ci_str = f"[{ci[0]:.2f}, {ci[1]:.2f}]" if ci else '-'
+        mean = f"{agent['mean_rank']:.2f}" if agent['mean_rank'] is not None else '-'
+        print(f"{agent['name']:24s} {agent['games']:6d} {mean:>10s} {ci_str:>17s} {agent['elo']:8.1f}")
+
+
+def load_agent_class(path):
+    """
+    'agents.random_agent.RandomAgent' のようなパスからクラスを読み込む
+    """
+    module_name, _, class_name = path.rpartition('.')
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='エージェントの総当たり戦')
+    parser.add_argument('--agents', nargs='+', required=True, help='エージェントクラスのパス（モジュール.クラス名）')
+    parser.add_argument('--games', type=int, default=10, help='座席順ごとのゲーム数')
+    parser.add_argument('--players', type=int, default=4, help='1卓の人数')
+    parser.add_argument('--workers', type=int, default=None, help='ワーカープロセス数（省略時はCPUコア数）')
+    parser.add_argument('--seed', type=int, default=0, help='乱数シード')
+    parser.add_argument('--output', default=None, help='結果JSONの出力先')
+    args = parser.parse_args(argv)
+
+    pool = [load_agent_class(path) for path in args.agents]
+    report = run_tournament(
+        pool, games_per_seating=args.games, num_players=args.players, num_workers=args.workers, seed=args.seed,
+        output_path=args.output,
+    )
+    print_standings(report)
+    config = report['config']
+    print(f"\n{config['num_games']}ゲーム / {config['num_seatings']}座席順 / {config['elapsed_sec']:.1f}秒")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,28 @@
+from game.environment import DaifugoSimpleEnv
+from game.bitmask import mask_of
+from agents.random_agent import RandomAgent
+
+
+def test_index_and_fallback_generate_the_same_order():
+    checks = 0
+    for use_bitmask in (False, True):
+        for seed in (0, 1):
+            env = DaifugoSimpleEnv(agent_classes=[RandomAgent] * 4, use_bitmask=use_bitmask, headless=True, seed=seed)
+            for _ in range(6):
+                env.reset()
+                done = False
+                while not done:
+                    game = env.game
+                    hand = game.players[game.turn].hand
+                    field = game.current_field[:]
+                    indexed, indexed_ids = env._generate_legal_actions(
+                        hand, field, env.action_indexes[game.turn], with_ids=True, field_info=game.field_info,
+                    )
+                    rebuilt, rebuilt_ids = env._generate_legal_actions(hand, field, with_ids=True)
+                    # リスト手札を並べ替えても同じ並び
+                    shuffled, shuffled_ids = env._generate_legal_actions(list(reversed(list(hand))), field, with_ids=True)
+                    assert indexed_ids == rebuilt_ids == shuffled_ids
+                    assert [mask_of(a) if a else 0 for a in indexed] == [mask_of(a) if a else 0 for a in rebuilt]
+                    checks += 1
+                    _, _, done = env.step()
+    assert checks > 0
@@ -0,0 +1,42 @@
+import random
+from game.card import card_from_id
+from game.bitmask import JOKER_ID
+from game.rules import RuleChecker
+from game.logger import headless_logger
+from game.action_space import (
+    NUM_ACTIONS, PASS_ACTION, ACTION_CARD_IDS, ACTION_KIND, ACTION_SIZE, KIND_STRAIGHT, compatibility_table,
+)
+
+
+def _orders(action):
+    """
+    行動のカードを、自然札が先の並びとジョーカーが先の並びの両方で返す
+    """
+    ids = list(ACTION_CARD_IDS[action])
+    cards = [card_from_id(i) for i in ids]
+    if JOKER_ID not in ids:
+        return [cards]
+    joker_first = [card_from_id(JOKER_ID)] + [card for card in cards if not card.is_joker]
+    return [cards, joker_first]
+
+
+def test_compatibility_table_matches_is_valid_move_in_any_card_order():
+    # ジョーカー入りの階段の場はすべて、それ以外は一部を調べる
+    straights = [a for a in range(1, NUM_ACTIONS) if ACTION_KIND[a] == KIND_STRAIGHT]
+    joker_straights = [a for a in straights if JOKER_ID in ACTION_CARD_IDS[a]]
+    rng = random.Random(0)
+    fields = joker_straights[::4] + rng.sample(range(1, NUM_ACTIONS), 40)
+    rule_checker = RuleChecker(logger=headless_logger())
+    table = compatibility_table()
+    for revolution in (False, True):
+        rule_checker.revolution = revolution
+        for field_action in fields:
+            row = table[int(revolution), field_action + 1]
+            # 枚数の違う組は出せない
+            assert not row[1:][ACTION_SIZE[1:] != ACTION_SIZE[field_action]].any()
+            same_size = [a for a in range(1, NUM_ACTIONS) if ACTION_SIZE[a] == ACTION_SIZE[field_action]]
+            for field in _orders(field_action):
+                for action in same_size:
+                    for play in _orders(action):
+                        assert rule_checker.is_valid_move(play, field) == row[action], (revolution, field_action, action)
+    assert table[:, :, PASS_ACTION].all()
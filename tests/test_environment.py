@@ -0,0 +1,55 @@
+import numpy as np
+from game.environment import DaifugoSimpleEnv
+from agents.random_agent import RandomAgent
+
+
+class _CheckingAgent(RandomAgent):
+    """
+    行動を選ぶたびに env.legal_action_mask() と obs['action_mask'] を比べるエージェント
+    """
+    env = None
+    mismatches = 0
+    checks = 0
+
+    def select_action(self, obs, legal_actions):
+        _CheckingAgent.checks += 1
+        if not np.array_equal(_CheckingAgent.env.legal_action_mask(), obs['action_mask']):
+            _CheckingAgent.mismatches += 1
+        return super().select_action(obs, legal_actions)
+
+
+def _seeded_envs(agent_classes):
+    # seed 3 / 17 はジョーカーが先頭の階段の場を含む
+    for use_bitmask in (False, True):
+        for seed in (0, 3, 17):
+            yield DaifugoSimpleEnv(agent_classes=agent_classes, use_bitmask=use_bitmask, headless=True, seed=seed)
+
+
+def test_legal_action_mask_matches_offered_mask():
+    _CheckingAgent.mismatches = _CheckingAgent.checks = 0
+    for env in _seeded_envs([_CheckingAgent] * 4):
+        _CheckingAgent.env = env
+        for _ in range(12):
+            env.reset()
+            done = False
+            while not done:
+                _, _, done = env.step()
+    assert _CheckingAgent.checks > 0
+    assert _CheckingAgent.mismatches == 0
+
+
+def test_step_record_holds_the_offered_set():
+    for env in _seeded_envs([RandomAgent] * 4):
+        for _ in range(4):
+            env.reset()
+            done = False
+            while not done:
+                expected = env.legal_action_mask()
+                _, _, done = env.step()
+                # 区間が終わると stage_history は空になるので、直前の記録が残っているときだけ比べる
+                if env.stage_history:
+                    record = env.stage_history[-1]
+                    assert np.array_equal(record['legal_actions_mask'], expected)
+                    assert np.flatnonzero(expected).tolist() == sorted(record['legal_action_ids'])
+                    assert len(record['legal_actions']) == len(record['legal_action_ids'])
+                    assert expected[record['action_index']]
@@ -0,0 +1,53 @@
+import random
+from functools import lru_cache
+from game.bitmask import JOKER_ID
+from game.action_space import ACTION_MASKS, NUM_ACTIONS, OFFERED_LEAD_ACTIONS, PASS_ACTION
+from game.hand_analysis import analyze_hand, min_plays
+
+# 場が空のときに作れる組のマスク
+_GROUP_MASKS = [int(ACTION_MASKS[a]) for a in range(NUM_ACTIONS) if a != PASS_ACTION and OFFERED_LEAD_ACTIONS[a]]
+
+
+def _brute_force_min_plays(hand_mask):
+    """
+    手札に含まれる組をすべて試して分け方の最小手数を求める（一番小さいカードから組む枝刈りをしない）
+    """
+    groups = [g for g in _GROUP_MASKS if hand_mask & g == g]
+
+    @lru_cache(maxsize=None)
+    def solve(mask):
+        if mask == 0:
+            return 0
+        return 1 + min(solve(mask & ~g) for g in groups if mask & g == g)
+
+    return solve(hand_mask)
+
+
+def _random_hands(count, size, seed):
+    rng = random.Random(seed)
+    # 階段・組ができやすいように、少ないランク・スートの範囲から引く
+    pool = [suit * 13 + rank for suit in range(2) for rank in range(2, 9)] + [JOKER_ID]
+    for _ in range(count):
+        mask = 0
+        for i in rng.sample(pool, size):
+            mask |= 1 << i
+        yield mask
+
+
+def test_min_plays_matches_brute_force_partition():
+    for size in range(1, 9):
+        for hand_mask in _random_hands(60, size, seed=size):
+            assert min_plays(hand_mask) == _brute_force_min_plays(hand_mask), hex(hand_mask)
+
+
+def test_groups_partition_the_hand():
+    for hand_mask in _random_hands(200, 8, seed=0):
+        result = analyze_hand(hand_mask)
+        assert len(result.groups) == result.num_plays
+        covered = 0
+        for action in result.groups:
+            assert OFFERED_LEAD_ACTIONS[action]
+            group = int(ACTION_MASKS[action])
+            assert covered & group == 0
+            covered |= group
+        assert covered == hand_mask
@@ -0,0 +1,31 @@
+from game.environment import DaifugoSimpleEnv
+from game.bitmask import mask_of
+from game.hand_sampler import _offers_any
+from agents.random_agent import RandomAgent
+
+
+def _hand_mask(player, use_bitmask):
+    return player.hand.mask if use_bitmask else mask_of(player.hand)
+
+
+def test_recorded_voids_never_contradict_the_true_hand():
+    checks = 0
+    for use_bitmask in (False, True):
+        # seed 17 はジョーカーが先頭の階段の場でパスする局面を含む
+        for seed in (0, 1, 2, 17):
+            env = DaifugoSimpleEnv(
+                agent_classes=[RandomAgent] * 4, use_bitmask=use_bitmask, headless=True, seed=seed,
+                track_public_info=True,
+            )
+            for _ in range(12):
+                env.reset()
+                done = False
+                while not done:
+                    _, _, done = env.step()
+                    # 1ゲームの中では手札は減るだけなので、パスした後も同じ組は作れないまま
+                    for pid, player in enumerate(env.game.players):
+                        hand = _hand_mask(player, use_bitmask)
+                        for void in env.public_info.voids[pid]:
+                            assert not _offers_any([hand], void)[0], (use_bitmask, seed, pid)
+                            checks += 1
+    assert checks > 0
@@ -0,0 +1,56 @@
+import copy
+import numpy as np
+import pytest
+from game.environment import DaifugoSimpleEnv
+from data.replay_buffer import MemmapReplayBuffer
+from agents.random_agent import RandomAgent
+
+
+class _StageCollector:
+    """
+    区間レコードをそのままバッファに流しつつ、最後の区間を取っておく record_sink
+    """
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.last_stage = None
+
+    def write_stage(self, stage_history):
+        self.last_stage = copy.deepcopy(stage_history)
+        self.buffer.write_stage(stage_history)
+
+
+def test_stored_masks_are_the_offered_set(tmp_path):
+    buffer = MemmapReplayBuffer(str(tmp_path / 'buffer'), capacity=100000, seed=0)
+    sink = _StageCollector(buffer)
+    for use_bitmask in (False, True):
+        env = DaifugoSimpleEnv(
+            agent_classes=[RandomAgent] * 4, use_bitmask=use_bitmask, headless=True, seed=3, record_sink=sink,
+        )
+        for _ in range(5):
+            env.reset()
+            done = False
+            while not done:
+                _, _, done = env.step()
+    size = len(buffer)
+    assert size > 0
+    masks = buffer.columns['mask'][:size]
+    actions = buffer.columns['action'][:size].astype(np.int64)
+    assert masks[np.arange(size), actions].all()
+
+
+def test_write_stage_rejects_an_action_outside_the_mask(tmp_path):
+    buffer = MemmapReplayBuffer(str(tmp_path / 'buffer'), capacity=1000)
+    sink = _StageCollector(buffer)
+    env = DaifugoSimpleEnv(agent_classes=[RandomAgent] * 4, headless=True, seed=0, record_sink=sink)
+    env.reset()
+    while sink.last_stage is None:
+        env.step()
+    stage = sink.last_stage
+    record = stage[0]
+    record['legal_actions_mask'] = record['legal_actions_mask'].copy()
+    record['legal_actions_mask'][record['action_index']] = False
+    before = len(buffer)
+    with pytest.raises(ValueError):
+        buffer.write_stage(stage)
+    assert len(buffer) == before